@@ -4,5 +4,64 @@ Augmented LLM package for enhanced language model interactions with tool usage c
 
 from .llm import AugmentedLLM
 from .token_debugger import TokenDebugger
+from .history_manager import HistoryManager
+from .tool_cache import ToolResultCache, get_shared_tool_cache, invalidate_shared_tool_caches
+from .clients import get_client, configure_client_pool, close_clients
+from .session_journal import SessionJournal, get_session_journal, read_journal
+from .instrumentation import MetricsAggregator
+from .message_translation import translate_messages
+from .stream_events import StreamEvent, TextDelta, ToolStart, ToolInput, ToolResult, Stop, Usage, events_to_text
+from .session_store import SessionStore, SessionConflictError, snapshot_session, restore_session
+from .session_manager import SessionManager
+from .rate_limiter import RateLimiter, FileBucketStore, get_rate_limiter, configure_rate_limits
+from .batch import AnthropicBatchBackend, OpenAIBatchBackend, LocalBatchBackend, create_batch_backend
+from .local_responses import LocalResponsesServer
+from .usage_ledger import UsageLedger, get_usage_ledger
+from .model_costs import ModelRegistry, get_model_info, load_model_registry
+from .error_logger import ToolErrorLogger, get_tool_error_logger
 
-__all__ = ['AugmentedLLM', 'TokenDebugger']
\ No newline at end of file
+__all__ = [
+    'AugmentedLLM',
+    'TokenDebugger',
+    'HistoryManager',
+    'ToolResultCache',
+    'get_shared_tool_cache',
+    'invalidate_shared_tool_caches',
+    'get_client',
+    'configure_client_pool',
+    'close_clients',
+    'SessionJournal',
+    'get_session_journal',
+    'read_journal',
+    'MetricsAggregator',
+    'translate_messages',
+    'RateLimiter',
+    'FileBucketStore',
+    'get_rate_limiter',
+    'configure_rate_limits',
+    'StreamEvent',
+    'TextDelta',
+    'ToolStart',
+    'ToolInput',
+    'ToolResult',
+    'Stop',
+    'Usage',
+    'events_to_text',
+    'SessionStore',
+    'SessionConflictError',
+    'snapshot_session',
+    'restore_session',
+    'SessionManager',
+    'AnthropicBatchBackend',
+    'OpenAIBatchBackend',
+    'LocalBatchBackend',
+    'create_batch_backend',
+    'LocalResponsesServer',
+    'UsageLedger',
+    'get_usage_ledger',
+    'ModelRegistry',
+    'get_model_info',
+    'load_model_registry',
+    'ToolErrorLogger',
+    'get_tool_error_logger'
+]
\ No newline at end of file
@@ -1,14 +1,45 @@
-import anthropic
-from typing import Dict, Any, Generator, List
+from typing import Dict, Any, Generator, List, Optional, Callable, Tuple, TYPE_CHECKING
 import json
+from .json_stream import IncrementalJSONParser
+from .stream_events import (
+    StreamEvent,
+    StreamStart,
+    TextDelta,
+    ToolStart,
+    ToolInput,
+    Stop,
+    MessageComplete,
+    Usage
+)
 
-def process_anthropic_stream(stream, messages: List[Dict[str, Any]], debug_tools: bool = False) -> Generator[str, None, Dict[str, Any]]:
-    """Process Anthropic message stream and handle tool usage"""
+if TYPE_CHECKING:
+    import anthropic
+
+# Anthropic caches everything up to and including a block marked with this
+CACHE_CONTROL = {"type": "ephemeral"}
+
+def process_anthropic_stream(stream, messages: List[Dict[str, Any]], debug_tools: bool = False, on_first_token: Optional[Callable[[], None]] = None, on_tool_ready: Optional[Callable[[Dict[str, Any]], None]] = None) -> Generator[StreamEvent, None, Dict[str, Any]]:
+    """Process Anthropic message stream and handle tool usage.
+    
+    Yields typed stream events; marker events are printed instead when
+    debug_tools is on, but still yielded. on_first_token is called once,
+    when the first content delta arrives. on_tool_ready is called with each
+    tool_use block as soon as its input is complete, while the rest of the
+    message is still streaming.
+    """
     current_message = None
     current_block = None
-    current_json_accumulator = ""
+    # Deltas are collected in lists and joined once, keeping accumulation linear
+    json_parser = None
+    block_text_parts: List[str] = []
+    content_parts: List[str] = []
     stop_reason = None
-    current_content = ""
+    usage = {
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "cache_read_input_tokens": 0,
+        "cache_creation_input_tokens": 0
+    }
     
     for event in stream:
         if event.type == "message_start":
@@ -16,16 +47,20 @@ def process_anthropic_stream(stream, messages: List[Dict[str, Any]], debug_tools
                 "role": "assistant",
                 "content": []
             }
-            current_content = ""
+            content_parts = []
+            message_usage = getattr(getattr(event, "message", None), "usage", None)
+            if message_usage is not None:
+                for key in usage:
+                    usage[key] = getattr(message_usage, key, None) or 0
             if debug_tools:
                 print("[Debug] Stream Started")
-            else:
-                yield "[Stream Started]\n"
+            yield StreamStart()
             
         elif event.type == "content_block_start":
             if hasattr(event.content_block, 'type'):
                 if event.content_block.type == "text":
                     current_block = {"type": "text", "text": ""}
+                    block_text_parts = []
                     current_message["content"].append(current_block)
                 elif event.content_block.type == "tool_use":
                     current_block = {
@@ -34,72 +69,147 @@ def process_anthropic_stream(stream, messages: List[Dict[str, Any]], debug_tools
                         "name": event.content_block.name,
                         "input": {}
                     }
+                    json_parser = IncrementalJSONParser()
                     current_message["content"].append(current_block)
                     if debug_tools:
                         print(f"\n[Debug] Tool Use Started: {current_block['name']}")
-                    else:
-                        yield f"\n[Tool Use Started: {current_block['name']}]\n"
+                    yield ToolStart(current_block["name"], current_block["id"])
             
         elif event.type == "content_block_delta":
+            if on_first_token is not None:
+                on_first_token()
+                on_first_token = None
             if hasattr(event.delta, 'text'):
                 text = event.delta.text
-                current_content += text
+                content_parts.append(text)
                 if not debug_tools or not text.startswith("[Debug]"):
-                    yield text
+                    yield TextDelta(text)
                 if current_block and current_block["type"] == "text":
-                    current_block["text"] += text
+                    block_text_parts.append(text)
             elif hasattr(event.delta, 'partial_json'):
-                if event.delta.partial_json.strip():
-                    current_json_accumulator += event.delta.partial_json
-                    if current_json_accumulator.endswith("}"):
+                if json_parser is not None and current_block and current_block["type"] == "tool_use":
+                    # The parser knows when the top-level object closes; nothing is re-parsed
+                    if json_parser.feed(event.delta.partial_json):
                         try:
-                            tool_input = json.loads(current_json_accumulator)
-                            if current_block and current_block["type"] == "tool_use":
-                                current_block["input"] = tool_input
-                                if debug_tools:
-                                    print(f"[Debug] Tool Input: {json.dumps(tool_input, indent=2)}")
-                                else:
-                                    yield f"\n[Tool Input: {tool_input}]\n"
+                            tool_input = json_parser.value()
                         except json.JSONDecodeError:
                             pass
+                        else:
+                            current_block["input"] = tool_input
+                            if debug_tools:
+                                print(f"[Debug] Tool Input: {json.dumps(tool_input, indent=2)}")
+                            yield ToolInput(current_block["name"], current_block["id"], tool_input)
             
         elif event.type == "content_block_stop":
             if current_block and current_block["type"] == "tool_use":
-                current_json_accumulator = ""
+                if json_parser is not None and not json_parser.complete:
+                    # Tools without input send no (or only whitespace) JSON
+                    try:
+                        current_block["input"] = json_parser.close(default={})
+                    except json.JSONDecodeError:
+                        pass
+                json_parser = None
+                if on_tool_ready is not None:
+                    on_tool_ready(current_block)
+            elif current_block and current_block["type"] == "text":
+                current_block["text"] = "".join(block_text_parts)
             
         elif event.type == "message_delta":
+            delta_usage = getattr(event, "usage", None)
+            if delta_usage is not None and getattr(delta_usage, "output_tokens", None):
+                usage["output_tokens"] = delta_usage.output_tokens
             if event.delta.stop_reason:
                 stop_reason = event.delta.stop_reason
                 if debug_tools:
                     print(f"[Debug] Stop Reason: {stop_reason}")
-                else:
-                    yield f"\n[Stop Reason: {stop_reason}]\n"
+                yield Stop(stop_reason)
             
         elif event.type == "message_stop":
             if debug_tools:
                 print("[Debug] Message Complete")
-            else:
-                yield "\n[Message Complete]\n"
+            yield Usage(**usage)
+            yield MessageComplete()
                 
             if current_message:
                 messages.append(current_message)
                 return {
                     "message": current_message,
                     "stop_reason": stop_reason,
-                    "content": current_content
+                    "content": "".join(content_parts),
+                    "usage": usage
                 }
 
-def create_anthropic_stream(client: anthropic.Anthropic, **kwargs):
+def is_anthropic_content_event(event) -> bool:
+    """Check if a stream event carries model output (text or tool input)"""
+    return event.type == "content_block_delta"
+
+def create_anthropic_stream(client: "anthropic.Anthropic", **kwargs):
     """Create a stream using Anthropic's API"""
     return client.messages.create(**kwargs)
 
+def build_anthropic_batch_request(custom_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Package streaming request parameters as one Message Batches request"""
+    batch_params = {k: v for k, v in params.items() if k != "stream"}
+    if not batch_params.get("tools"):
+        batch_params.pop("tools", None)
+    return {"custom_id": custom_id, "params": batch_params}
+
+def build_cached_system(system_prompt: str, uncached_suffix: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Build a system prompt with a cache breakpoint after the static part.
+    
+    Args:
+        system_prompt: Static system prompt that is identical across sessions
+        uncached_suffix: Volatile text (e.g. the current time) placed after the breakpoint
+        
+    Returns:
+        List of system text blocks for the Anthropic API
+    """
+    blocks = [{"type": "text", "text": system_prompt, "cache_control": CACHE_CONTROL}]
+    if uncached_suffix:
+        blocks.append({"type": "text", "text": uncached_suffix})
+    return blocks
+
+def add_tool_cache_breakpoint(tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Return a copy of the tool list with a cache breakpoint on the last tool"""
+    if not tools:
+        return tools
+    return tools[:-1] + [{**tools[-1], "cache_control": CACHE_CONTROL}]
+
+def add_history_cache_breakpoint(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Return a copy of the history with a cache breakpoint on the last message.
+    
+    The stored history is left untouched so breakpoints do not accumulate
+    across turns; the next request reads everything up to this point from cache.
+    """
+    if not messages:
+        return messages
+    last = messages[-1]
+    content = last["content"]
+    if isinstance(content, str):
+        if not content:
+            return messages
+        blocks = [{"type": "text", "text": content}]
+    else:
+        blocks = list(content)
+    if not blocks:
+        return messages
+    blocks[-1] = {**blocks[-1], "cache_control": CACHE_CONTROL}
+    return messages[:-1] + [{**last, "content": blocks}]
+
 def format_tool_result_message(tool_block: Dict[str, Any], result: str) -> Dict[str, Any]:
     """Format tool result message for Anthropic"""
+    return format_tool_results_message([(tool_block, result)])
+
+def format_tool_results_message(results: List[Tuple[Dict[str, Any], str]]) -> Dict[str, Any]:
+    """Format the results of every tool_use block of a turn as one user message"""
     return {
         "role": "user",
-        "content": [{
-            "type": "tool_result",
-            "tool_use_id": tool_block["id"],
-            "content": result
-        }]
+        "content": [
+            {
+                "type": "tool_result",
+                "tool_use_id": tool_block["id"],
+                "content": result
+            }
+            for tool_block, result in results
+        ]
     } 
\ No newline at end of file
@@ -0,0 +1,266 @@
+"""
+Batch submission of single-turn requests.
+
+AugmentedLLM.generate_batch() packages many prompts (with the session's system
+prompt and tool definitions) into a provider batch and waits for the results.
+A backend hides the provider API behind three calls: submit(), is_done() and
+results(). results() returns one normalized entry per custom_id:
+
+    {"status": "succeeded" | "errored" | "canceled" | "expired",
+     "message": assistant message in the provider's history format,
+     "stop_reason": str, "usage": dict, "error": str or None}
+
+LocalBatchBackend is an in-process stand-in that accepts the same request
+formats, so batch jobs can be exercised offline.
+"""
+
+import io
+import itertools
+import json
+import time
+from typing import Dict, Any, Callable, List, Optional
+from .providers import LLMProvider
+from .token_debugger import TokenDebugger
+
+_EMPTY_USAGE = {
+    "input_tokens": 0,
+    "output_tokens": 0,
+    "cache_read_input_tokens": 0,
+    "cache_creation_input_tokens": 0
+}
+
+def _as_dict(obj: Any) -> Any:
+    """Convert SDK response objects to plain dicts."""
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    return obj
+
+def normalize_anthropic_message(message: Any) -> Dict[str, Any]:
+    """Normalize an Anthropic Message (object or dict) to a batch result entry."""
+    message = _as_dict(message)
+    content = []
+    for block in message.get("content") or []:
+        block = _as_dict(block)
+        if block["type"] == "text":
+            content.append({"type": "text", "text": block["text"]})
+        elif block["type"] == "tool_use":
+            content.append({"type": "tool_use", "id": block["id"], "name": block["name"], "input": block.get("input", {})})
+    usage = message.get("usage") or {}
+    return {
+        "status": "succeeded",
+        "message": {"role": "assistant", "content": content},
+        "stop_reason": message.get("stop_reason"),
+        "usage": {key: usage.get(key) or 0 for key in _EMPTY_USAGE},
+        "error": None
+    }
+
+def normalize_openai_completion(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize an OpenAI chat completion body to a batch result entry."""
+    choice = body["choices"][0]
+    message = choice["message"]
+    usage = body.get("usage") or {}
+    details = usage.get("prompt_tokens_details") or {}
+    # prompt_tokens include the cached prefix; input_tokens count uncached input only
+    cached_tokens = details.get("cached_tokens", 0) or 0
+    return {
+        "status": "succeeded",
+        "message": {
+            "role": "assistant",
+            "content": message.get("content"),
+            "tool_calls": message.get("tool_calls")
+        },
+        "stop_reason": choice.get("finish_reason"),
+        "usage": {
+            "input_tokens": (usage.get("prompt_tokens", 0) or 0) - cached_tokens,
+            "output_tokens": usage.get("completion_tokens", 0) or 0,
+            "cache_read_input_tokens": cached_tokens,
+            "cache_creation_input_tokens": 0
+        },
+        "error": None
+    }
+
+def _failed_entry(status: str, error: str) -> Dict[str, Any]:
+    return {"status": status, "message": None, "stop_reason": None, "usage": dict(_EMPTY_USAGE), "error": error}
+
+class AnthropicBatchBackend:
+    """Anthropic Message Batches API."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def submit(self, requests: List[Dict[str, Any]]) -> str:
+        return self.client.messages.batches.create(requests=requests).id
+
+    def is_done(self, batch_id: str) -> bool:
+        return self.client.messages.batches.retrieve(batch_id).processing_status == "ended"
+
+    def results(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        entries = {}
+        for item in self.client.messages.batches.results(batch_id):
+            result = item.result
+            if result.type == "succeeded":
+                entries[item.custom_id] = normalize_anthropic_message(result.message)
+            else:
+                error = getattr(result, "error", None)
+                entries[item.custom_id] = _failed_entry(result.type, str(error) if error else result.type)
+        return entries
+
+class OpenAIBatchBackend:
+    """OpenAI Batch API (JSONL input file, /v1/chat/completions endpoint)."""
+
+    FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+    def __init__(self, client, completion_window: str = "24h"):
+        self.client = client
+        self.completion_window = completion_window
+
+    def submit(self, requests: List[Dict[str, Any]]) -> str:
+        data = "\n".join(json.dumps(request, separators=(",", ":")) for request in requests).encode("utf-8")
+        input_file = self.client.files.create(file=("batch_input.jsonl", io.BytesIO(data)), purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.completion_window
+        )
+        return batch.id
+
+    def is_done(self, batch_id: str) -> bool:
+        return self.client.batches.retrieve(batch_id).status in self.FINAL_STATUSES
+
+    def _read_lines(self, file_id: Optional[str]) -> List[Dict[str, Any]]:
+        if not file_id:
+            return []
+        text = self.client.files.content(file_id).text
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    def results(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        batch = self.client.batches.retrieve(batch_id)
+        entries = {}
+        for line in self._read_lines(batch.output_file_id) + self._read_lines(getattr(batch, "error_file_id", None)):
+            response = line.get("response") or {}
+            if line.get("error") or response.get("status_code") != 200:
+                error = line.get("error") or (response.get("body") or {}).get("error")
+                entries[line["custom_id"]] = _failed_entry("errored", json.dumps(error) if error else "request failed")
+            else:
+                entries[line["custom_id"]] = normalize_openai_completion(response["body"])
+        return entries
+
+def _local_echo(provider: LLMProvider, request: Dict[str, Any]) -> Dict[str, Any]:
+    """Default local responder: echo the prompt, with tiktoken usage counts."""
+    counter = TokenDebugger("gpt-4")
+    params = request["params"] if provider == LLMProvider.ANTHROPIC else request["body"]
+    prompt = params["messages"][-1]["content"]
+    if isinstance(prompt, list):
+        prompt = "".join(block.get("text", "") for block in prompt)
+    text = f"[local batch] {prompt}"
+    input_tokens = counter.count_tokens(json.dumps(params["messages"]))
+    output_tokens = counter.count_tokens(text)
+    if provider == LLMProvider.ANTHROPIC:
+        return {
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens}
+        }
+    return {
+        "choices": [{"message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": input_tokens, "completion_tokens": output_tokens}
+    }
+
+class LocalBatchBackend:
+    """In-process stand-in for a provider batch endpoint.
+
+    Requests are answered by a responder that receives the provider-format
+    batch request and returns an Anthropic Message dict or an OpenAI chat
+    completion body; exceptions become errored entries.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(
+        self,
+        provider: LLMProvider,
+        respond: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+        latency: float = 0.0
+    ):
+        """Initialize the stand-in.
+
+        Args:
+            provider: Provider whose batch request and result formats are used
+            respond: Responder for one request (defaults to echoing the prompt)
+            latency: Seconds before a submitted batch reports as finished
+        """
+        self.provider = provider
+        self.respond = respond or (lambda request: _local_echo(provider, request))
+        self.latency = latency
+        self._batches: Dict[str, Dict[str, Any]] = {}
+
+    def submit(self, requests: List[Dict[str, Any]]) -> str:
+        for request in requests:
+            # Fail like the real endpoint would on malformed packaging
+            if "custom_id" not in request or ("params" if self.provider == LLMProvider.ANTHROPIC else "body") not in request:
+                raise ValueError(f"Malformed batch request: {sorted(request)}")
+        batch_id = f"local_batch_{next(self._ids)}"
+        self._batches[batch_id] = {"requests": requests, "submitted_at": time.monotonic()}
+        return batch_id
+
+    def is_done(self, batch_id: str) -> bool:
+        return time.monotonic() - self._batches[batch_id]["submitted_at"] >= self.latency
+
+    def results(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        entries = {}
+        for request in self._batches.pop(batch_id)["requests"]:
+            try:
+                response = self.respond(request)
+                if self.provider == LLMProvider.ANTHROPIC:
+                    entries[request["custom_id"]] = normalize_anthropic_message(response)
+                else:
+                    entries[request["custom_id"]] = normalize_openai_completion(response)
+            except Exception as e:
+                entries[request["custom_id"]] = _failed_entry("errored", f"{type(e).__name__}: {e}")
+        return entries
+
+def create_batch_backend(provider: LLMProvider, client) -> Any:
+    """Return the batch backend for a provider's client."""
+    if provider == LLMProvider.ANTHROPIC:
+        return AnthropicBatchBackend(client)
+    return OpenAIBatchBackend(client)
+
+def wait_for_batch(backend, batch_id: str, poll_interval: float = 30.0, timeout: Optional[float] = None) -> None:
+    """Poll a batch until it has finished.
+
+    Raises:
+        TimeoutError: If the batch is still running after timeout seconds
+    """
+    start = time.monotonic()
+    while not backend.is_done(batch_id):
+        if timeout is not None and time.monotonic() - start >= timeout:
+            raise TimeoutError(f"Batch {batch_id} did not finish within {timeout} seconds")
+        time.sleep(poll_interval)
+
+def response_text(message: Optional[Dict[str, Any]]) -> str:
+    """Return the text of a normalized assistant message."""
+    if not message:
+        return ""
+    content = message.get("content")
+    if isinstance(content, list):
+        return "".join(block.get("text", "") for block in content if block.get("type") == "text")
+    return content or ""
+
+def requested_tool_calls(message: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Return the tool calls a normalized assistant message asked for, as name/id/input dicts."""
+    if not message:
+        return []
+    content = message.get("content")
+    if isinstance(content, list):
+        return [
+            {"id": block["id"], "name": block["name"], "input": block["input"]}
+            for block in content if block.get("type") == "tool_use"
+        ]
+    calls = []
+    for tool_call in message.get("tool_calls") or []:
+        try:
+            arguments = json.loads(tool_call["function"]["arguments"] or "{}")
+        except json.JSONDecodeError:
+            arguments = {}
+        calls.append({"id": tool_call["id"], "name": tool_call["function"]["name"], "input": arguments})
+    return calls
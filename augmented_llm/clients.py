@@ -0,0 +1,122 @@
+"""
+Process-wide registry of provider SDK clients.
+
+Provider SDKs are imported on first use, and clients are shared between
+AugmentedLLM sessions so they reuse the same keep-alive HTTP connection pool.
+"""
+
+import threading
+from typing import Dict, Any, Optional, Tuple, Union
+from .providers import LLMProvider
+
+# Connection pool limits applied to clients created after configure_client_pool()
+_pool_config: Dict[str, Any] = {
+    "max_connections": 100,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 30.0
+}
+
+_clients: Dict[Tuple, Any] = {}
+_lock = threading.Lock()
+_env_loaded = False
+
+def load_environment() -> None:
+    """Load variables from a .env file once per process."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    from dotenv import load_dotenv
+    load_dotenv()
+    _env_loaded = True
+
+def configure_client_pool(
+    max_connections: Optional[int] = None,
+    max_keepalive_connections: Optional[int] = None,
+    keepalive_expiry: Optional[float] = None
+) -> None:
+    """Set connection pool limits for clients created from now on.
+
+    Args:
+        max_connections: Maximum concurrent connections per client
+        max_keepalive_connections: Maximum idle connections kept open
+        keepalive_expiry: Seconds an idle connection is kept alive
+    """
+    with _lock:
+        if max_connections is not None:
+            _pool_config["max_connections"] = max_connections
+        if max_keepalive_connections is not None:
+            _pool_config["max_keepalive_connections"] = max_keepalive_connections
+        if keepalive_expiry is not None:
+            _pool_config["keepalive_expiry"] = keepalive_expiry
+
+def _create_client(provider: LLMProvider, **client_kwargs):
+    """Import the provider SDK and build a client with a pooled HTTP transport."""
+    import httpx
+    limits = httpx.Limits(**_pool_config)
+    if provider == LLMProvider.ANTHROPIC:
+        import anthropic
+        return anthropic.Anthropic(http_client=anthropic.DefaultHttpxClient(limits=limits), **client_kwargs)
+    import openai
+    return openai.OpenAI(http_client=openai.DefaultHttpxClient(limits=limits), **client_kwargs)
+
+def get_client(provider: Union[LLMProvider, str], **client_kwargs):
+    """Get the shared client for a provider, creating it on first use.
+
+    Args:
+        provider: The LLM provider
+        client_kwargs: Extra SDK client arguments (e.g. api_key); each distinct
+            set of arguments gets its own shared client
+
+    Returns:
+        An anthropic.Anthropic or openai.OpenAI client
+    """
+    if isinstance(provider, str):
+        provider = LLMProvider(provider.lower())
+    key = (provider.value, tuple(sorted(client_kwargs.items())))
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            load_environment()
+            client = _create_client(provider, **client_kwargs)
+            _clients[key] = client
+        return client
+
+def create_async_client(provider: Union[LLMProvider, str], **client_kwargs):
+    """Build an async client with the configured pool limits.
+
+    Async clients hold connections bound to the event loop that opened them,
+    so they are not shared process-wide; create one per event loop.
+
+    Returns:
+        An anthropic.AsyncAnthropic or openai.AsyncOpenAI client
+    """
+    if isinstance(provider, str):
+        provider = LLMProvider(provider.lower())
+    load_environment()
+    import httpx
+    with _lock:
+        limits = httpx.Limits(**_pool_config)
+    if provider == LLMProvider.ANTHROPIC:
+        import anthropic
+        return anthropic.AsyncAnthropic(http_client=anthropic.DefaultAsyncHttpxClient(limits=limits), **client_kwargs)
+    import openai
+    return openai.AsyncOpenAI(http_client=openai.DefaultAsyncHttpxClient(limits=limits), **client_kwargs)
+
+def close_clients() -> None:
+    """Close all shared clients and their connection pools."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        try:
+            client.close()
+        except Exception as e:
+            print(f"Error closing client: {e}")
+
+def get_client_stats() -> Dict[str, Any]:
+    """Return the number of shared clients per provider and the pool limits."""
+    with _lock:
+        counts: Dict[str, int] = {}
+        for provider_value, _ in _clients:
+            counts[provider_value] = counts.get(provider_value, 0) + 1
+        return {"clients": counts, "pool": dict(_pool_config)}
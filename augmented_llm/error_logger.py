@@ -1,74 +1,264 @@
+"""
+Deduplicated, non-blocking capture of tool execution errors.
+
+Errors are fingerprinted by tool name, exception type and the code path of the
+traceback (file and function of every frame, without line numbers or the
+exception message), so repeats of the same failure collapse into one entry.
+The request path only computes the fingerprint and queues a record; a
+background thread writes one sample file per fingerprint, with its context
+truncated to a size budget, and keeps the counters in index.json.
+
+Regression tests are generated offline from the samples:
+
+    python -m augmented_llm.error_logger [--log-dir logs/tool_errors] [--output tests/tool_error_tests]
+"""
+
+import argparse
+import atexit
+import hashlib
 import json
 import os
-from datetime import datetime
-from typing import Dict, Any
+import queue
+import threading
 import traceback
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+_STOP = object()
+
+INDEX_FILE = "index.json"
+
+def error_fingerprint(tool_name: str, error: BaseException) -> str:
+    """Fingerprint an error by tool, exception type and traceback code path."""
+    frames = []
+    tb = error.__traceback__
+    while tb is not None:
+        code = tb.tb_frame.f_code
+        frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        tb = tb.tb_next
+    key = "|".join([tool_name, type(error).__module__, type(error).__qualname__, *frames])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+def _clip(value: Any, limit: int) -> Any:
+    """Shorten long strings so one oversized value cannot blow the size budget."""
+    if isinstance(value, str) and len(value) > limit:
+        return value[:limit] + f"... [truncated {len(value) - limit} chars]"
+    return value
+
+def truncate_context(context: Dict[str, Any], max_chars: int) -> Dict[str, Any]:
+    """Fit a context dict into roughly max_chars of JSON.
+
+    The most recent messages that fit are kept and the number dropped is
+    recorded as "messages_truncated"; other long values are clipped.
+    """
+    truncated = {}
+    for key, value in context.items():
+        if key != "messages":
+            truncated[key] = _clip(value, max_chars) if isinstance(value, str) else value
+    budget = max_chars - len(json.dumps(truncated, default=str))
+    messages = context.get("messages")
+    if isinstance(messages, list):
+        kept = []
+        for message in reversed(messages):
+            size = len(json.dumps(message, default=str))
+            if size > budget:
+                break
+            kept.append(message)
+            budget -= size
+        truncated["messages"] = kept[::-1]
+        truncated["messages_truncated"] = len(messages) - len(kept)
+    return truncated
 
 class ToolErrorLogger:
-    def __init__(self, log_dir: str = "logs/tool_errors"):
+    def __init__(self, log_dir: str = "logs/tool_errors", max_context_chars: int = 50000):
+        """Start an error logger.
+
+        Args:
+            log_dir: Directory for sample files and the index
+            max_context_chars: Approximate size limit of the context stored
+                with each sample (older messages are dropped first)
+        """
         self.log_dir = log_dir
+        self.max_context_chars = max_context_chars
         os.makedirs(log_dir, exist_ok=True)
-        
-    def log_error(self, 
-                  tool_name: str, 
-                  tool_input: Dict[str, Any], 
+
+        # Counters survive restarts, so a known failure never writes a second sample
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        index_path = os.path.join(log_dir, INDEX_FILE)
+        if os.path.exists(index_path):
+            try:
+                with open(index_path) as f:
+                    self._stats = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"\n[Error Log] Could not read {index_path}, starting a new index: {e}")
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="tool-error-logger", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def sample_path(self, tool_name: str, fingerprint: str) -> str:
+        """Path of the sample file for a fingerprint."""
+        return os.path.join(self.log_dir, f"{tool_name}_{fingerprint}.json")
+
+    def log_error(self,
+                  tool_name: str,
+                  tool_input: Dict[str, Any],
                   error: Exception,
                   provider: str,
                   context: Dict[str, Any] = None) -> str:
-        """Log a tool execution error with full context for debugging.
-        
+        """Record a tool execution error (never blocks on disk I/O).
+
+        Only the first occurrence of a fingerprint is stored with its input
+        and context; repeats just increment its counter.
+
         Args:
             tool_name: Name of the tool that failed
             tool_input: Input parameters passed to the tool
             error: The exception that occurred
             provider: The LLM provider being used (Anthropic/OpenAI)
             context: Additional context about the error
-            
+
         Returns:
-            Path to the error log file
+            Path to the sample file for this error's fingerprint (written
+            asynchronously; call flush() before reading it)
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{timestamp}_{tool_name}_error.json"
-        filepath = os.path.join(self.log_dir, filename)
-        
-        error_data = {
-            "timestamp": datetime.now().isoformat(),
-            "tool_name": tool_name,
-            "tool_input": tool_input,
-            "error": {
-                "type": type(error).__name__,
-                "message": str(error),
-                "traceback": traceback.format_exc()
-            },
-            "provider": provider,
-            "context": context or {}
-        }
-        
-        with open(filepath, "w") as f:
-            json.dump(error_data, f, indent=2, default=str)
-            
-        print(f"\n[Error Log] Tool execution error logged to: {filepath}")
-        return filepath
-        
+        fingerprint = error_fingerprint(tool_name, error)
+        now = datetime.now().isoformat()
+        with self._lock:
+            stats = self._stats.get(fingerprint)
+            is_new = stats is None
+            if is_new:
+                stats = self._stats[fingerprint] = {
+                    "tool_name": tool_name,
+                    "error_type": type(error).__name__,
+                    "message": _clip(str(error), 500),
+                    "count": 0,
+                    "first_seen": now,
+                    "sample": os.path.basename(self.sample_path(tool_name, fingerprint))
+                }
+            stats["count"] += 1
+            stats["last_seen"] = now
+        if self._closed:
+            return self.sample_path(tool_name, fingerprint)
+
+        if is_new:
+            context = dict(context or {})
+            if isinstance(context.get("messages"), list):
+                # The live history keeps growing; the writer gets a snapshot
+                context["messages"] = list(context["messages"])
+            self._queue.put({
+                "fingerprint": fingerprint,
+                "timestamp": now,
+                "tool_name": tool_name,
+                "tool_input": tool_input,
+                "error": {
+                    "type": type(error).__name__,
+                    "message": str(error),
+                    "traceback": "".join(traceback.format_exception(type(error), error, error.__traceback__))
+                },
+                "provider": provider,
+                "context": context
+            })
+            print(f"\n[Error Log] New tool error {fingerprint} logged to: {self.sample_path(tool_name, fingerprint)}")
+        else:
+            self._queue.put(fingerprint)
+        return self.sample_path(tool_name, fingerprint)
+
     def create_test_from_error(self, error_log_path: str) -> str:
-        """Generate a test file from an error log to help reproduce and fix the issue.
-        
-        Args:
-            error_log_path: Path to the error log file
-            
-        Returns:
-            Path to the generated test file
-        """
-        with open(error_log_path) as f:
-            error_data = json.load(f)
-            
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        test_filename = f"test_{error_data['tool_name']}_{timestamp}.py"
-        test_filepath = os.path.join("tests", "tool_error_tests", test_filename)
-        
-        os.makedirs(os.path.dirname(test_filepath), exist_ok=True)
-        
-        test_code = f'''import pytest
+        """Generate a test file from an error sample (see create_test_from_error)."""
+        return create_test_from_error(error_log_path)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Counters for every fingerprint seen, most frequent first."""
+        with self._lock:
+            entries = [{"fingerprint": fp, **stats} for fp, stats in self._stats.items()]
+        return sorted(entries, key=lambda entry: entry["count"], reverse=True)
+
+    def flush(self) -> None:
+        """Block until every queued sample and counter update has been written."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Write the remaining records and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            items = [self._queue.get()]
+            # Rewrite the index once per burst instead of once per error
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is _STOP for item in items)
+            try:
+                for item in items:
+                    if isinstance(item, dict):
+                        self._write_sample(item)
+                self._write_index()
+            except Exception as e:
+                print(f"\n[Error Log] Error writing tool error log: {e}")
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write_sample(self, record: Dict[str, Any]) -> None:
+        record["context"] = truncate_context(record["context"], self.max_context_chars)
+        record["tool_input"] = {key: _clip(value, self.max_context_chars) for key, value in record["tool_input"].items()}
+        with open(self.sample_path(record["tool_name"], record["fingerprint"]), "w") as f:
+            json.dump(record, f, indent=2, default=str)
+
+    def _write_index(self) -> None:
+        with self._lock:
+            data = json.dumps(self._stats, indent=2, default=str)
+        path = os.path.join(self.log_dir, INDEX_FILE)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+# Loggers shared by all sessions in the process, keyed by log directory
+_loggers: Dict[str, ToolErrorLogger] = {}
+_loggers_lock = threading.Lock()
+
+def get_tool_error_logger(log_dir: str = "logs/tool_errors", **kwargs) -> ToolErrorLogger:
+    """Get (or start) the process-wide error logger for a log directory."""
+    with _loggers_lock:
+        logger = _loggers.get(log_dir)
+        if logger is None or logger._closed:
+            logger = ToolErrorLogger(log_dir, **kwargs)
+            _loggers[log_dir] = logger
+        return logger
+
+def create_test_from_error(error_log_path: str, output_dir: str = os.path.join("tests", "tool_error_tests")) -> str:
+    """Generate a test file from an error sample to help reproduce and fix the issue.
+
+    Args:
+        error_log_path: Path to the error sample file
+        output_dir: Directory the test file is written to
+
+    Returns:
+        Path to the generated test file
+    """
+    with open(error_log_path) as f:
+        error_data = json.load(f)
+
+    fingerprint = error_data.get("fingerprint") or datetime.now().strftime("%Y%m%d_%H%M%S")
+    test_filename = f"test_{error_data['tool_name']}_{fingerprint}.py"
+    test_filepath = os.path.join(output_dir, test_filename)
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    test_code = f'''import pytest
 import os
 import sys
 from pathlib import Path
@@ -77,40 +267,66 @@ from pathlib import Path
 project_root = str(Path(__file__).parent.parent.parent)
 sys.path.insert(0, project_root)
 
-from utils.augmented_llm import AugmentedLLM
-from utils.augmented_llm.providers import LLMProvider
+from augmented_llm import AugmentedLLM
+from augmented_llm.providers import LLMProvider
 
 def test_{error_data["tool_name"]}_error_reproduction():
-    """Test to reproduce tool execution error from {error_data["timestamp"]}"""
+    """Test to reproduce tool execution error {fingerprint} from {error_data["timestamp"]}"""
     # Setup
     llm = AugmentedLLM(
         system_prompt="Test prompt",
         provider=LLMProvider.{error_data["provider"].upper()},
     )
-    
+
     # Tool input that caused the error
     tool_input = {json.dumps(error_data["tool_input"], indent=4)}
-    
-    # Original error: {error_data["error"]["message"]}
-    # Attempt to execute the tool
-    try:
-        result = llm.execute_tool(
-            tool_name="{error_data["tool_name"]}",
-            tool_input=tool_input
-        )
-        assert False, f"Expected error but got result: {{result}}"
-    except Exception as e:
-        # Verify we get the same type of error
-        assert type(e).__name__ == "{error_data["error"]["type"]}"
-        # TODO: Add more specific assertions about the error
+
+    # Original error ({error_data["error"]["type"]}): {error_data["error"]["message"].splitlines()[0] if error_data["error"]["message"] else ""}
+    # Attempt to execute the tool; failures are returned as an error message
+    result = llm.execute_tool(
+        tool_name="{error_data["tool_name"]}",
+        tool_input=tool_input
+    )
+    assert not result.startswith("Error executing tool"), result
+    # TODO: Add more specific assertions about the result
 
 if __name__ == "__main__":
     # This allows running the test directly with python
     pytest.main([__file__])
 '''
-        
-        with open(test_filepath, "w") as f:
-            f.write(test_code)
-            
-        print(f"\n[Test Generated] Test file created at: {test_filepath}")
-        return test_filepath 
\ No newline at end of file
+
+    with open(test_filepath, "w") as f:
+        f.write(test_code)
+
+    print(f"\n[Test Generated] Test file created at: {test_filepath}")
+    return test_filepath
+
+def generate_tests(log_dir: str = "logs/tool_errors", output_dir: str = os.path.join("tests", "tool_error_tests")) -> List[str]:
+    """Generate one test file per error fingerprint that has a sample.
+
+    Returns:
+        Paths of the generated test files
+    """
+    index_path = os.path.join(log_dir, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return []
+    with open(index_path) as f:
+        stats = json.load(f)
+    paths = []
+    for fingerprint, entry in sorted(stats.items(), key=lambda item: item[1]["count"], reverse=True):
+        sample_path = os.path.join(log_dir, entry["sample"])
+        if os.path.exists(sample_path):
+            paths.append(create_test_from_error(sample_path, output_dir))
+    return paths
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate regression tests from logged tool errors.")
+    parser.add_argument("--log-dir", default="logs/tool_errors")
+    parser.add_argument("--output", default=os.path.join("tests", "tool_error_tests"))
+    args = parser.parse_args(argv)
+
+    paths = generate_tests(args.log_dir, args.output)
+    print(f"Generated {len(paths)} test file(s) in {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+from typing import Dict, Any, List, Optional, Callable, Tuple, Deque
+from collections import deque
+import json
+from .providers import LLMProvider
+from .token_debugger import get_encoding
+
+def _default_token_counter(text: str) -> int:
+    """Count tokens with the shared, lazily loaded GPT-4 family encoding."""
+    return len(get_encoding("gpt-4").encode_ordinary(text))
+
+def _content_to_text(content: Any) -> str:
+    """Flatten message content to a string for counting and summarizing."""
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    return json.dumps(content)
+
+def is_tool_result_message(message: Dict[str, Any]) -> bool:
+    """Check if a message carries tool output for either provider."""
+    if message["role"] == "tool":
+        return True
+    content = message.get("content")
+    return (
+        message["role"] == "user"
+        and isinstance(content, list)
+        and any(block.get("type") == "tool_result" for block in content)
+    )
+
+def is_turn_start(message: Dict[str, Any]) -> bool:
+    """Check if a message is a real user prompt (not a tool result) that opens a turn."""
+    return message["role"] == "user" and not is_tool_result_message(message)
+
+class HistoryManager:
+    """Keep conversation history within a token budget.
+
+    Trimming is applied in stages until the history fits the budget:
+
+    1. Tool results older than ``keep_last_turns`` turns are compressed to a
+       short summary.
+    2. Those tool results are then dropped entirely, leaving a placeholder.
+    3. Whole turns are removed from the front of the history.
+
+    Only tool *content* is rewritten in the first two stages and whole turns
+    are removed in the last, so every tool call keeps its matching result for
+    both Anthropic (tool_use / tool_result blocks) and OpenAI (tool_calls /
+    role="tool") message formats.
+    """
+
+    def __init__(
+        self,
+        token_budget: int,
+        keep_last_turns: int = 2,
+        compress_tool_results: bool = True,
+        drop_tool_results: bool = True,
+        summary_chars: int = 200,
+        token_counter: Optional[Callable[[str], int]] = None,
+        max_trim_reports: int = 100,
+        debug: bool = False
+    ):
+        """Initialize the history manager.
+
+        Args:
+            token_budget: Maximum number of tokens the message history may use
+            keep_last_turns: Number of most recent turns that are never modified
+            compress_tool_results: Whether old tool results may be summarized
+            drop_tool_results: Whether old tool results may be replaced by a placeholder
+            summary_chars: Number of characters kept when compressing a tool result
+            token_counter: Function returning the token count of a string
+            max_trim_reports: Number of most recent trim reports kept in trim_history
+            debug: Print a line every time the history is trimmed
+        """
+        if token_budget <= 0:
+            raise ValueError("token_budget must be positive")
+        if keep_last_turns < 1:
+            raise ValueError("keep_last_turns must be at least 1")
+        self.token_budget = token_budget
+        self.keep_last_turns = keep_last_turns
+        self.compress_tool_results = compress_tool_results
+        self.drop_tool_results = drop_tool_results
+        self.summary_chars = summary_chars
+        self.token_counter = token_counter or _default_token_counter
+        self.max_trim_reports = max_trim_reports
+        self.debug = debug
+
+        # Token counts keyed by message id; the message is kept alongside so the id stays valid
+        self._token_cache: Dict[int, Tuple[Dict[str, Any], int]] = {}
+        self.total_tokens_saved = 0
+        self.trim_count = 0
+        self.trim_history: Deque[Dict[str, Any]] = deque(maxlen=max_trim_reports)
+
+    def clone(self) -> "HistoryManager":
+        """Return a manager with the same settings and no recorded state."""
+        return HistoryManager(
+            token_budget=self.token_budget,
+            keep_last_turns=self.keep_last_turns,
+            compress_tool_results=self.compress_tool_results,
+            drop_tool_results=self.drop_tool_results,
+            summary_chars=self.summary_chars,
+            token_counter=self.token_counter,
+            max_trim_reports=self.max_trim_reports,
+            debug=self.debug
+        )
+
+    def count_message_tokens(self, message: Dict[str, Any]) -> int:
+        """Count the tokens of a single message, caching the result."""
+        cached = self._token_cache.get(id(message))
+        if cached is not None and cached[0] is message:
+            return cached[1]
+        text = _content_to_text(message.get("content"))
+        if message.get("tool_calls"):
+            text += json.dumps(message["tool_calls"])
+        count = self.token_counter(text)
+        self._token_cache[id(message)] = (message, count)
+        return count
+
+    def count_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        """Count the tokens of a message list."""
+        return sum(self.count_message_tokens(msg) for msg in messages)
+
+    def _turn_starts(self, messages: List[Dict[str, Any]]) -> List[int]:
+        """Return the index of the first message of every turn."""
+        return [i for i, msg in enumerate(messages) if is_turn_start(msg)]
+
+    def _rewrite_tool_result(self, message: Dict[str, Any], make_text: Callable[[str], str]) -> Dict[str, Any]:
+        """Return a copy of a tool result message with its output replaced."""
+        if message["role"] == "tool":
+            return {**message, "content": make_text(_content_to_text(message["content"]))}
+
+        new_blocks = []
+        for block in message["content"]:
+            if block.get("type") == "tool_result":
+                block = {**block, "content": make_text(_content_to_text(block.get("content")))}
+            new_blocks.append(block)
+        return {**message, "content": new_blocks}
+
+    def _summarize(self, text: str) -> str:
+        """Compress a tool output to its first summary_chars characters."""
+        if text.startswith("[Tool output") or len(text) <= self.summary_chars:
+            return text
+        omitted = len(text) - self.summary_chars
+        return f"[Tool output compressed, {omitted} chars omitted] {text[:self.summary_chars]}"
+
+    @staticmethod
+    def _drop(text: str) -> str:
+        """Replace a tool output with a placeholder."""
+        return "[Tool output dropped to save context]"
+
+    def trim(self, messages: List[Dict[str, Any]], provider: Optional[LLMProvider] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Trim a message history to fit within the token budget.
+
+        Args:
+            messages: The conversation history (not modified)
+            provider: The provider the history is formatted for (informational)
+
+        Returns:
+            Tuple of the trimmed message list and a report dict with
+            tokens_before, tokens_after, tokens_saved and the actions taken
+        """
+        # Drop cached counts for messages that are no longer in the history
+        live_ids = {id(msg) for msg in messages}
+        self._token_cache = {k: v for k, v in self._token_cache.items() if k in live_ids}
+
+        tokens_before = self.count_tokens(messages)
+        report = {
+            "provider": provider.value if provider else None,
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_before,
+            "tokens_saved": 0,
+            "compressed_tool_results": 0,
+            "dropped_tool_results": 0,
+            "dropped_turns": 0
+        }
+        if tokens_before <= self.token_budget:
+            return messages, report
+
+        messages = list(messages)
+        total = tokens_before
+        turn_starts = self._turn_starts(messages)
+
+        # Messages before this index are eligible for trimming
+        if len(turn_starts) > self.keep_last_turns:
+            protected_from = turn_starts[-self.keep_last_turns]
+        else:
+            protected_from = 0
+
+        stages = []
+        if self.compress_tool_results:
+            stages.append(("compressed_tool_results", self._summarize))
+        if self.drop_tool_results:
+            stages.append(("dropped_tool_results", self._drop))
+
+        for action, make_text in stages:
+            for i in range(protected_from):
+                if total <= self.token_budget:
+                    break
+                if not is_tool_result_message(messages[i]):
+                    continue
+                old_tokens = self.count_message_tokens(messages[i])
+                new_message = self._rewrite_tool_result(messages[i], make_text)
+                new_tokens = self.count_message_tokens(new_message)
+                if new_tokens < old_tokens:
+                    messages[i] = new_message
+                    total -= old_tokens - new_tokens
+                    report[action] += 1
+
+        # Remove whole turns from the front, never touching the protected turns
+        droppable_starts = [i for i in turn_starts if i < protected_from] + [protected_from]
+        cut = 0
+        for next_start in droppable_starts[1:]:
+            if total <= self.token_budget:
+                break
+            total -= self.count_tokens(messages[cut:next_start])
+            cut = next_start
+            report["dropped_turns"] += 1
+        if cut:
+            messages = messages[cut:]
+
+        report["tokens_after"] = total
+        report["tokens_saved"] = tokens_before - total
+        self.total_tokens_saved += report["tokens_saved"]
+        self.trim_count += 1
+        self.trim_history.append(report)
+
+        if self.debug:
+            print(
+                f"\n[Debug] History trimmed: {tokens_before:,} -> {total:,} tokens "
+                f"(saved {report['tokens_saved']:,})"
+            )
+        return messages, report
@@ -0,0 +1,233 @@
+"""
+Timing hooks and metrics aggregation for LLM requests.
+
+AugmentedLLM and OpenAIChatInterface call every registered hook with an event
+dict. Event names:
+
+- request_start: a generate()/completion call started
+- first_token:   the first token of the response arrived (includes "ttft")
+- tool_start:    a tool is about to run (includes "tool")
+- tool_end:      a tool finished (includes "tool", "duration", "status")
+- failover:      the session switched provider (includes "from_provider",
+                 "to_provider", "reason")
+- stream_end:    the request finished (includes "duration", "model_time",
+                 "tool_time", "output_tokens", "status")
+- usage:         the provider reported usage for one API call (includes
+                 "input_tokens", "output_tokens", "cache_read_input_tokens",
+                 "cache_creation_input_tokens" and "latency"; "batch" for
+                 batch results)
+
+Every event also carries "event", "timestamp", "session_id", "provider" and
+"model". MetricsAggregator is a ready-made hook that keeps rolling
+percentiles and exports them in Prometheus text format; UsageLedger (see
+usage_ledger.py) persists usage events.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Callable, Optional, Tuple, Deque, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+Hook = Callable[[Dict[str, Any]], None]
+
+def emit_event(hooks: List[Hook], event: str, **data) -> None:
+    """Call every hook with an event; a failing hook never breaks the request."""
+    if not hooks:
+        return
+    payload = {"event": event, "timestamp": time.time(), **data}
+    for hook in hooks:
+        try:
+            hook(payload)
+        except Exception as e:
+            print(f"\n[Debug] Error in instrumentation hook: {e}")
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in items) + "}"
+
+class MetricsAggregator:
+    """Hook that aggregates timing events into rolling percentiles.
+
+    Each metric keeps the last ``window_size`` observations per label set for
+    percentiles, plus all-time sum and count.
+    """
+
+    METRICS = {
+        "time_to_first_token_seconds": "Time from request start to the first model token",
+        "request_duration_seconds": "Total request duration including tool calls",
+        "model_time_seconds": "Request time spent waiting on the model",
+        "tool_time_seconds": "Request time spent running tools",
+        "tool_duration_seconds": "Duration of individual tool calls",
+        "output_tokens_per_second": "Output tokens per second of model time"
+    }
+
+    def __init__(
+        self,
+        window_size: int = 1000,
+        quantiles: Tuple[float, ...] = (0.5, 0.9, 0.99),
+        prefix: str = "augmented_llm_"
+    ):
+        """Initialize the aggregator.
+
+        Args:
+            window_size: Number of recent observations kept per metric and label set
+            quantiles: Quantiles reported in summaries and the Prometheus export
+            prefix: Prefix for exported metric names
+        """
+        self.window_size = window_size
+        self.quantiles = quantiles
+        self.prefix = prefix
+        self._windows: Dict[Tuple[str, Tuple], Deque[float]] = {}
+        self._sums: Dict[Tuple[str, Tuple], float] = {}
+        self._counts: Dict[Tuple[str, Tuple], int] = {}
+        self._counters: Dict[Tuple[str, Tuple], int] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        name = event["event"]
+        model = (("model", event.get("model") or "unknown"),)
+        if name == "request_start":
+            self._increment("requests_total", model)
+        elif name == "first_token":
+            self.observe("time_to_first_token_seconds", event["ttft"], model)
+        elif name == "tool_end":
+            tool = (("tool", event["tool"]),)
+            self.observe("tool_duration_seconds", event["duration"], tool)
+            self._increment("tool_calls_total", tool + (("status", event.get("status", "ok")),))
+        elif name == "failover":
+            self._increment("failovers_total", (
+                ("from_provider", event["from_provider"]),
+                ("to_provider", event["to_provider"]),
+                ("reason", event["reason"])
+            ))
+        elif name == "stream_end":
+            self.observe("request_duration_seconds", event["duration"], model)
+            self.observe("model_time_seconds", event["model_time"], model)
+            self.observe("tool_time_seconds", event["tool_time"], model)
+            if event.get("output_tokens") and event["model_time"] > 0:
+                self.observe("output_tokens_per_second", event["output_tokens"] / event["model_time"], model)
+            if event.get("status", "ok") != "ok":
+                self._increment("request_errors_total", model)
+
+    def observe(self, metric: str, value: float, labels: Tuple[Tuple[str, str], ...] = ()) -> None:
+        """Record one observation of a metric."""
+        key = (metric, labels)
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = deque(maxlen=self.window_size)
+            window.append(value)
+            self._sums[key] = self._sums.get(key, 0.0) + value
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def _increment(self, counter: str, labels: Tuple[Tuple[str, str], ...]) -> None:
+        key = (counter, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+    @staticmethod
+    def _percentile(sorted_values: List[float], q: float) -> float:
+        """Nearest-rank percentile of an already sorted list."""
+        if not sorted_values:
+            return float("nan")
+        rank = max(1, math.ceil(q * len(sorted_values)))
+        return sorted_values[rank - 1]
+
+    def percentile(self, metric: str, q: float, **labels) -> float:
+        """Return a rolling percentile of a metric, across all label sets unless labels are given."""
+        wanted = tuple(sorted(labels.items()))
+        with self._lock:
+            values = [
+                v for (name, key_labels), window in self._windows.items()
+                if name == metric and (not wanted or tuple(sorted(key_labels)) == wanted)
+                for v in window
+            ]
+        return self._percentile(sorted(values), q)
+
+    def get_summary(self) -> Dict[str, Any]:
+        """Return rolling percentiles, sums and counts per metric and label set."""
+        with self._lock:
+            snapshot = {key: sorted(window) for key, window in self._windows.items()}
+            sums = dict(self._sums)
+            counts = dict(self._counts)
+            counters = dict(self._counters)
+        summary: Dict[str, Any] = {"metrics": {}, "counters": {}}
+        for (metric, labels), values in snapshot.items():
+            summary["metrics"].setdefault(metric, []).append({
+                "labels": dict(labels),
+                "quantiles": {q: self._percentile(values, q) for q in self.quantiles},
+                "sum": sums[(metric, labels)],
+                "count": counts[(metric, labels)]
+            })
+        for (counter, labels), value in counters.items():
+            summary["counters"].setdefault(counter, []).append({"labels": dict(labels), "value": value})
+        return summary
+
+    def export_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        summary = self.get_summary()
+        lines = []
+        for metric, series in sorted(summary["metrics"].items()):
+            name = self.prefix + metric
+            lines.append(f"# HELP {name} {self.METRICS.get(metric, metric)}")
+            lines.append(f"# TYPE {name} summary")
+            for entry in series:
+                labels = tuple(entry["labels"].items())
+                for q, value in entry["quantiles"].items():
+                    lines.append(f"{name}{_format_labels(labels, ('quantile', str(q)))} {value}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {entry['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {entry['count']}")
+        for counter, series in sorted(summary["counters"].items()):
+            name = self.prefix + counter
+            lines.append(f"# TYPE {name} counter")
+            for entry in series:
+                lines.append(f"{name}{_format_labels(tuple(entry['labels'].items()))} {entry['value']}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> str:
+        """Atomically write the Prometheus export to a file (e.g. for node_exporter's textfile collector)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.export_prometheus())
+        os.replace(tmp_path, path)
+        return path
+
+    def serve_prometheus(self, port: int = 9464, host: str = "127.0.0.1") -> "ThreadingHTTPServer":
+        """Serve the Prometheus export over HTTP from a background thread.
+
+        Returns:
+            The running server; call shutdown() on it to stop serving
+        """
+        # Imported lazily to keep package import fast
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        aggregator = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = aggregator.export_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        return server
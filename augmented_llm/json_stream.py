@@ -0,0 +1,117 @@
+"""
+Incremental parsing of JSON that arrives in stream deltas.
+
+IncrementalJSONParser scans each delta once, tracking string, escape and
+nesting state, so it knows exactly when the top-level value is complete
+without re-parsing the buffer. Deltas are kept in a list and joined and
+decoded a single time at completion, so total work is O(total bytes) however
+the input is split.
+"""
+
+import json
+import re
+from typing import Any, List, Optional
+
+# Characters that can change the scanner state; everything else is skipped in C
+_STRUCTURAL = re.compile(r'[{}\[\]"\\]')
+
+class IncrementalJSONParser:
+    def __init__(self):
+        """Initialize an empty parser."""
+        self._chunks: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape_pending = False
+        self._started = False
+        self._complete = False
+        self._value: Any = None
+        self._parsed = False
+        self.size = 0
+
+    @property
+    def complete(self) -> bool:
+        """True once the top-level object or array has been closed."""
+        return self._complete
+
+    def feed(self, chunk: str) -> bool:
+        """Consume the next delta.
+
+        Args:
+            chunk: Next piece of the JSON text
+
+        Returns:
+            True if the top-level value is complete
+        """
+        if not chunk or self._complete:
+            return self._complete
+        self._chunks.append(chunk)
+        self.size += len(chunk)
+
+        if not self._started:
+            stripped = chunk.lstrip()
+            if not stripped:
+                return False
+            self._started = True
+            if stripped[0] not in "{[":
+                # Scalars have no closing delimiter; they complete at close()
+                return False
+
+        skip_at = 0 if self._escape_pending else -1
+        self._escape_pending = False
+        for match in _STRUCTURAL.finditer(chunk):
+            pos = match.start()
+            if pos == skip_at:
+                continue
+            char = match.group()
+            if self._in_string:
+                if char == "\\":
+                    skip_at = pos + 1
+                    if skip_at == len(chunk):
+                        self._escape_pending = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._complete = True
+                    break
+        return self._complete
+
+    @property
+    def text(self) -> str:
+        """The raw text received so far."""
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def value(self) -> Any:
+        """Decode the completed value (decoded once and cached).
+
+        Raises:
+            ValueError: If the value is not complete yet
+            json.JSONDecodeError: If the text is not valid JSON
+        """
+        if not self._complete:
+            raise ValueError("JSON value is not complete")
+        if not self._parsed:
+            self._value = json.loads(self.text)
+            self._parsed = True
+        return self._value
+
+    def close(self, default: Optional[Any] = None) -> Any:
+        """Finish the input (e.g. at the end of a content block) and decode it.
+
+        Args:
+            default: Value returned when no JSON was received
+
+        Returns:
+            The decoded value, or default for empty input
+        """
+        if not self._started:
+            return default
+        self._complete = True
+        return self.value()
@@ -1,24 +1,58 @@
-import anthropic
-from openai import OpenAI
-from typing import Dict, Any, List, Optional, Callable, Union, Generator
+from typing import Dict, Any, List, Optional, Callable, Union, Generator, Tuple
 import json
-from dotenv import load_dotenv
 import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from .token_debugger import TokenDebugger
 from .providers import LLMProvider, get_tool_config, format_tool_result
-from .error_logger import ToolErrorLogger
-from .model_costs import get_model_type
-from .anthropic_handler import process_anthropic_stream, create_anthropic_stream, format_tool_result_message as format_anthropic_result
+from .error_logger import get_tool_error_logger
+from .history_manager import HistoryManager
+from .tool_cache import ToolResultCache
+from .rate_limiter import RateLimiter, get_rate_limiter
+from .clients import get_client, load_environment
+from .session_journal import get_session_journal
+from .instrumentation import Hook, emit_event
+from .message_translation import translate_messages
+from .routing import PrefetchedStream
+from .stream_events import (
+    StreamEvent,
+    ToolResult,
+    ToolRoundContinue,
+    ToolIterationLimit,
+    StreamError,
+    events_to_text
+)
+from .model_costs import get_model_info
+from .anthropic_handler import (
+    process_anthropic_stream,
+    create_anthropic_stream,
+    is_anthropic_content_event,
+    build_cached_system,
+    add_tool_cache_breakpoint,
+    add_history_cache_breakpoint,
+    build_anthropic_batch_request,
+    format_tool_results_message as format_anthropic_results
+)
 from .openai_handler import (
     process_openai_stream,
     create_openai_stream,
+    is_openai_content_event,
     prepare_openai_messages,
+    compile_openai_tool,
+    build_openai_batch_request,
+    PreparedMessages,
+    to_responses_input,
+    to_responses_tool,
+    create_openai_response_stream,
+    process_openai_response_stream,
+    is_openai_response_content_event,
+    is_expired_response_error,
     format_tool_result_message as format_openai_result
 )
-
-# Load environment variables
-load_dotenv()
+from .batch import create_batch_backend, wait_for_batch, response_text, requested_tool_calls
 
 react_prompt = """
 You are a highly capable and thoughtful assistant that employs a ReAct (Reasoning and Acting) strategy. For every query, follow this iterative process:
@@ -33,6 +67,19 @@ You are a highly capable and thoughtful assistant that employs a ReAct (Reasonin
 Use this structured approach to handle complex queries, ensuring that each stage of your internal reasoning is transparent by using the <thinking> tags. Bellow if your specific role in this case:   
 """
 
+# Worker threads shared by all sessions for early tool dispatch
+TOOL_DISPATCH_WORKERS = 16
+_tool_executor: Optional[ThreadPoolExecutor] = None
+_tool_executor_lock = threading.Lock()
+
+def _get_tool_executor() -> ThreadPoolExecutor:
+    """Get the process-wide pool that dispatched tools run on"""
+    global _tool_executor
+    with _tool_executor_lock:
+        if _tool_executor is None:
+            _tool_executor = ThreadPoolExecutor(max_workers=TOOL_DISPATCH_WORKERS, thread_name_prefix="tool-dispatch")
+        return _tool_executor
+
 class AugmentedLLM:
     def __init__(
         self,
@@ -46,9 +93,26 @@ class AugmentedLLM:
         debug_tokens: bool = False,
         reasoning_effort: Optional[str] = "medium",
         debug_settings: bool = False,
-        debug_messages: bool = False
+        debug_messages: bool = False,
+        max_tool_iterations: Optional[int] = None,
+        history_manager: Optional[HistoryManager] = None,
+        prompt_caching: bool = False,
+        tool_cache: Optional[ToolResultCache] = None,
+        client: Optional[Any] = None,
+        hooks: Optional[List[Hook]] = None,
+        fallback_provider: Optional[Union[LLMProvider, str]] = None,
+        fallback_model: Optional[str] = None,
+        failover_ttft: Optional[float] = None,
+        race_providers: bool = False,
+        rate_limiter: Optional[RateLimiter] = None,
+        session_id: Optional[str] = None,
+        early_tool_dispatch: bool = False,
+        server_side_state: bool = False
     ):
         """Initialize AugmentedLLM with configuration"""
+        # Keep the configuration so independent sessions can be spawned from this one
+        self._init_kwargs = {k: v for k, v in locals().items() if k != "self"}
+        
         # Convert string provider to enum if needed
         if isinstance(provider, str):
             provider = LLMProvider(provider.lower())
@@ -59,22 +123,31 @@ class AugmentedLLM:
             raise ValueError("reasoning_effort must be one of: 'low', 'medium', 'high'")
         self.reasoning_effort = reasoning_effort
         
-        # Initialize error logger
-        self.error_logger = ToolErrorLogger()
+        # Initialize error logger (shared by all sessions, written in the background)
+        self.error_logger = get_tool_error_logger()
         
-        # Initialize based on provider
-        if provider == LLMProvider.ANTHROPIC:
-            if not os.getenv("ANTHROPIC_API_KEY"):
-                raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
-            self.client = anthropic.Anthropic()
-            self.model_name = model_name or "claude-3-5-sonnet-20241022"
-            self.max_tokens = max_tokens or 8192
-        else:  # OpenAI
-            if not os.getenv("OPENAI_API_KEY"):
-                raise ValueError("OPENAI_API_KEY not found in environment variables")
-            self.client = OpenAI()
-            self.model_name = model_name or "gpt-4"
-            self.max_tokens = max_tokens or 4096
+        # Initialize based on provider; SDK clients are shared process-wide
+        # (see clients.py) unless one is passed in explicitly
+        self._routes: Dict[LLMProvider, Dict[str, Any]] = {
+            provider: self._make_route(provider, model_name, max_tokens, client)
+        }
+        
+        # Optional second provider for latency-aware failover or racing
+        if fallback_provider is not None:
+            if isinstance(fallback_provider, str):
+                fallback_provider = LLMProvider(fallback_provider.lower())
+            if fallback_provider == provider:
+                raise ValueError("fallback_provider must differ from provider")
+            self._routes[fallback_provider] = self._make_route(fallback_provider, fallback_model, max_tokens, None)
+        elif race_providers or failover_ttft is not None:
+            raise ValueError("race_providers and failover_ttft require a fallback_provider")
+        self.failover_ttft = failover_ttft
+        self.race_providers = race_providers
+        
+        route = self._routes[provider]
+        self.client = route["client"]
+        self.model_name = route["model_name"]
+        self.max_tokens = route["max_tokens"]
             
         self.temperature = temperature
         self.debug_tools = debug_tools
@@ -82,6 +155,39 @@ class AugmentedLLM:
         self.debug_settings = debug_settings
         self.debug_messages = debug_messages
         
+        # Cap on tool rounds per generate() call (None means unlimited)
+        if max_tool_iterations is not None and max_tool_iterations < 1:
+            raise ValueError("max_tool_iterations must be a positive integer or None")
+        self.max_tool_iterations = max_tool_iterations
+        
+        # Start tools on worker threads as soon as their input has streamed in,
+        # so tool I/O overlaps the rest of the model's output
+        self.early_tool_dispatch = early_tool_dispatch
+        self._tool_futures: Dict[str, Future] = {}
+        
+        # OpenAI only: keep the conversation on the provider (Responses API) and
+        # send just the new messages with a reference to the previous response
+        self.server_side_state = server_side_state
+        self._response_state: Optional[Dict[str, Any]] = None
+        self._responses_tools: Tuple[Optional[List[Dict[str, Any]]], List[Dict[str, Any]]] = (None, [])
+        
+        # Optional token budget for the message history sent on each call
+        self.history_manager = history_manager
+        self.last_trim_report: Optional[Dict[str, Any]] = None
+        
+        # Optional result cache for tools registered with cacheable=True
+        self.tool_cache = tool_cache
+        
+        # Requests wait for capacity on the (by default process-wide) rate limiter;
+        # reservations are corrected from provider usage once a stream finishes
+        self.rate_limiter = rate_limiter if rate_limiter is not None else get_rate_limiter()
+        self._reservations: Dict[LLMProvider, Dict[str, Any]] = {}
+        
+        # Timing hooks (see instrumentation.py) and per-request timing state
+        self.hooks: List[Hook] = list(hooks or [])
+        self._request_metrics: Optional[Dict[str, Any]] = None
+        self._call_start = 0.0
+        
         # Initialize token debugger if enabled
         if self.debug_tokens:
             self.token_debugger = TokenDebugger(self.model_name)
@@ -90,32 +196,81 @@ class AugmentedLLM:
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         date_time_info = f"\nCurrent Date and Time: {current_time}\n"
         
-        # Combine prompts if using react
-        if use_react:
-            self.system_prompt = react_prompt + system_prompt + date_time_info 
+        # With prompt caching the timestamp is kept out of the system prompt and
+        # sent after the cache breakpoint, so the prefix is identical across sessions
+        self.prompt_caching = prompt_caching
+        base_prompt = react_prompt + system_prompt if use_react else system_prompt
+        if prompt_caching:
+            self.system_prompt = base_prompt
+            self.context_prompt = date_time_info
         else:
-            self.system_prompt = system_prompt + date_time_info
+            self.system_prompt = base_prompt + date_time_info
+            self.context_prompt = None
             
         # Log system prompt tokens if debugging
         if self.debug_tokens:
-            self.token_debugger.log_message("system", self.system_prompt)
+            self.token_debugger.log_message("system", self.system_prompt + (self.context_prompt or ""))
         
         # Initialize message history and tools
+        self.session_id = session_id or uuid.uuid4().hex
         self.messages = []
-        self.tools: List[Dict[str, Any]] = []
+        self._provider_tools: Dict[LLMProvider, List[Dict[str, Any]]] = {p: [] for p in LLMProvider}
+        self.tools: List[Dict[str, Any]] = self._provider_tools[self.provider]
         self.tool_registry: Dict[str, Callable] = {}
+        self.cacheable_tools = set()
+        # OpenAI request messages, maintained as the history grows
+        self._prepared_messages = PreparedMessages()
+        # Tool definitions without handlers, so a session can be snapshotted and restored
+        self._tool_specs: Dict[str, Dict[str, Any]] = {}
+        
+        # Persist the conversation to an append-only journal written off the request path
+        self.journal = None
+        self._journal_position = 0
+        if self.debug_messages:
+            self.journal = get_session_journal("logs/messages")
+            self.journal.record(
+                self.session_id,
+                "session_start",
+                model=self.model_name,
+                provider=self.provider.value,
+                system_prompt=self.system_prompt + (self.context_prompt or "")
+            )
+            print(f"\n[Debug Messages] Journaling session {self.session_id} to: {self.journal.log_dir}")
         
     def add_tool(
         self,
         name: str,
         description: str,
         input_schema: Dict[str, Any],
-        handler: Callable
+        handler: Callable,
+        cacheable: bool = False,
+        cache_ttl: Optional[float] = None,
+        cache_max_size: Optional[int] = None
     ) -> None:
-        """Register a new tool with the LLM"""
-        tool_config = get_tool_config(name, description, input_schema, self.provider)
-        self.tools.append(tool_config)
+        """Register a new tool with the LLM.
+        
+        Results of cacheable tools are memoized in self.tool_cache (if set),
+        with an optional per-tool TTL in seconds and LRU size limit.
+        """
+        # Keep the config for every provider so the session can fail over;
+        # OpenAI tools are compiled to their strict request form once, here
+        for provider, tools in self._provider_tools.items():
+            tool_config = get_tool_config(name, description, input_schema, provider)
+            if provider == LLMProvider.OPENAI:
+                tool_config = compile_openai_tool(tool_config)
+            tools.append(tool_config)
         self.tool_registry[name] = handler
+        self._tool_specs[name] = {
+            "description": description,
+            "input_schema": input_schema,
+            "cacheable": cacheable,
+            "cache_ttl": cache_ttl,
+            "cache_max_size": cache_max_size
+        }
+        if cacheable:
+            self.cacheable_tools.add(name)
+            if self.tool_cache is not None:
+                self.tool_cache.configure_tool(name, ttl=cache_ttl, max_size=cache_max_size)
         
     def log_tools(self) -> None:
         """Save the current tools configuration to a JSON file."""
@@ -150,11 +305,35 @@ class AugmentedLLM:
         
     def execute_tool(self, tool_name: str, tool_input: Dict[str, Any]) -> str:
         """Execute a registered tool with the given input"""
+        return self._run_tool(tool_name, tool_input)
+        
+    def _run_tool(self, tool_name: str, tool_input: Dict[str, Any]) -> str:
+        """Execute a tool on the calling thread, emitting tool_start/tool_end to the hooks"""
+        self._emit("tool_start", tool=tool_name)
+        return self._record_tool_call(tool_name, tool_input, *self._call_tool(tool_name, tool_input))
+        
+    def _call_tool(self, tool_name: str, tool_input: Dict[str, Any]) -> Tuple[str, str, Optional[Exception], float]:
+        """Run a tool's handler and return its result, status (ok, cached, error or
+        not_found), exception and duration.
+        
+        Only the handler and the (locked) tool cache are touched, so dispatched
+        tools can run here on a worker thread; everything the session records
+        about the call happens in _record_tool_call on the session's thread.
+        """
+        start = time.perf_counter()
         if tool_name not in self.tool_registry:
             error_msg = f"Tool '{tool_name}' not found in registry"
             if self.debug_tools:
                 print(f"\n[Debug] Error: {error_msg}")
-            return error_msg
+            return error_msg, "not_found", None, time.perf_counter() - start
+            
+        use_cache = self.tool_cache is not None and tool_name in self.cacheable_tools
+        if use_cache:
+            found, cached_result = self.tool_cache.get(tool_name, tool_input)
+            if found:
+                if self.debug_tools:
+                    print(f"\n[Debug] Tool cache hit: {tool_name}")
+                return cached_result, "cached", None, time.perf_counter() - start
             
         tool_handler = self.tool_registry[tool_name]
         try:
@@ -164,20 +343,42 @@ class AugmentedLLM:
                 
             result = tool_handler(**tool_input)
             
-            # Log tool result tokens if debugging
-            if self.debug_tokens:
-                self.token_debugger.log_message("tool", str(result), is_tool_result=True)
+            # Only successful results are cached
+            if use_cache:
+                self.tool_cache.set(tool_name, tool_input, str(result))
             
             if self.debug_tools:
                 print(f"[Debug] Tool result: {format_tool_result(result)}\n")
                 
-            return str(result)
+            return str(result), "ok", None, time.perf_counter() - start
         except Exception as e:
             error_msg = f"Error executing tool {tool_name}: {str(e)}"
             if self.debug_tools:
                 print(f"\n[Debug] {error_msg}")
-                
-            # Log the error with full context
+            return error_msg, "error", e, time.perf_counter() - start
+            
+    def _record_tool_call(
+        self,
+        tool_name: str,
+        tool_input: Dict[str, Any],
+        result: str,
+        status: str,
+        error: Optional[Exception],
+        duration: float,
+        count_tool_time: bool = True
+    ) -> str:
+        """Log a finished tool call to the token debugger, error log and hooks.
+        
+        count_tool_time is False for dispatched tools: only the time the turn
+        spends waiting for them is counted (see _collect_tool_result).
+        """
+        # Log tool result tokens if debugging
+        if self.debug_tokens and status in ("ok", "cached"):
+            self.token_debugger.log_message("tool", result, is_tool_result=True)
+            
+        if error is not None:
+            # Log the error with context; repeats of a known failure only bump its
+            # counter, and tests are generated offline (python -m augmented_llm.error_logger)
             context = {
                 "model_name": self.model_name,
                 "debug_mode": self.debug_tools,
@@ -185,208 +386,772 @@ class AugmentedLLM:
                 "tools_registered": list(self.tool_registry.keys())
             }
             
-            error_log_path = self.error_logger.log_error(
+            self.error_logger.log_error(
                 tool_name=tool_name,
                 tool_input=tool_input,
-                error=e,
+                error=error,
                 provider=self.provider.value,
                 context=context
             )
             
-            # Generate a test file for this error
-            self.error_logger.create_test_from_error(error_log_path)
-            
-            return error_msg
+        if count_tool_time and self._request_metrics is not None:
+            self._request_metrics["tool_time"] += duration
+        self._emit("tool_end", tool=tool_name, duration=duration, status=status)
+        return result
 
-    def process_stream(self, stream) -> Generator[str, None, None]:
-        """Process a message stream and handle tool usage"""
-        if self.provider == LLMProvider.ANTHROPIC:
-            result = yield from process_anthropic_stream(stream, self.messages, self.debug_tools)
-            
-            # Log assistant message tokens if debugging
-            if self.debug_tokens and result.get("content"):
-                self.token_debugger.log_message("assistant", result["content"])
-            
-            if result["stop_reason"] == "tool_use":
-                tool_block = next(
-                    (block for block in result["message"]["content"] 
-                     if block["type"] == "tool_use"),
-                    None
-                )
-                
-                if tool_block:
-                    tool_result = self.execute_tool(
-                        tool_block["name"],
-                        tool_block["input"]
-                    )
-                    if not self.debug_tools:
-                        yield f"\n[Tool Result]\n{tool_result}\n"
-                    
-                    # Add tool result to messages
-                    self.messages.append(format_anthropic_result(tool_block, tool_result))
-                    
-                    params = {
-                    "messages": self.messages,
-                    "model": self.model_name,
-                    "system": self.system_prompt,
-                    "temperature": self.temperature,
-                    "max_tokens": self.max_tokens,
-                    "tools": self.tools,
-                    "stream": True
-                    }
-                    # Create new stream with updated messages
-                    new_stream = create_anthropic_stream(
-                        self.client,
-                       **params
-                    )
-                    
-                    # Process the new stream
-                    if not self.debug_tools:
-                        yield "\n[Continuing conversation with tool result...]\n"
-                    yield from self.process_stream(new_stream)
-            else:
-                # Only log tokens for complete messages without tool calls
-                if self.debug_tokens and result.get("content"):
-                    self.token_debugger.log_message("assistant", result["content"])
-                    
+    @staticmethod
+    def _make_route(provider: LLMProvider, model_name: Optional[str], max_tokens: Optional[int], client: Optional[Any]) -> Dict[str, Any]:
+        """Resolve the client, model and token limit used for one provider"""
+        if client is None:
+            load_environment()
+        if provider == LLMProvider.ANTHROPIC:
+            if client is None and not os.getenv("ANTHROPIC_API_KEY"):
+                raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
+            model_name = model_name or "claude-3-5-sonnet-20241022"
+            max_tokens = max_tokens or 8192
         else:  # OpenAI
-            result = yield from process_openai_stream(stream, self.messages, self.debug_tools)
-            
-            # Log assistant message tokens if debugging
-            if self.debug_tokens and result.get("content"):
-                self.token_debugger.log_message("assistant", result["content"])
+            if client is None and not os.getenv("OPENAI_API_KEY"):
+                raise ValueError("OPENAI_API_KEY not found in environment variables")
+            model_name = model_name or "gpt-4"
+            max_tokens = max_tokens or 4096
+        # Capabilities are resolved once per route instead of on every request
+        info = get_model_info(model_name)
+        if info["max_output_tokens"]:
+            max_tokens = min(max_tokens, info["max_output_tokens"])
+        return {
+            "provider": provider,
+            "client": client if client is not None else get_client(provider),
+            "model_name": model_name,
+            "max_tokens": max_tokens,
+            "model_type": "reasoning" if info["reasoning"] else "non_reasoning",
+            "prompt_caching": info["prompt_caching"]
+        }
+
+    def _fallback_route(self) -> Optional[Dict[str, Any]]:
+        """Return the route of the provider not currently in use, if configured"""
+        return next((route for p, route in self._routes.items() if p != self.provider), None)
+
+    def _use_route(self, route: Dict[str, Any]) -> None:
+        """Point the session at a route's provider, client, model and tools"""
+        self.provider = route["provider"]
+        self.client = route["client"]
+        self.model_name = route["model_name"]
+        self.max_tokens = route["max_tokens"]
+        self.tools = self._provider_tools[self.provider]
+
+    def _switch_provider(self, route: Dict[str, Any], reason: str) -> None:
+        """Move the session to another provider, translating the history"""
+        previous = self.provider
+        self._journal_new_messages()
+        self.messages = translate_messages(self.messages, previous, route["provider"])
+        self._use_route(route)
+        if self.journal is not None:
+            self.journal.record(self.session_id, "switch_provider", provider=self.provider.value, model=self.model_name, messages=list(self.messages))
+            self._journal_position = len(self.messages)
+        if self.debug_tools:
+            print(f"\n[Debug] Failing over from {previous.value} to {self.provider.value} ({reason})")
+        self._emit("failover", from_provider=previous.value, to_provider=self.provider.value, reason=reason)
+
+    def _create_stream(self, log_settings: bool = False):
+        """Create a provider stream for the current message history"""
+        self._call_start = time.perf_counter()
+        if self.history_manager:
+            # Journal messages before trimming so the journal keeps the full conversation
+            self._journal_new_messages()
+            self.messages, self.last_trim_report = self.history_manager.trim(self.messages, self.provider)
+            self._journal_position = len(self.messages)
             
-            if result["has_tool_calls"]:
-                for tool_call in result["tool_calls"].values():
-                    try:
-                        args = json.loads(tool_call["function"]["arguments"])
-                        tool_result = self.execute_tool(
-                            tool_call["function"]["name"],
-                            args
-                        )
-                        
-                        # Add tool result to messages
-                        self.messages.append(format_openai_result(tool_call, tool_result))
-                        
-                        if not self.debug_tools:
-                            yield f"\n[Tool Result]\n{tool_result}\n"
-                            
-                    except json.JSONDecodeError as e:
-                        error_msg = f"Error parsing tool arguments: {e}"
-                        if self.debug_tools:
-                            print(f"\n[Debug] {error_msg}")
-                        yield f"\n[Error] {error_msg}\n"
-                
-                # Continue conversation with tool results
-                params = {
-                    "messages": prepare_openai_messages(self.messages, self.system_prompt, self.model_name),
-                    "model": self.model_name,
-                    "temperature": self.temperature,
-                    "tools": self.tools,
-                    "stream": True
-                }
-                new_stream = create_openai_stream(
-                    self.client,
-                    debug_tools=self.debug_tools,
-                    **params
-                )
-                
-                if not self.debug_tools:
-                    yield "\n[Continuing conversation with tool result...]\n"
-                yield from self.process_stream(new_stream)
-            else:
-                # Only log tokens for complete messages without tool calls
-                if self.debug_tokens and result.get("content"):
-                    self.token_debugger.log_message("assistant", result["content"])
-        
-    def generate(self, message: str):
-        """Generate a response to the given message, with streaming by default"""
-        # Log user message tokens if debugging
-        if self.debug_tokens:
-            self.token_debugger.log_message("user", message)
+        fallback = self._fallback_route()
+        if fallback is None:
+            return self._build_request(self._routes[self.provider], log_settings)()
+        if self.race_providers:
+            return self._race_streams(fallback, log_settings)
+        return self._failover_stream(fallback, log_settings)
+
+    def _content_predicate(self, provider: LLMProvider) -> Callable[[Any], bool]:
+        if provider == LLMProvider.ANTHROPIC:
+            return is_anthropic_content_event
+        if self.server_side_state:
+            return is_openai_response_content_event
+        return is_openai_content_event
+
+    def _failover_stream(self, fallback: Dict[str, Any], log_settings: bool = False):
+        """Open the current provider's stream, switching to the fallback on error or slow first token"""
+        route = self._routes[self.provider]
+        primary = PrefetchedStream(
+            self._build_request(route, log_settings),
+            self._content_predicate(self.provider),
+            on_abandon=lambda: self._release_reservation(route)
+        )
+        if primary.wait_first_content(self.failover_ttft) and primary.error is None:
+            return primary
+        primary.cancel()
+        self._switch_provider(fallback, "error" if primary.error else "slow_first_token")
+        return self._build_request(fallback, log_settings)()
+
+    def _race_streams(self, fallback: Dict[str, Any], log_settings: bool = False):
+        """Open both providers' streams and keep whichever produces content first"""
+        ready = threading.Event()
+        candidates = [
+            (route, PrefetchedStream(
+                self._build_request(route, log_settings),
+                self._content_predicate(route["provider"]),
+                ready,
+                on_abandon=lambda route=route: self._release_reservation(route)
+            ))
+            for route in (self._routes[self.provider], fallback)
+        ]
+        while True:
+            ready.clear()
+            winner = next(((route, stream) for route, stream in candidates if stream.has_content), None)
+            if winner is not None:
+                break
+            if all(stream.settled for _, stream in candidates):
+                # Neither produced content: keep a stream that ended cleanly,
+                # otherwise both failed and the current provider's error surfaces
+                winner = next(((route, stream) for route, stream in candidates if stream.error is None), None)
+                if winner is not None:
+                    break
+                raise candidates[0][1].error
+            ready.wait()
             
-        # Add user message to history
-        self.messages.append({
-            "role": "user",
-            "content": message
-        })
+        for route, stream in candidates:
+            if stream is not winner[1]:
+                stream.cancel()
+        if winner[0]["provider"] != self.provider:
+            self._switch_provider(winner[0], "race")
+        return winner[1]
+
+    def _build_request(self, route: Dict[str, Any], log_settings: bool = False) -> Callable[[], Any]:
+        """Build the API call for a route; the history is translated if the route uses another provider"""
+        messages = translate_messages(self.messages, self.provider, route["provider"])
+        if route["provider"] == LLMProvider.OPENAI and self.server_side_state:
+            return self._responses_request(route, messages, log_settings)
+        params = self._request_params(route, messages, log_settings)
+        client = route["client"]
+        if route["provider"] == LLMProvider.ANTHROPIC:
+            return self._rate_limited(route, lambda: create_anthropic_stream(client, **params), params)
+        return self._rate_limited(route, lambda: create_openai_stream(client, debug_tools=self.debug_tools, **params), params)
+
+    def _request_params(self, route: Dict[str, Any], messages: List[Dict[str, Any]], log_settings: bool = False) -> Dict[str, Any]:
+        """Build the streaming API parameters for a route from a history in that route's format"""
+        provider = route["provider"]
+        model_name = route["model_name"]
+        max_tokens = route["max_tokens"]
+        tools = self._provider_tools[provider]
         
-        # Create the stream based on provider
-        if self.provider == LLMProvider.ANTHROPIC:
+        if provider == LLMProvider.ANTHROPIC:
             params = {
-                "messages": self.messages,
-                "model": self.model_name,
+                "messages": messages,
+                "model": model_name,
                 "system": self.system_prompt,
                 "temperature": self.temperature,
-                "max_tokens": self.max_tokens,
-                "tools": self.tools,
+                "max_tokens": max_tokens,
+                "tools": tools,
                 "stream": True
             }
-            if self.debug_settings:
+            if self.prompt_caching and route["prompt_caching"]:
+                # Breakpoints on tools, system prompt and the history so far
+                params["system"] = build_cached_system(self.system_prompt, self.context_prompt)
+                params["tools"] = add_tool_cache_breakpoint(tools)
+                params["messages"] = add_history_cache_breakpoint(messages)
+            if log_settings and self.debug_settings:
                 debug_params = params.copy()
                 del debug_params["messages"]  # Remove messages from debug output
                 print("\n[Debug Settings] Anthropic API call parameters:")
                 print(json.dumps(debug_params, indent=2))
-            stream = create_anthropic_stream(self.client, **params)
-        else:  # OpenAI
-            # Prepare messages with model name for reasoning check
+            return params
+        
+        # OpenAI: prepare messages with model name for reasoning check; the
+        # session history is converted incrementally, other histories in full
+        if messages is self.messages:
+            prepared_messages = self._prepared_messages.sync(
+                messages,
+                self.system_prompt,
+                model_name,
+                context_prompt=self.context_prompt
+            )
+        else:
             prepared_messages = prepare_openai_messages(
-                self.messages,
+                messages,
                 self.system_prompt,
-                self.model_name
+                model_name,
+                context_prompt=self.context_prompt
             )
-            
+        
+        params = {
+            "messages": prepared_messages,
+            "model": model_name,
+            "temperature": self.temperature,
+            "tools": tools,
+            "stream": True
+        }
+        
+        # OpenAI caches prefixes automatically; ask for usage to see cached tokens
+        # (and to correct rate-limit reservations)
+        if self.prompt_caching or self.debug_tokens or self.rate_limiter.is_limited(model_name):
+            params["stream_options"] = {"include_usage": True}
+        
+        # Handle max tokens parameter based on model type
+        if route["model_type"] == "reasoning":
+            params["max_completion_tokens"] = max_tokens
             # Add reasoning_effort for reasoning models if specified
-            params = {
-                "messages": prepared_messages,
+            if self.reasoning_effort:
+                params["reasoning_effort"] = self.reasoning_effort
+        else:
+            params["max_tokens"] = max_tokens
+            
+        if log_settings and self.debug_settings:
+            debug_params = {k: v for k, v in params.items() if k != "messages"}
+            print("\n[Debug Settings] OpenAI API call parameters:")
+            print(json.dumps(debug_params, indent=2))
+        
+        return params
+
+    def _stored_response(self, route: Dict[str, Any], messages: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Return the provider-stored response that messages extend, if it is still usable"""
+        state = self._response_state
+        if state is None or messages is not self.messages or state["messages"] is not messages:
+            return None
+        if state["model"] != route["model_name"] or len(messages) < state["count"]:
+            return None
+        # The history was rewritten in place after the response was stored
+        if state["count"] and messages[state["count"] - 1] is not state["last"]:
+            return None
+        return state
+
+    def _responses_request(self, route: Dict[str, Any], messages: List[Dict[str, Any]], log_settings: bool = False) -> Callable[[], Any]:
+        """Build a Responses API call that sends only what the provider has not stored yet.
+        
+        Falls back to resending the full history when the referenced response
+        has expired on the provider side.
+        """
+        client = route["client"]
+        stored = self._stored_response(route, messages)
+        if stored is None:
+            params = self._responses_params(route, messages, log_settings=log_settings)
+        else:
+            params = self._responses_params(route, messages[stored["count"]:], stored["id"], log_settings)
+            
+        def open_stream():
+            if stored is None:
+                return create_openai_response_stream(client, **params)
+            try:
+                return create_openai_response_stream(client, **params)
+            except Exception as e:
+                if not is_expired_response_error(e):
+                    raise
+                self._response_state = None
+                if self.debug_tools:
+                    print(f"\n[Debug] Stored response {stored['id']} expired; resending full history")
+                return create_openai_response_stream(client, **self._responses_params(route, messages))
+                
+        # The provider bills the whole stored context, so estimate from the full history
+        estimate = {"system": params["instructions"], "messages": messages, "tools": params.get("tools")}
+        return self._rate_limited(route, open_stream, estimate)
+
+    def _responses_params(
+        self,
+        route: Dict[str, Any],
+        messages: List[Dict[str, Any]],
+        previous_response_id: Optional[str] = None,
+        log_settings: bool = False
+    ) -> Dict[str, Any]:
+        """Build Responses API parameters for messages not yet stored by the provider"""
+        params = {
+            "model": route["model_name"],
+            # Instructions are not carried over from the previous response
+            "instructions": self.system_prompt + (self.context_prompt or ""),
+            "input": to_responses_input(messages),
+            "temperature": self.temperature,
+            "max_output_tokens": route["max_tokens"],
+            "store": True,
+            "stream": True
+        }
+        if previous_response_id is not None:
+            params["previous_response_id"] = previous_response_id
+            
+        # Tools are only ever appended, so convert just the new ones
+        tools = self._provider_tools[LLMProvider.OPENAI]
+        source, converted = self._responses_tools
+        if source is not tools or len(converted) > len(tools):
+            converted = []
+        converted.extend(to_responses_tool(tool) for tool in tools[len(converted):])
+        self._responses_tools = (tools, converted)
+        if converted:
+            params["tools"] = converted
+            
+        if route["model_type"] == "reasoning" and self.reasoning_effort:
+            params["reasoning"] = {"effort": self.reasoning_effort}
+            
+        if log_settings and self.debug_settings:
+            debug_params = {k: v for k, v in params.items() if k != "input"}
+            debug_params["input_items"] = len(params["input"])
+            print("\n[Debug Settings] OpenAI Responses API call parameters:")
+            print(json.dumps(debug_params, indent=2))
+        return params
+
+    def _rate_limited(self, route: Dict[str, Any], open_stream: Callable[[], Any], params: Dict[str, Any]) -> Callable[[], Any]:
+        """Wrap a stream opener so it first waits for rate-limit capacity"""
+        if not self.rate_limiter.is_limited(route["model_name"]):
+            return open_stream
+            
+        def open_when_allowed():
+            tokens = self.rate_limiter.estimate_tokens(
+                params.get("system"),
+                params["messages"],
+                params.get("tools"),
+                max_output_tokens=route["max_tokens"],
+                token_counter=self.token_debugger if self.debug_tokens else None
+            )
+            self._reservations[route["provider"]] = self.rate_limiter.acquire(route["model_name"], tokens)
+            return open_stream()
+        return open_when_allowed
+
+    def _release_reservation(self, route: Dict[str, Any]) -> None:
+        """Return the output allowance reserved for a stream that was abandoned before it was processed"""
+        reservation = self._reservations.pop(route["provider"], None)
+        if reservation is not None:
+            # The prompt was sent, so only the estimated input stays charged
+            self.rate_limiter.reconcile(reservation, max(reservation["tokens"] - route["max_tokens"], 0))
+
+    def add_hook(self, hook: Hook) -> None:
+        """Register a callback that receives timing events (see instrumentation.py)"""
+        self.hooks.append(hook)
+        
+    def _emit(self, event: str, **data) -> None:
+        """Send an event to all registered hooks"""
+        if self.hooks:
+            emit_event(
+                self.hooks,
+                event,
+                session_id=self.session_id,
+                provider=self.provider.value,
+                model=self.model_name,
+                **data
+            )
+            
+    def _on_first_token(self) -> None:
+        """Emit first_token once per generate() call"""
+        metrics = self._request_metrics
+        if metrics is not None and metrics["first_token"] is None:
+            metrics["first_token"] = time.perf_counter()
+            self._emit("first_token", ttft=metrics["first_token"] - metrics["start"])
+            
+    def _log_provider_usage(self, usage: Optional[Dict[str, int]]) -> None:
+        """Record provider-reported usage for one request"""
+        reservation = self._reservations.pop(self.provider, None)
+        if not usage:
+            return
+        if reservation is not None:
+            self.rate_limiter.reconcile(
+                reservation,
+                usage.get("input_tokens", 0) + usage.get("cache_creation_input_tokens", 0) + usage.get("output_tokens", 0)
+            )
+        if self._request_metrics is not None:
+            self._request_metrics["output_tokens"] += usage.get("output_tokens", 0)
+        if self.hooks:
+            self._emit("usage", latency=time.perf_counter() - self._call_start, **usage)
+        if self.debug_tokens:
+            # Exact counts from the provider take the place of local estimates
+            self.token_debugger.log_request_usage(usage)
+
+    def _dispatch_tool(self, tool_call_id: str, tool_name: str, tool_input: Dict[str, Any]) -> None:
+        """Start a tool on a worker thread while the stream keeps draining"""
+        if self.debug_tools:
+            print(f"\n[Debug] Dispatching tool early: {tool_name}")
+        self._emit("tool_start", tool=tool_name)
+        self._tool_futures[tool_call_id] = _get_tool_executor().submit(self._call_tool, tool_name, tool_input)
+        
+    def _collect_tool_result(self, tool_call_id: str, tool_name: str, tool_input: Dict[str, Any]) -> str:
+        """Return a dispatched tool's result, or run the tool now if it was not dispatched"""
+        future = self._tool_futures.pop(tool_call_id, None)
+        if future is None:
+            return self.execute_tool(tool_name, tool_input)
+        start = time.perf_counter()
+        outcome = future.result()
+        if self._request_metrics is not None:
+            self._request_metrics["tool_time"] += time.perf_counter() - start
+        # Recorded here, on the stream's thread, in the order the results are sent
+        return self._record_tool_call(tool_name, tool_input, *outcome, count_tool_time=False)
+
+    def _process_anthropic_turn(self, stream) -> Generator[StreamEvent, None, bool]:
+        """Drain one Anthropic stream and run its tool calls.
+        
+        Returns:
+            True if tool results were added and the conversation should continue
+        """
+        self._tool_futures = {}
+        on_tool_ready = None
+        if self.early_tool_dispatch:
+            on_tool_ready = lambda block: self._dispatch_tool(block["id"], block["name"], block["input"])
+        result = yield from process_anthropic_stream(
+            stream, self.messages, self.debug_tools,
+            on_first_token=self._on_first_token if self.hooks else None,
+            on_tool_ready=on_tool_ready
+        )
+        self._log_provider_usage(result.get("usage"))
+        
+        # Estimate assistant message tokens only if the provider reported no usage
+        if self.debug_tokens and not result.get("usage") and result.get("content"):
+            self.token_debugger.log_message("assistant", result["content"])
+        
+        if result["stop_reason"] != "tool_use":
+            return False
+            
+        tool_blocks = [
+            block for block in result["message"]["content"]
+            if block["type"] == "tool_use"
+        ]
+        if not tool_blocks:
+            return False
+            
+        tool_results = []
+        for tool_block in tool_blocks:
+            tool_result = self._collect_tool_result(
+                tool_block["id"],
+                tool_block["name"],
+                tool_block["input"]
+            )
+            yield ToolResult(tool_block["name"], tool_block["id"], tool_result)
+            tool_results.append((tool_block, tool_result))
+        
+        # Every tool_use block must be answered in the next user message
+        self.messages.append(format_anthropic_results(tool_results))
+        return True
+
+    def _dispatch_openai_tool(self, tool_call: Dict[str, Any]) -> None:
+        """Dispatch an OpenAI tool call once its arguments are complete"""
+        try:
+            args = json.loads(tool_call["function"]["arguments"])
+        except json.JSONDecodeError:
+            # Reported when the turn's tool calls are processed
+            return
+        self._dispatch_tool(tool_call["id"], tool_call["function"]["name"], args)
+
+    def _process_openai_turn(self, stream) -> Generator[StreamEvent, None, bool]:
+        """Drain one OpenAI stream and run its tool calls.
+        
+        Returns:
+            True if tool results were added and the conversation should continue
+        """
+        self._tool_futures = {}
+        on_tool_ready = None
+        if self.early_tool_dispatch:
+            on_tool_ready = self._dispatch_openai_tool
+        process = process_openai_response_stream if self.server_side_state else process_openai_stream
+        result = yield from process(
+            stream, self.messages, self.debug_tools,
+            on_first_token=self._on_first_token if self.hooks else None,
+            on_tool_ready=on_tool_ready
+        )
+        self._log_provider_usage(result.get("usage"))
+        
+        if result.get("response_id"):
+            # The provider now holds everything up to and including this reply
+            self._response_state = {
+                "id": result["response_id"],
                 "model": self.model_name,
-                "temperature": self.temperature,
-                "tools": self.tools,
-                "stream": True
+                "messages": self.messages,
+                "count": len(self.messages),
+                "last": self.messages[-1]
             }
+        
+        # Estimate assistant message tokens only if the provider reported no usage
+        if self.debug_tokens and not result.get("usage") and result.get("content"):
+            self.token_debugger.log_message("assistant", result["content"])
+        
+        if not result["has_tool_calls"]:
+            return False
             
-            # Handle max tokens parameter based on model type
-            if get_model_type(self.model_name) == "reasoning":
-                params["max_completion_tokens"] = self.max_tokens
-                if self.reasoning_effort:
-                    params["reasoning_effort"] = self.reasoning_effort
-            else:
-                params["max_tokens"] = self.max_tokens
+        for tool_call in result["tool_calls"].values():
+            try:
+                args = json.loads(tool_call["function"]["arguments"])
+                tool_result = self._collect_tool_result(
+                    tool_call["id"],
+                    tool_call["function"]["name"],
+                    args
+                )
                 
-            if self.debug_settings:
-                debug_params = {k: v for k, v in params.items() if k != "messages"}
-                print("\n[Debug Settings] OpenAI API call parameters:")
-                print(json.dumps(debug_params, indent=2))
+                # Add tool result to messages
+                self.messages.append(format_openai_result(tool_call, tool_result))
+                yield ToolResult(tool_call["function"]["name"], tool_call["id"], tool_result)
+                    
+            except json.JSONDecodeError as e:
+                error_msg = f"Error parsing tool arguments: {e}"
+                if self.debug_tools:
+                    print(f"\n[Debug] {error_msg}")
+                yield StreamError(error_msg)
+        return True
+
+    def process_stream(self, stream) -> Generator[StreamEvent, None, None]:
+        """Process a message stream and handle tool usage, yielding typed events.
+        
+        Tool rounds are driven by a flat loop rather than recursion, so the
+        per-chunk overhead stays constant however many tools a session calls.
+        """
+        iterations = 0
+        while True:
+            # The provider can change between rounds when failover is configured
+            if self.provider == LLMProvider.ANTHROPIC:
+                should_continue = yield from self._process_anthropic_turn(stream)
+            else:  # OpenAI
+                should_continue = yield from self._process_openai_turn(stream)
+            if not should_continue:
+                break
+                
+            iterations += 1
+            if self.max_tool_iterations is not None and iterations >= self.max_tool_iterations:
+                if self.debug_tools:
+                    print(f"\n[Debug] Max tool iterations reached ({self.max_tool_iterations})")
+                yield ToolIterationLimit(self.max_tool_iterations)
+                break
+                
+            # Continue conversation with tool results
+            yield ToolRoundContinue()
+            stream = self._create_stream()
+        
+    def generate(self, message: str) -> Generator[str, None, None]:
+        """Generate a response to the given message, with streaming by default"""
+        return events_to_text(self.generate_events(message), self.debug_tools)
+        
+    def generate_events(self, message: str) -> Generator[StreamEvent, None, None]:
+        """Generate a response as typed stream events (see stream_events.py)"""
+        # Log user message tokens if debugging
+        if self.debug_tokens:
+            self.token_debugger.log_message("user", message)
             
-            stream = create_openai_stream(self.client, debug_tools=self.debug_tools, **params)
+        # Add user message to history
+        self.messages.append({
+            "role": "user",
+            "content": message
+        })
+        
+        if self.hooks:
+            self._request_metrics = {
+                "start": time.perf_counter(),
+                "first_token": None,
+                "tool_time": 0.0,
+                "output_tokens": 0
+            }
+            self._emit("request_start")
         
+        status = "error"
         try:
-            # Process the stream
+            # Create the stream based on provider and process it
+            stream = self._create_stream(log_settings=True)
             yield from self.process_stream(stream)
+            status = "ok"
+        except GeneratorExit:
+            status = "cancelled"
+            raise
         finally:
+            self._emit_stream_end(status)
+            
             # Print token debug info at the end if enabled
             if self.debug_tokens:
                 self.token_debugger.print_debug_info()
             
-            # Save messages to file if debug_messages is enabled
-            if self.debug_messages:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"debug_messages_{timestamp}.json"
-                os.makedirs("logs/messages", exist_ok=True)
-                filepath = os.path.join("logs/messages", filename)
-                
-                with open(filepath, "w") as f:
-                    json.dump({
-                        "model": self.model_name,
-                        "provider": self.provider.value,
-                        "system_prompt": self.system_prompt,
-                        "messages": self.messages
-                    }, f, indent=2)
-                print(f"\n[Debug Messages] Conversation saved to: {filepath}")
+            # Queue messages added during this call for the journal
+            self._journal_new_messages()
+        
+    def _emit_stream_end(self, status: str) -> None:
+        """Emit stream_end with the timing split of the finished request"""
+        metrics = self._request_metrics
+        if metrics is None:
+            return
+        self._request_metrics = None
+        duration = time.perf_counter() - metrics["start"]
+        self._emit(
+            "stream_end",
+            duration=duration,
+            model_time=duration - metrics["tool_time"],
+            tool_time=metrics["tool_time"],
+            ttft=metrics["first_token"] - metrics["start"] if metrics["first_token"] else None,
+            output_tokens=metrics["output_tokens"],
+            status=status
+        )
+        
+    def _journal_new_messages(self) -> None:
+        """Queue messages not yet journaled; each message is written once"""
+        if self.journal is None:
+            return
+        for message in self.messages[self._journal_position:]:
+            self.journal.record(self.session_id, "message", message=message)
+        self._journal_position = len(self.messages)
+        
+    def spawn_session(self, session_id: Optional[str] = None) -> "AugmentedLLM":
+        """Create an independent session with the same configuration.
+        
+        The new session has its own history and token counters but shares
+        this session's client, tools, tool cache and hooks.
+        """
+        kwargs = dict(self._init_kwargs)
+        initial_provider = kwargs["provider"]
+        if isinstance(initial_provider, str):
+            initial_provider = LLMProvider(initial_provider.lower())
+        kwargs["client"] = self._routes[initial_provider]["client"]
+        kwargs["hooks"] = list(self.hooks)
+        kwargs["session_id"] = session_id
+        if self.history_manager is not None:
+            kwargs["history_manager"] = self.history_manager.clone()
+        session = AugmentedLLM(**kwargs)
+        self.share_tools_with(session)
+        return session
+        
+    def share_tools_with(self, session: "AugmentedLLM") -> None:
+        """Make another session use this session's tool registry and definitions"""
+        session._provider_tools = self._provider_tools
+        session.tools = self._provider_tools[session.provider]
+        session.tool_registry = self.tool_registry
+        session.cacheable_tools = self.cacheable_tools
+        session._tool_specs = self._tool_specs
+        
+    def final_response(self) -> str:
+        """Return the text of the last assistant message"""
+        for message in reversed(self.messages):
+            if message["role"] != "assistant":
+                continue
+            content = message.get("content")
+            if isinstance(content, list):
+                return "".join(block.get("text", "") for block in content if block.get("type") == "text")
+            return content or ""
+        return ""
+        
+    def _run_prompt(self, index: int, prompt: str, submitted_at: float) -> Dict[str, Any]:
+        """Run one prompt of generate_many in a fresh session"""
+        session = self.spawn_session()
+        timing = {"first_token": None}
+        session.add_hook(lambda e: timing.update(first_token=e["ttft"]) if e["event"] == "first_token" else None)
+        
+        start = time.perf_counter()
+        result = {
+            "index": index,
+            "prompt": prompt,
+            "session_id": session.session_id,
+            "queue_time": start - submitted_at,
+            "error": None
+        }
+        chunks = []
+        try:
+            for chunk in session.generate(prompt):
+                chunks.append(chunk)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        result.update({
+            "response": session.final_response(),
+            "output": "".join(chunks),
+            "messages": session.messages,
+            "duration": time.perf_counter() - start,
+            "ttft": timing["first_token"]
+        })
+        return result
+        
+    def generate_many(self, prompts: List[str], max_concurrency: int = 8) -> List[Dict[str, Any]]:
+        """Run many prompts as independent sessions with bounded concurrency.
+        
+        Every prompt gets its own session (see spawn_session) that shares this
+        session's client pool, tools and hooks. Errors are captured per prompt
+        instead of aborting the batch.
+        
+        Args:
+            prompts: The user messages to run
+            max_concurrency: Maximum number of prompts in flight at once
+            
+        Returns:
+            One result dict per prompt, in input order, with response, output,
+            messages, error, duration, ttft and queue_time (seconds)
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        submitted_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="generate-many") as executor:
+            futures = [
+                executor.submit(self._run_prompt, index, prompt, submitted_at)
+                for index, prompt in enumerate(prompts)
+            ]
+            return [future.result() for future in futures]
+        
+    def generate_batch(
+        self,
+        prompts: List[str],
+        backend: Optional[Any] = None,
+        poll_interval: float = 30.0,
+        timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Run many single-turn prompts through the provider's batch endpoint.
+        
+        Each prompt becomes one batch request with this session's system prompt,
+        tool definitions and model settings; the conversation history is not
+        included and not modified. Tools are sent so the model can request
+        them, but requested calls are returned rather than executed.
+        
+        Args:
+            prompts: The user messages to run
+            backend: Batch backend (defaults to the provider's batch API via this
+                session's client; pass a LocalBatchBackend to run offline)
+            poll_interval: Seconds between status checks
+            timeout: Seconds to wait for the batch before raising TimeoutError
+            
+        Returns:
+            One result dict per prompt, in input order, with custom_id, status,
+            response, message, tool_calls, stop_reason, usage and error
+        """
+        route = self._routes[self.provider]
+        if backend is None:
+            backend = create_batch_backend(self.provider, route["client"])
+        build_batch_request = (
+            build_anthropic_batch_request if self.provider == LLMProvider.ANTHROPIC
+            else build_openai_batch_request
+        )
+        requests = [
+            build_batch_request(
+                f"request-{index}",
+                self._request_params(route, [{"role": "user", "content": prompt}], log_settings=index == 0)
+            )
+            for index, prompt in enumerate(prompts)
+        ]
+        
+        batch_id = backend.submit(requests)
+        if self.debug_settings:
+            print(f"\n[Debug] Submitted batch {batch_id} with {len(requests)} requests")
+        wait_for_batch(backend, batch_id, poll_interval=poll_interval, timeout=timeout)
+        entries = backend.results(batch_id)
+        
+        results = []
+        for index, prompt in enumerate(prompts):
+            custom_id = f"request-{index}"
+            entry = entries.get(custom_id) or {
+                "status": "missing", "message": None, "stop_reason": None, "usage": None,
+                "error": "No result returned for this request"
+            }
+            if entry["status"] == "succeeded":
+                if self.debug_tokens:
+                    self.token_debugger.log_usage(entry["usage"])
+                self._emit("usage", latency=None, batch=True, **entry["usage"])
+            results.append({
+                "index": index,
+                "prompt": prompt,
+                "custom_id": custom_id,
+                "status": entry["status"],
+                "response": response_text(entry["message"]),
+                "message": entry["message"],
+                "tool_calls": requested_tool_calls(entry["message"]),
+                "stop_reason": entry["stop_reason"],
+                "usage": entry["usage"],
+                "error": entry["error"]
+            })
+        if self.debug_settings:
+            succeeded = sum(1 for result in results if result["status"] == "succeeded")
+            print(f"\n[Debug] Batch {batch_id} finished: {succeeded}/{len(results)} succeeded")
+        return results
         
     def clear_history(self) -> None:
         """Clear message history except system prompt"""
         self.messages = []
+        if self.journal is not None:
+            self.journal.record(self.session_id, "clear")
+            self._journal_position = 0
         if self.debug_tokens:
             self.token_debugger = TokenDebugger(self.model_name)
-            self.token_debugger.log_message("system", self.system_prompt) 
\ No newline at end of file
+            self.token_debugger.log_message("system", self.system_prompt + (self.context_prompt or ""))
\ No newline at end of file
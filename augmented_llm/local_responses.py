@@ -0,0 +1,144 @@
+"""
+In-process stand-in for the OpenAI Responses API with stored conversation state.
+
+LocalResponsesServer is passed to AugmentedLLM as the client of an OpenAI
+session running with server_side_state=True. It keeps the context of every
+response it has produced, resolves previous_response_id references the way the
+provider does, streams Responses-format events and records the size of every
+request, so the mode can be exercised and measured offline. Stored responses
+can be expired to test the fallback to a full resend.
+"""
+
+import itertools
+import json
+import threading
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import Dict, Any, Callable, Iterator, List, Optional
+from .token_debugger import TokenDebugger
+
+class LocalAPIError(Exception):
+    """Error raised like the SDK's APIStatusError, with status_code and code attributes."""
+
+    def __init__(self, message: str, status_code: int, code: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+
+def _item_text(item: Dict[str, Any]) -> str:
+    content = item.get("content")
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or item.get("output") or item.get("arguments") or ""
+
+def echo_responder(context: List[Dict[str, Any]], tools: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Default responder: answer with the last user message and the context size."""
+    last_user = next((item for item in reversed(context) if item.get("role") == "user"), {})
+    return {"text": f"[local] {_item_text(last_user)} ({len(context)} items in context)"}
+
+class LocalResponsesServer:
+    def __init__(
+        self,
+        respond: Optional[Callable[[List[Dict[str, Any]], List[Dict[str, Any]]], Dict[str, Any]]] = None,
+        max_stored: Optional[int] = None
+    ):
+        """Initialize the stand-in.
+
+        Args:
+            respond: Called with the full context (input items) and tools of a
+                request; returns {"text": str} or {"tool_calls": [{"name": str,
+                "arguments": dict}]} (defaults to echo_responder)
+            max_stored: Number of responses kept before the oldest expire
+        """
+        self.respond = respond or echo_responder
+        self.max_stored = max_stored
+        self.responses = self
+        self.requests: List[Dict[str, Any]] = []
+        self._stored: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._token_counter = TokenDebugger("gpt-4")
+
+    def expire(self, response_id: Optional[str] = None) -> None:
+        """Forget one stored response, or all of them."""
+        with self._lock:
+            if response_id is None:
+                self._stored.clear()
+            else:
+                self._stored.pop(response_id, None)
+
+    def create(self, **params) -> Iterator[SimpleNamespace]:
+        """Handle responses.create(); only streaming requests are supported."""
+        previous_id = params.get("previous_response_id")
+        with self._lock:
+            self.requests.append({
+                "bytes": len(json.dumps(params, separators=(",", ":"), default=str)),
+                "input_items": len(params["input"]),
+                "previous_response_id": previous_id
+            })
+            if previous_id is not None and previous_id not in self._stored:
+                raise LocalAPIError(
+                    f"Previous response with id '{previous_id}' not found.",
+                    status_code=400,
+                    code="previous_response_not_found"
+                )
+            context = list(self._stored[previous_id]) if previous_id else []
+        context.extend(params["input"])
+        reply = self.respond(context, params.get("tools") or [])
+
+        response_id = f"resp_local_{next(self._ids)}"
+        output_items = []
+        if reply.get("text"):
+            output_items.append({"role": "assistant", "content": reply["text"]})
+        for i, call in enumerate(reply.get("tool_calls") or []):
+            output_items.append({
+                "type": "function_call",
+                "call_id": f"call_{response_id}_{i}",
+                "name": call["name"],
+                "arguments": json.dumps(call["arguments"])
+            })
+        with self._lock:
+            self._stored[response_id] = context + output_items
+            if self.max_stored is not None:
+                while len(self._stored) > self.max_stored:
+                    self._stored.popitem(last=False)
+
+        input_tokens = self._token_counter.count_tokens(
+            (params.get("instructions") or "") + json.dumps(context, default=str)
+        )
+        output_tokens = self._token_counter.count_tokens(json.dumps(output_items))
+        return self._events(response_id, output_items, input_tokens, output_tokens)
+
+    @staticmethod
+    def _events(response_id: str, output_items: List[Dict[str, Any]], input_tokens: int, output_tokens: int) -> Iterator[SimpleNamespace]:
+        yield SimpleNamespace(type="response.created", response=SimpleNamespace(id=response_id))
+        for index, item in enumerate(output_items):
+            if item.get("type") == "function_call":
+                yield SimpleNamespace(
+                    type="response.output_item.added",
+                    output_index=index,
+                    item=SimpleNamespace(type="function_call", call_id=item["call_id"], name=item["name"], arguments="")
+                )
+                arguments = item["arguments"]
+                for start in range(0, len(arguments), 16):
+                    yield SimpleNamespace(
+                        type="response.function_call_arguments.delta",
+                        output_index=index,
+                        delta=arguments[start:start + 16]
+                    )
+            else:
+                yield SimpleNamespace(type="response.output_item.added", output_index=index, item=SimpleNamespace(type="message"))
+                text = item["content"]
+                for start in range(0, len(text), 16):
+                    yield SimpleNamespace(type="response.output_text.delta", output_index=index, delta=text[start:start + 16])
+        yield SimpleNamespace(
+            type="response.completed",
+            response=SimpleNamespace(
+                id=response_id,
+                usage=SimpleNamespace(
+                    input_tokens=input_tokens,
+                    output_tokens=output_tokens,
+                    input_tokens_details=SimpleNamespace(cached_tokens=0)
+                )
+            )
+        )
@@ -0,0 +1,117 @@
+from typing import Dict, Any, List
+import json
+from .providers import LLMProvider
+
+def _flatten_text(content: Any) -> str:
+    """Join the text of string or block-list content"""
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in content
+    )
+
+def anthropic_to_openai_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Convert an Anthropic message history to the OpenAI message format.
+
+    tool_use blocks become assistant tool_calls and each tool_result block
+    becomes a role="tool" message with the matching tool_call_id.
+    """
+    converted = []
+    for msg in messages:
+        content = msg.get("content")
+        if msg["role"] == "user":
+            if isinstance(content, str):
+                converted.append({"role": "user", "content": content})
+                continue
+            text_parts = []
+            for block in content:
+                if block.get("type") == "tool_result":
+                    converted.append({
+                        "role": "tool",
+                        "tool_call_id": block["tool_use_id"],
+                        "content": _flatten_text(block.get("content"))
+                    })
+                elif block.get("type") == "text":
+                    text_parts.append(block["text"])
+            if text_parts:
+                converted.append({"role": "user", "content": "".join(text_parts)})
+        elif msg["role"] == "assistant":
+            if isinstance(content, str):
+                converted.append({"role": "assistant", "content": content})
+                continue
+            text = "".join(block.get("text", "") for block in content if block.get("type") == "text")
+            tool_calls = [
+                {
+                    "id": block["id"],
+                    "type": "function",
+                    "function": {
+                        "name": block["name"],
+                        "arguments": json.dumps(block.get("input", {}))
+                    }
+                }
+                for block in content if block.get("type") == "tool_use"
+            ]
+            if tool_calls:
+                converted.append({"role": "assistant", "content": text or None, "tool_calls": tool_calls})
+            else:
+                converted.append({"role": "assistant", "content": text})
+    return converted
+
+def openai_to_anthropic_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Convert an OpenAI message history to the Anthropic message format.
+
+    Assistant tool_calls become tool_use blocks and consecutive role="tool"
+    messages are merged into one user message of tool_result blocks.
+    """
+    converted = []
+    for msg in messages:
+        if msg["role"] == "tool":
+            block = {
+                "type": "tool_result",
+                "tool_use_id": msg["tool_call_id"],
+                "content": _flatten_text(msg.get("content"))
+            }
+            previous = converted[-1] if converted else None
+            if (
+                previous is not None
+                and previous["role"] == "user"
+                and isinstance(previous["content"], list)
+                and previous["content"]
+                and previous["content"][0].get("type") == "tool_result"
+            ):
+                previous["content"].append(block)
+            else:
+                converted.append({"role": "user", "content": [block]})
+        elif msg["role"] == "user":
+            converted.append({"role": "user", "content": msg["content"]})
+        elif msg["role"] == "assistant":
+            blocks = []
+            text = _flatten_text(msg.get("content"))
+            if text:
+                blocks.append({"type": "text", "text": text})
+            for tool_call in msg.get("tool_calls") or []:
+                try:
+                    tool_input = json.loads(tool_call["function"]["arguments"] or "{}")
+                except json.JSONDecodeError:
+                    tool_input = {}
+                blocks.append({
+                    "type": "tool_use",
+                    "id": tool_call["id"],
+                    "name": tool_call["function"]["name"],
+                    "input": tool_input
+                })
+            # Anthropic rejects empty assistant turns
+            if blocks:
+                converted.append({"role": "assistant", "content": blocks})
+    return converted
+
+def translate_messages(messages: List[Dict[str, Any]], source: LLMProvider, target: LLMProvider) -> List[Dict[str, Any]]:
+    """Translate a message history between provider formats"""
+    if source == target:
+        return messages
+    if source == LLMProvider.ANTHROPIC:
+        return anthropic_to_openai_messages(messages)
+    return openai_to_anthropic_messages(messages)
@@ -1,125 +1,177 @@
 """
-Model cost configurations and categorizations for different AI models.
-Costs are specified in USD per 1,000,000 tokens.
+Model cost configurations and capabilities for different AI models.
+Costs are specified in USD per 1,000 tokens.
+
+"cached_input" is the rate for prompt-cache reads. Providers that bill cache
+writes separately (Anthropic) also list a "cache_write" rate.
+
+The data lives in model_pricing.json next to this module (or the file named by
+the AUGMENTED_LLM_MODEL_PRICING environment variable) and is compiled once at
+import into a ModelRegistry. Every spelling of a model name is indexed by its
+tokens, so a name is resolved by dropping any snapshot date suffix and looking
+up its longest known token prefix: 'claude-3-7-sonnet-20250219' and
+'gpt-4o-mini-2024-07-18' resolve without any per-call scanning, and the result
+is memoized per name.
 """
 
-MODEL_COSTS = {
-    # =====================
-    # REASONING MODELS
-    # =====================
-    "reasoning": {
-        "o1": {
-            "input": 0.015,
-            "cached_input": 0.0075,
-            "output": 0.060
-        },
-        "o1-mini": {
-            "input": 0.0011,
-            "cached_input": 0.00055,
-            "output": 0.0044
-        },
-        "o3-mini": {
-            "input": 0.0011,
-            "cached_input": 0.00055,
-            "output": 0.0044
-        }
-    },
-
-    # =====================
-    # NON-REASONING MODELS
-    # =====================
-    "non_reasoning": {
-        # GPT Models
-        "gpt-4o": {
-            "input": 0.0025,
-            "cached_input": 0.00125,
-            "output": 0.010
-        },
-        "chatgpt-4o-latest": {
-            "input": 0.0025,
-            "cached_input": 0.00125,
-            "output": 0.010
-        },
-        "gpt-4o-mini": {
-            "input": 0.00015,
-            "cached_input": 0.000075,
-            "output": 0.0006
-        },
-        # Claude Models
-        "claude-3.5-sonnet": {
-            "input": 0.003,
-            "cached_input": 0.00375,
-            "output": 0.015
-        },
-        "claude-3.5-haiku": {
-            "input": 0.001,
-            "cached_input": 0.001,
-            "output": 0.005
-        },
-        "claude-3-opus": {
-            "input": 0.015,
-            "cached_input": 0.01875,
-            "output": 0.075
+import json
+import os
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+DEFAULT_PRICING_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_pricing.json")
+PRICING_FILE_ENV = "AUGMENTED_LLM_MODEL_PRICING"
+
+# Snapshot dates providers append to model names (-20250219, -2024-08-06)
+_DATE_SUFFIX = re.compile(r"-(\d{8}|\d{4}-\d{2}-\d{2})$")
+_SEPARATORS = re.compile(r"[\s._]+")
+
+def strip_date_suffix(model_name: str) -> str:
+    """Remove a trailing snapshot date from a model name."""
+    return _DATE_SUFFIX.sub("", model_name.strip())
+
+def _name_tokens(model_name: str) -> Tuple[str, ...]:
+    """Split a model name into lowercase tokens, ignoring separators and snapshot dates."""
+    name = model_name.strip().lower()
+    if name.startswith("ft:"):
+        # Fine-tuned models: ft:gpt-4o-mini-2024-07-18:org::id
+        name = name.split(":")[1]
+    name = name.rsplit("/", 1)[-1]  # Provider-prefixed names such as openai/gpt-4o
+    name = _DATE_SUFFIX.sub("", _SEPARATORS.sub("-", name))
+    return tuple(token for token in name.split("-") if token)
+
+class ModelRegistry:
+    """Compiled index of model costs and capabilities.
+
+    Each entry is a dict with name, provider, reasoning, max_output_tokens,
+    prompt_caching, aliases, costs and known (False for names that matched no
+    model and got the defaults).
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        """Compile the registry.
+
+        Args:
+            data: Parsed pricing file with "defaults" and "models" sections
+
+        Raises:
+            ValueError: If two models claim the same name or alias
+        """
+        self.defaults = data.get("defaults", {})
+        self.models: Dict[str, Dict[str, Any]] = {}
+        self._index: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        self._resolved: Dict[str, Dict[str, Any]] = {}
+
+        for name, spec in data["models"].items():
+            info = self._entry(name, spec, known=True)
+            self.models[name] = info
+            for spelling in [name, *info["aliases"]]:
+                key = _name_tokens(spelling)
+                existing = self._index.get(key)
+                if existing is not None and existing is not info:
+                    raise ValueError(f"Model name '{spelling}' is claimed by both {existing['name']} and {name}")
+                self._index[key] = info
+        self._longest_key = max((len(key) for key in self._index), default=0)
+
+    def _entry(self, name: str, spec: Dict[str, Any], known: bool) -> Dict[str, Any]:
+        return {
+            "name": name,
+            "provider": spec.get("provider", self.defaults.get("provider")),
+            "reasoning": spec.get("reasoning", self.defaults.get("reasoning", False)),
+            "max_output_tokens": spec.get("max_output_tokens", self.defaults.get("max_output_tokens")),
+            "prompt_caching": spec.get("prompt_caching", self.defaults.get("prompt_caching", True)),
+            "aliases": list(spec.get("aliases", [])),
+            "costs": dict(spec.get("costs") or self.defaults.get("costs") or {"input": 0.0, "cached_input": 0.0, "output": 0.0}),
+            "known": known
         }
-    }
-}
-
-# Mapping of model name variations to their standardized names
-MODEL_NAME_MAPPING = {
-    # Reasoning models
-    "o1": ["o1", "o-1"],
-    "o1-mini": ["o1mini", "o1-mini", "o1_mini"],
-    "o3-mini": ["o3mini", "o3-mini", "o3_mini"],
-    
-    # GPT models
-    "gpt-4o": ["gpt4o", "gpt-4o", "gpt_4o"],
-    "chatgpt-4o-latest": ["chatgpt4o", "chatgpt-4o", "chatgpt_4o"],
-    "gpt-4o-mini": ["gpt4omini", "gpt-4o-mini", "gpt_4o_mini"],
-    
-    # Claude models
-    "claude-3.5-sonnet": ["claude-3-5-sonnet", "claude35sonnet", "claude3.5sonnet"],
-    "claude-3.5-haiku": ["claude-3-5-haiku", "claude35haiku", "claude3.5haiku"],
-    "claude-3-opus": ["claude3opus", "claude-3opus", "claude3-opus"]
-}
+
+    @classmethod
+    def from_file(cls, path: str) -> "ModelRegistry":
+        """Compile the registry from a pricing file."""
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def resolve(self, model_name: str) -> Dict[str, Any]:
+        """Return the entry for a model name, falling back to the defaults for unknown models."""
+        info = self._resolved.get(model_name)
+        if info is not None:
+            return info
+        tokens = _name_tokens(model_name)
+        for length in range(min(len(tokens), self._longest_key), 0, -1):
+            info = self._index.get(tokens[:length])
+            if info is not None:
+                break
+        else:
+            info = self._entry(strip_date_suffix(model_name), {}, known=False)
+        self._resolved[model_name] = info
+        return info
+
+# Views kept for code that reads the tables directly; refreshed on every load
+MODEL_COSTS: Dict[str, Dict[str, Dict[str, float]]] = {"reasoning": {}, "non_reasoning": {}}
+MODEL_NAME_MAPPING: Dict[str, List[str]] = {}
+
+_registry: Optional[ModelRegistry] = None
+
+def load_model_registry(path: Optional[str] = None) -> ModelRegistry:
+    """
+    Compile the model registry and make it the one used by this module.
+
+    Args:
+        path: Pricing file to load (defaults to $AUGMENTED_LLM_MODEL_PRICING,
+            then the model_pricing.json shipped with the package)
+
+    Returns:
+        The compiled ModelRegistry
+    """
+    global _registry
+    registry = ModelRegistry.from_file(path or os.getenv(PRICING_FILE_ENV) or DEFAULT_PRICING_FILE)
+
+    for table in MODEL_COSTS.values():
+        table.clear()
+    MODEL_NAME_MAPPING.clear()
+    for name, info in registry.models.items():
+        MODEL_COSTS["reasoning" if info["reasoning"] else "non_reasoning"][name] = info["costs"]
+        MODEL_NAME_MAPPING[name] = [name, *info["aliases"]]
+
+    _registry = registry
+    return registry
+
+def get_model_info(model_name: str) -> Dict[str, Any]:
+    """
+    Get the registry entry (costs and capabilities) for a model.
+
+    Args:
+        model_name: The name of the model, with or without a date suffix
+
+    Returns:
+        Dict with name, provider, reasoning, max_output_tokens, prompt_caching,
+        aliases, costs and known
+    """
+    return _registry.resolve(model_name)
 
 def get_model_type(model_name: str) -> str:
     """
     Determine if a model is a reasoning or non-reasoning model.
-    
+
     Args:
         model_name: The name of the model to check
-        
+
     Returns:
         'reasoning' or 'non_reasoning'
     """
-    # Check reasoning models
-    for model in MODEL_COSTS["reasoning"].keys():
-        if model in model_name.lower():
-            return "reasoning"
-            
-    # Default to non-reasoning
-    return "non_reasoning"
+    return "reasoning" if _registry.resolve(model_name)["reasoning"] else "non_reasoning"
 
 def get_model_costs(model_name: str) -> dict:
     """
     Get the cost configuration for a specific model.
-    
+
     Args:
         model_name: The name of the model to get costs for
-        
+
     Returns:
-        Dict containing input, cached_input, and output costs
+        Dict containing input, cached_input, and output costs (zero if the
+        model is unknown)
     """
-    model_type = get_model_type(model_name)
-    
-    # Search through models in the appropriate category
-    for model, costs in MODEL_COSTS[model_type].items():
-        if model in model_name.lower():
-            return costs
-            
-    # Return zero costs if model not found
-    return {
-        "input": 0.0,
-        "cached_input": 0.0,
-        "output": 0.0
-    } 
\ No newline at end of file
+    return _registry.resolve(model_name)["costs"]
+
+load_model_registry()
@@ -1,33 +1,51 @@
-from openai import OpenAI
-from typing import Dict, Any, Generator, List
+from typing import Dict, Any, Generator, List, Optional, Callable, TYPE_CHECKING
 import json
-from .model_costs import get_model_type
+from .model_costs import get_model_info
+from .json_stream import IncrementalJSONParser
+from .stream_events import StreamEvent, TextDelta, Usage
 
-def process_openai_stream(stream, messages: List[Dict[str, Any]], debug_tools: bool = False) -> Generator[str, None, Dict[str, Any]]:
-    """Process OpenAI message stream and handle tool usage"""
-    current_content = ""
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+def process_openai_stream(stream, messages: List[Dict[str, Any]], debug_tools: bool = False, on_first_token: Optional[Callable[[], None]] = None, on_tool_ready: Optional[Callable[[Dict[str, Any]], None]] = None) -> Generator[StreamEvent, None, Dict[str, Any]]:
+    """Process OpenAI message stream and handle tool usage.
+    
+    Yields TextDelta events and, if the provider reported it, a final Usage
+    event. on_first_token is called once, when the first content or tool call delta arrives.
+    on_tool_ready is called with each tool call as soon as its arguments form a
+    complete JSON object, while the rest of the response is still streaming.
+    """
+    content_parts: List[str] = []
     tool_calls = {}
+    argument_parsers: Dict[int, IncrementalJSONParser] = {}
     has_tool_calls = False
+    usage = None
     
     try:
         for chunk in stream:
-            if not hasattr(chunk, 'choices'):
+            # The final chunk carries usage (when requested) and no choices
+            if getattr(chunk, 'usage', None) is not None:
+                usage = extract_openai_usage(chunk.usage)
+            if not getattr(chunk, 'choices', None):
                 continue
                 
             delta = chunk.choices[0].delta
+            if on_first_token is not None and (getattr(delta, 'content', None) or getattr(delta, 'tool_calls', None)):
+                on_first_token()
+                on_first_token = None
             
             # Handle content
             if hasattr(delta, 'content') and delta.content is not None:
-                current_content += delta.content
+                content_parts.append(delta.content)
                 # Always yield actual content, but handle debug messages differently
                 if debug_tools:
                     if not delta.content.startswith("[Debug]"):
-                        yield delta.content
+                        yield TextDelta(delta.content)
                     # Print debug messages to console directly
                     else:
                         print(delta.content)
                 else:
-                    yield delta.content
+                    yield TextDelta(delta.content)
 
             # Handle tool calls
             if hasattr(delta, 'tool_calls') and delta.tool_calls:
@@ -43,12 +61,24 @@ def process_openai_stream(stream, messages: List[Dict[str, Any]], debug_tools: b
                                 "arguments": ""
                             }
                         }
+                        argument_parsers[index] = IncrementalJSONParser()
                     if tool_call.function.arguments:
-                        tool_calls[index]["function"]["arguments"] += tool_call.function.arguments
+                        parser = argument_parsers[index]
+                        if not parser.complete and parser.feed(tool_call.function.arguments):
+                            tool_calls[index]["function"]["arguments"] = parser.text
+                            if on_tool_ready is not None:
+                                on_tool_ready(tool_calls[index])
     except Exception as e:
         print(f"\n[Debug] Error processing stream: {str(e)}")
         raise
 
+    if usage is not None:
+        yield Usage(**usage)
+        
+    current_content = "".join(content_parts)
+    for index, parser in argument_parsers.items():
+        tool_calls[index]["function"]["arguments"] = parser.text
+        
     # Prepare message to return
     message = {
         "role": "assistant",
@@ -61,95 +91,350 @@ def process_openai_stream(stream, messages: List[Dict[str, Any]], debug_tools: b
         "message": message,
         "has_tool_calls": has_tool_calls,
         "tool_calls": tool_calls,
-        "content": current_content
+        "content": current_content,
+        "usage": usage
+    }
+
+def extract_openai_usage(usage) -> Dict[str, int]:
+    """Convert an OpenAI usage object to the same keys used for Anthropic.
+    
+    OpenAI's prompt_tokens include the cached prefix, so like Anthropic's
+    input_tokens the returned input_tokens only count uncached input.
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", None) or 0
+    return {
+        "input_tokens": (getattr(usage, "prompt_tokens", 0) or 0) - cached_tokens,
+        "output_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "cache_read_input_tokens": cached_tokens,
+        # OpenAI caches prefixes automatically and does not bill cache writes
+        "cache_creation_input_tokens": 0
     }
 
-def create_openai_stream(client: OpenAI, debug_tools: bool = False, **kwargs):
+def is_openai_content_event(chunk) -> bool:
+    """Check if a stream chunk carries model output (text or tool calls)"""
+    choices = getattr(chunk, 'choices', None)
+    if not choices:
+        return False
+    delta = choices[0].delta
+    return bool(getattr(delta, 'content', None) or getattr(delta, 'tool_calls', None))
+
+def create_openai_stream(client: "OpenAI", debug_tools: bool = False, **kwargs):
     """Create a stream using OpenAI's API"""
     # Ensure stream parameter is set
     kwargs["stream"] = True
     
-    # Transform tools into correct format if present
+    # Transform tools into correct format if present (precompiled tools pass through)
     if "tools" in kwargs and kwargs["tools"]:
-        transformed_tools = []
-        for tool in kwargs["tools"]:
-            if tool["type"] == "function":
-                # Extract existing properties
-                function_data = tool["function"]
-                parameters = function_data["parameters"]
-                
-                # Clean properties by removing default values
-                cleaned_properties = {}
-                for prop_name, prop_data in parameters["properties"].items():
-                    cleaned_prop = {k: v for k, v in prop_data.items() if k != "default"}
-                    cleaned_properties[prop_name] = cleaned_prop
-                
-                # When strict is true, all properties must be required
-                all_properties = list(cleaned_properties.keys())
-                
-                # Create new tool structure
-                transformed_tool = {
-                    "type": "function",
-                    "function": {
-                        "name": function_data["name"],
-                        "strict": True,
-                        "parameters": {
-                            "type": "object",
-                            "required": all_properties,
-                            "properties": cleaned_properties,
-                            "additionalProperties": False
-                        },
-                        "description": function_data["description"]
-                    }
-                }
-                transformed_tools.append(transformed_tool)
-        
-        # Replace original tools with transformed ones
-        kwargs["tools"] = transformed_tools
+        kwargs["tools"] = transform_openai_tools(kwargs["tools"])
     
     return client.chat.completions.create(**kwargs)
 
-def prepare_openai_messages(messages: List[Dict[str, Any]], system_prompt: str, model_name: str) -> List[Dict[str, Any]]:
-    """Prepare messages for OpenAI format"""
-    # Check if this is a reasoning model
-    is_reasoning = get_model_type(model_name) == "reasoning"
+def compile_openai_tool(tool: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a function tool config to a strict-mode schema.
+    
+    The result is final: sessions compile each tool once when it is added,
+    and transform_openai_tools passes compiled tools through unchanged.
+    """
+    if tool["type"] != "function" or tool["function"].get("strict"):
+        return tool
+    function_data = tool["function"]
+    parameters = function_data["parameters"]
     
-    prepared_messages = [{
-        "role": "developer" if is_reasoning else "system",
+    # Clean properties by removing default values
+    cleaned_properties = {}
+    for prop_name, prop_data in parameters["properties"].items():
+        cleaned_prop = {k: v for k, v in prop_data.items() if k != "default"}
+        cleaned_properties[prop_name] = cleaned_prop
+    
+    # When strict is true, all properties must be required
+    all_properties = list(cleaned_properties.keys())
+    
+    return {
+        "type": "function",
+        "function": {
+            "name": function_data["name"],
+            "strict": True,
+            "parameters": {
+                "type": "object",
+                "required": all_properties,
+                "properties": cleaned_properties,
+                "additionalProperties": False
+            },
+            "description": function_data["description"]
+        }
+    }
+
+def transform_openai_tools(tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Convert function tool configs to strict-mode schemas"""
+    return [compile_openai_tool(tool) for tool in tools if tool["type"] == "function"]
+
+def build_openai_batch_request(custom_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Package streaming request parameters as one line of an OpenAI batch input file"""
+    body = {k: v for k, v in params.items() if k not in ("stream", "stream_options")}
+    if body.get("tools"):
+        body["tools"] = transform_openai_tools(body["tools"])
+    else:
+        body.pop("tools", None)
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": body
+    }
+
+def _system_messages(system_prompt: str, model_name: str, context_prompt: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Build the leading system (or developer, for reasoning models) messages"""
+    # Reasoning models take developer messages instead of system messages
+    system_role = "developer" if get_model_info(model_name)["reasoning"] else "system"
+    
+    system_messages = [{
+        "role": system_role,
         "content": system_prompt
     }]
+    if context_prompt:
+        system_messages.append({
+            "role": system_role,
+            "content": context_prompt
+        })
+    return system_messages
+
+def _prepare_message(msg: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Convert one history message to the request format (None if it is not sent)"""
+    if msg["role"] == "user":
+        return {
+            "role": "user",
+            "content": msg["content"]
+        }
+    elif msg["role"] == "assistant":
+        if msg.get("tool_calls"):
+            return {
+                "role": "assistant",
+                "content": msg.get("content"),
+                "tool_calls": msg["tool_calls"]
+            }
+        return {
+            "role": "assistant",
+            "content": msg.get("content", "")
+        }
+    elif msg["role"] == "tool":
+        return {
+            "role": "tool",
+            "tool_call_id": msg["tool_call_id"],
+            "content": msg["content"]
+        }
+    return None
+
+def prepare_openai_messages(messages: List[Dict[str, Any]], system_prompt: str, model_name: str, context_prompt: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Prepare messages for OpenAI format.
     
+    A context_prompt (volatile text such as the current time) is sent as a
+    separate system message so the static system prompt stays a cacheable prefix.
+    """
+    prepared_messages = _system_messages(system_prompt, model_name, context_prompt)
     for msg in messages:
-        if msg["role"] == "user":
-            prepared_messages.append({
-                "role": "user",
-                "content": msg["content"]
-            })
-        elif msg["role"] == "assistant":
-            if msg.get("tool_calls"):
-                prepared_messages.append({
-                    "role": "assistant",
-                    "content": msg.get("content"),
-                    "tool_calls": msg["tool_calls"]
-                })
-            else:
-                prepared_messages.append({
-                    "role": "assistant",
-                    "content": msg.get("content", "")
-                })
-        elif msg["role"] == "tool":
-            prepared_messages.append({
-                "role": "tool",
-                "tool_call_id": msg["tool_call_id"],
-                "content": msg["content"]
-            })
-            
+        prepared = _prepare_message(msg)
+        if prepared is not None:
+            prepared_messages.append(prepared)
     return prepared_messages
 
+class PreparedMessages:
+    """OpenAI request messages kept in step with a session's history.
+    
+    sync() converts only the messages appended since the previous call, so
+    assembling a request costs O(new messages) instead of O(history). The
+    list is rebuilt when the history was replaced (trimming, failover, clear)
+    or the system prompt or model changed.
+    """
+    
+    def __init__(self):
+        self._source: Optional[List[Dict[str, Any]]] = None
+        self._count = 0
+        self._last: Optional[Dict[str, Any]] = None
+        self._header: Optional[tuple] = None
+        self._prepared: List[Dict[str, Any]] = []
+        
+    def sync(self, messages: List[Dict[str, Any]], system_prompt: str, model_name: str, context_prompt: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Bring the prepared list up to date with messages and return it.
+        
+        The returned list is owned by this object and grows on later calls;
+        callers must not modify it.
+        """
+        header = (system_prompt, context_prompt, model_name)
+        rebuild = (
+            messages is not self._source
+            or header != self._header
+            or len(messages) < self._count
+            # The last converted message was replaced in place
+            or (self._count and messages[self._count - 1] is not self._last)
+        )
+        if rebuild:
+            self._source = messages
+            self._header = header
+            self._count = 0
+            self._prepared = _system_messages(system_prompt, model_name, context_prompt)
+        
+        for msg in messages[self._count:]:
+            prepared = _prepare_message(msg)
+            if prepared is not None:
+                self._prepared.append(prepared)
+        self._count = len(messages)
+        self._last = messages[-1] if messages else None
+        return self._prepared
+
 def format_tool_result_message(tool_call: Dict[str, Any], result: str) -> Dict[str, Any]:
     """Format tool result message for OpenAI"""
     return {
         "role": "tool",
         "tool_call_id": tool_call["id"],
         "content": result
-    } 
\ No newline at end of file
+    }
+
+
+# Responses API (server-side conversation state). The session history stays in
+# the Chat Completions format above; these helpers convert at the request
+# boundary and turn Responses stream events back into the same turn result.
+
+def to_responses_input(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Convert Chat Completions history messages to Responses API input items"""
+    items = []
+    for msg in messages:
+        if msg["role"] == "user":
+            items.append({"role": "user", "content": msg["content"]})
+        elif msg["role"] == "assistant":
+            if msg.get("content"):
+                items.append({"role": "assistant", "content": msg["content"]})
+            for tool_call in msg.get("tool_calls") or []:
+                items.append({
+                    "type": "function_call",
+                    "call_id": tool_call["id"],
+                    "name": tool_call["function"]["name"],
+                    "arguments": tool_call["function"]["arguments"]
+                })
+        elif msg["role"] == "tool":
+            items.append({
+                "type": "function_call_output",
+                "call_id": msg["tool_call_id"],
+                "output": msg["content"]
+            })
+    return items
+
+def to_responses_tool(tool: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a compiled function tool to the flat Responses API tool format"""
+    function_data = tool["function"]
+    return {
+        "type": "function",
+        "name": function_data["name"],
+        "description": function_data["description"],
+        "parameters": function_data["parameters"],
+        "strict": function_data.get("strict", False)
+    }
+
+def create_openai_response_stream(client: "OpenAI", **kwargs):
+    """Create a stream using OpenAI's Responses API"""
+    kwargs["stream"] = True
+    return client.responses.create(**kwargs)
+
+def is_expired_response_error(error: Exception) -> bool:
+    """Check if a request failed because its previous_response_id is no longer stored"""
+    if getattr(error, "code", None) == "previous_response_not_found":
+        return True
+    return getattr(error, "status_code", None) == 404 and "previous_response" in str(error)
+
+def extract_openai_response_usage(usage) -> Dict[str, int]:
+    """Convert a Responses API usage object to the same keys used for Anthropic (uncached input_tokens)"""
+    details = getattr(usage, "input_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", None) or 0
+    return {
+        "input_tokens": (getattr(usage, "input_tokens", 0) or 0) - cached_tokens,
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+        "cache_read_input_tokens": cached_tokens,
+        "cache_creation_input_tokens": 0
+    }
+
+def is_openai_response_content_event(event) -> bool:
+    """Check if a Responses API stream event carries model output (text or tool calls)"""
+    return getattr(event, "type", None) in ("response.output_text.delta", "response.function_call_arguments.delta")
+
+def process_openai_response_stream(stream, messages: List[Dict[str, Any]], debug_tools: bool = False, on_first_token: Optional[Callable[[], None]] = None, on_tool_ready: Optional[Callable[[Dict[str, Any]], None]] = None) -> Generator[StreamEvent, None, Dict[str, Any]]:
+    """Process a Responses API stream like process_openai_stream.
+    
+    The assistant message is appended to messages in the Chat Completions
+    format, and the result additionally carries the response_id that the next
+    request can reference instead of resending the history.
+    """
+    content_parts: List[str] = []
+    tool_calls = {}
+    argument_parsers: Dict[int, IncrementalJSONParser] = {}
+    usage = None
+    response_id = None
+    
+    try:
+        for event in stream:
+            event_type = event.type
+            if event_type in ("response.created", "response.completed"):
+                response_id = event.response.id
+                if event_type == "response.completed" and getattr(event.response, "usage", None) is not None:
+                    usage = extract_openai_response_usage(event.response.usage)
+                    
+            elif event_type == "response.output_text.delta":
+                if on_first_token is not None:
+                    on_first_token()
+                    on_first_token = None
+                content_parts.append(event.delta)
+                if debug_tools and event.delta.startswith("[Debug]"):
+                    print(event.delta)
+                else:
+                    yield TextDelta(event.delta)
+                    
+            elif event_type == "response.output_item.added" and event.item.type == "function_call":
+                if on_first_token is not None:
+                    on_first_token()
+                    on_first_token = None
+                tool_calls[event.output_index] = {
+                    "id": event.item.call_id,
+                    "type": "function",
+                    "function": {
+                        "name": event.item.name,
+                        "arguments": ""
+                    }
+                }
+                argument_parsers[event.output_index] = IncrementalJSONParser()
+                
+            elif event_type == "response.function_call_arguments.delta":
+                parser = argument_parsers.get(event.output_index)
+                if parser is not None and not parser.complete and parser.feed(event.delta):
+                    tool_calls[event.output_index]["function"]["arguments"] = parser.text
+                    if on_tool_ready is not None:
+                        on_tool_ready(tool_calls[event.output_index])
+                        
+            elif event_type in ("response.failed", "error"):
+                error = getattr(getattr(event, "response", None), "error", None) or getattr(event, "message", None)
+                raise RuntimeError(f"Response failed: {error}")
+    except Exception as e:
+        print(f"\n[Debug] Error processing stream: {str(e)}")
+        raise
+
+    if usage is not None:
+        yield Usage(**usage)
+        
+    current_content = "".join(content_parts)
+    for index, parser in argument_parsers.items():
+        tool_calls[index]["function"]["arguments"] = parser.text
+    has_tool_calls = bool(tool_calls)
+    
+    message = {
+        "role": "assistant",
+        "content": current_content if not has_tool_calls else None,
+        "tool_calls": list(tool_calls.values()) if has_tool_calls else None
+    }
+    
+    messages.append(message)
+    return {
+        "message": message,
+        "has_tool_calls": has_tool_calls,
+        "tool_calls": tool_calls,
+        "content": current_content,
+        "usage": usage,
+        "response_id": response_id
+    }
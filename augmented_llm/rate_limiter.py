@@ -0,0 +1,299 @@
+"""
+Token-bucket rate limiting for provider requests.
+
+A RateLimiter keeps two buckets per model, one for requests per minute and one
+for tokens per minute. Callers reserve an estimated token count before a
+request; acquire() blocks (rather than failing) until both buckets have room,
+and reconcile() corrects the token bucket once the provider reports actual
+usage. Waiting callers of the same model are served one at a time, so a burst
+drains as a steady queue instead of a thundering herd of 429s.
+
+Bucket state lives in a store. LocalBucketStore coordinates threads of one
+process; FileBucketStore keeps the state in a lock-protected file so several
+worker processes on one host share the same limits.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple, Union
+from .token_debugger import TokenDebugger
+
+# (bucket key, amount, capacity, refill per second)
+BucketRequest = Tuple[str, float, float, float]
+
+def _take(state: Dict[str, List[float]], requests: List[BucketRequest], now: float) -> float:
+    """Refill the buckets and take every amount, or return the seconds to wait.
+
+    Amounts are only taken when all buckets have room, so a request never
+    holds part of its reservation while waiting.
+    """
+    wait = 0.0
+    levels = {}
+    for key, amount, capacity, rate in requests:
+        tokens, updated = state.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        levels[key] = tokens
+        if tokens < amount:
+            wait = max(wait, (amount - tokens) / rate)
+    for key, amount, _, _ in requests:
+        state[key] = [levels[key] - (amount if wait == 0 else 0), now]
+    return wait
+
+def _adjust(state: Dict[str, List[float]], key: str, delta: float, capacity: float, rate: float, now: float) -> None:
+    """Return (positive delta) or debit (negative delta) tokens of a bucket."""
+    tokens, updated = state.get(key, (capacity, now))
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    # Debits may push the level below zero so later requests wait for the overrun
+    state[key] = [min(capacity, tokens + delta), now]
+
+class LocalBucketStore:
+    """Bucket state shared by the threads of one process."""
+
+    def __init__(self):
+        self._state: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, requests: List[BucketRequest]) -> float:
+        """Take from every bucket if possible.
+
+        Returns:
+            0 if the amounts were taken, otherwise the seconds to wait
+        """
+        with self._lock:
+            return _take(self._state, requests, time.time())
+
+    def adjust(self, key: str, delta: float, capacity: float, rate: float) -> None:
+        """Return or debit tokens of one bucket."""
+        with self._lock:
+            _adjust(self._state, key, delta, capacity, rate, time.time())
+
+class FileBucketStore:
+    """Bucket state kept in a file guarded by an exclusive lock.
+
+    Every process that points a FileBucketStore at the same path shares the
+    same buckets. Requires fcntl (POSIX).
+    """
+
+    def __init__(self, path: str = "logs/rate_limits.json"):
+        """Initialize the store.
+
+        Args:
+            path: State file shared by all cooperating processes
+        """
+        import fcntl  # Imported lazily; only available on POSIX
+        self._fcntl = fcntl
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _update(self, operation) -> Any:
+        with open(self.path, "a+", encoding="utf-8") as f:
+            self._fcntl.flock(f, self._fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                state = json.loads(raw) if raw else {}
+                result = operation(state, time.time())
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+                return result
+            finally:
+                self._fcntl.flock(f, self._fcntl.LOCK_UN)
+
+    def try_acquire(self, requests: List[BucketRequest]) -> float:
+        """Take from every bucket if possible.
+
+        Returns:
+            0 if the amounts were taken, otherwise the seconds to wait
+        """
+        return self._update(lambda state, now: _take(state, requests, now))
+
+    def adjust(self, key: str, delta: float, capacity: float, rate: float) -> None:
+        """Return or debit tokens of one bucket."""
+        self._update(lambda state, now: _adjust(state, key, delta, capacity, rate, now))
+
+class RateLimiter:
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Dict[str, int]]] = None,
+        store: Optional[Union[LocalBucketStore, FileBucketStore]] = None,
+        max_wait_interval: float = 1.0,
+        debug: bool = False
+    ):
+        """Initialize the rate limiter.
+
+        Args:
+            limits: Optional mapping of model name to {"rpm": ..., "tpm": ...}
+            store: Where bucket state is kept (defaults to a LocalBucketStore)
+            max_wait_interval: Longest single sleep while waiting for capacity
+            debug: Print a line whenever a request has to wait
+        """
+        self.store = store or LocalBucketStore()
+        self.max_wait_interval = max_wait_interval
+        self.debug = debug
+        self._limits: Dict[str, Dict[str, int]] = {}
+        self._turnstiles: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._token_counter = TokenDebugger("gpt-4")
+        self.total_wait_time = 0.0
+        self.waited_requests = 0
+        for model, model_limits in (limits or {}).items():
+            self.set_limits(model, **model_limits)
+
+    def set_limits(self, model: str, rpm: Optional[int] = None, tpm: Optional[int] = None) -> None:
+        """Set the per-minute limits of a model.
+
+        The limits also apply to dated variants, e.g. limits for "gpt-4o" cover
+        "gpt-4o-2024-08-06" unless that name has limits of its own.
+
+        Args:
+            model: Model name or name prefix
+            rpm: Requests per minute (None for unlimited)
+            tpm: Tokens per minute (None for unlimited)
+        """
+        with self._lock:
+            self._limits[model] = {"rpm": rpm, "tpm": tpm}
+
+    def get_limits(self, model: str) -> Optional[Tuple[str, Dict[str, int]]]:
+        """Return the (configured name, limits) that apply to a model, if any."""
+        with self._lock:
+            matches = [name for name in self._limits if model.startswith(name)]
+            if not matches:
+                return None
+            name = max(matches, key=len)
+            return name, self._limits[name]
+
+    def is_limited(self, model: str) -> bool:
+        """Check if any limit applies to a model."""
+        return self.get_limits(model) is not None
+
+    def estimate_tokens(self, *parts: Any, max_output_tokens: int = 0, token_counter: Optional[TokenDebugger] = None) -> int:
+        """Estimate the tokens a request counts against the limit.
+
+        Args:
+            parts: Prompt pieces (strings or JSON-serializable messages/tools)
+            max_output_tokens: Output tokens reserved for the response
+            token_counter: TokenDebugger used for counting (defaults to a shared one)
+
+        Returns:
+            Estimated prompt tokens plus the reserved output tokens
+        """
+        counter = token_counter or self._token_counter
+        text = "".join(part if isinstance(part, str) else json.dumps(part, default=str) for part in parts if part)
+        return counter.count_tokens(text) + max_output_tokens
+
+    def _buckets(self, name: str, model_limits: Dict[str, int], tokens: int) -> List[BucketRequest]:
+        requests = []
+        if model_limits.get("rpm"):
+            rpm = model_limits["rpm"]
+            requests.append((f"{name}:requests", 1, rpm, rpm / 60.0))
+        if model_limits.get("tpm"):
+            tpm = model_limits["tpm"]
+            # A request larger than the whole bucket would never fit; let it drain the bucket instead
+            requests.append((f"{name}:tokens", min(tokens, tpm), tpm, tpm / 60.0))
+        return requests
+
+    def acquire(self, model: str, tokens: int = 0) -> Optional[Dict[str, Any]]:
+        """Block until a request for a model fits within its limits.
+
+        Args:
+            model: Model the request is sent to
+            tokens: Estimated tokens of the request
+
+        Returns:
+            A reservation to pass to reconcile(), or None if the model is unlimited
+        """
+        applied = self.get_limits(model)
+        if applied is None:
+            return None
+        name, model_limits = applied
+        requests = self._buckets(name, model_limits, tokens)
+        if not requests:
+            return None
+
+        with self._lock:
+            turnstile = self._turnstiles.setdefault(name, threading.Lock())
+        start = time.perf_counter()
+        # Waiters of the same model queue here, so capacity is handed out in arrival order
+        with turnstile:
+            while True:
+                wait = self.store.try_acquire(requests)
+                if wait <= 0:
+                    break
+                time.sleep(min(wait, self.max_wait_interval))
+        waited = time.perf_counter() - start
+
+        if waited > 0.001:
+            with self._lock:
+                self.total_wait_time += waited
+                self.waited_requests += 1
+            if self.debug:
+                print(f"\n[Debug] Rate limiter delayed {model} request by {waited:.2f}s")
+        return {"limits": name, "model": model, "tokens": tokens, "waited": waited}
+
+    def reconcile(self, reservation: Optional[Dict[str, Any]], actual_tokens: int) -> None:
+        """Correct a reservation with the tokens the provider actually reported.
+
+        Args:
+            reservation: Value returned by acquire()
+            actual_tokens: Input plus output tokens of the finished request
+        """
+        if reservation is None:
+            return
+        with self._lock:
+            model_limits = self._limits.get(reservation["limits"])
+        if not model_limits or not model_limits.get("tpm"):
+            return
+        tpm = model_limits["tpm"]
+        delta = min(reservation["tokens"], tpm) - actual_tokens
+        if delta:
+            self.store.adjust(f"{reservation['limits']}:tokens", delta, tpm, tpm / 60.0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the configured limits and how long requests have waited."""
+        with self._lock:
+            return {
+                "limits": {name: dict(model_limits) for name, model_limits in self._limits.items()},
+                "waited_requests": self.waited_requests,
+                "total_wait_time": round(self.total_wait_time, 3)
+            }
+
+# Limiter shared by AugmentedLLM, OpenAIChatInterface and generate_knowledge_graph
+_shared_limiter: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+def get_rate_limiter() -> RateLimiter:
+    """Get the process-wide rate limiter (unlimited until limits are configured)."""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter()
+        return _shared_limiter
+
+def configure_rate_limits(
+    model: str,
+    rpm: Optional[int] = None,
+    tpm: Optional[int] = None,
+    state_file: Optional[str] = None
+) -> RateLimiter:
+    """Set limits on the process-wide rate limiter.
+
+    Args:
+        model: Model name or name prefix
+        rpm: Requests per minute
+        tpm: Tokens per minute
+        state_file: If given, share bucket state with other processes through this file
+
+    Returns:
+        The shared limiter
+    """
+    limiter = get_rate_limiter()
+    if state_file is not None and getattr(limiter.store, "path", None) != state_file:
+        limiter.store = FileBucketStore(state_file)
+    limiter.set_limits(model, rpm=rpm, tpm=tpm)
+    return limiter
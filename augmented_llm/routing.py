@@ -0,0 +1,136 @@
+"""
+Helpers for latency-aware routing between providers.
+
+A PrefetchedStream opens and drains a provider stream on a background thread,
+buffering events, so the caller can wait for the first content event with a
+timeout and abandon a slow or failing provider before anything was yielded.
+An on_abandon callback runs once a cancelled or failed stream has stopped, so
+resources held for the request (such as a rate-limit reservation) are returned.
+"""
+
+import queue
+import threading
+from typing import Any, Callable, Iterator, Optional
+
+_EVENT = "event"
+_ERROR = "error"
+_DONE = "done"
+
+class PrefetchedStream:
+    def __init__(
+        self,
+        open_stream: Callable[[], Any],
+        is_content_event: Callable[[Any], bool],
+        ready: Optional[threading.Event] = None,
+        on_abandon: Optional[Callable[[], None]] = None
+    ):
+        """Start opening and reading a stream in the background.
+
+        Args:
+            open_stream: Callable that creates the provider stream
+            is_content_event: Returns True for events that carry model output
+            ready: Optional event set as soon as this stream has content, fails or ends
+            on_abandon: Called once if the stream fails or is cancelled, after
+                its opener has returned
+        """
+        self._open_stream = open_stream
+        self._is_content_event = is_content_event
+        self._ready = ready
+        self._on_abandon = on_abandon
+        self._state_lock = threading.Lock()
+        self._finished = False
+        self._abandoned = False
+        self._queue: "queue.Queue" = queue.Queue()
+        self._settled = threading.Event()
+        self._content = False
+        self._cancelled = threading.Event()
+        self._stream = None
+        self.error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="prefetched-stream", daemon=True)
+        self._thread.start()
+
+    def _signal(self) -> None:
+        self._settled.set()
+        if self._ready is not None:
+            self._ready.set()
+
+    def _run(self) -> None:
+        try:
+            self._stream = self._open_stream()
+            if self._cancelled.is_set():
+                self._close_stream()
+                return
+            for event in self._stream:
+                if self._cancelled.is_set():
+                    return
+                self._queue.put((_EVENT, event))
+                if not self._content and self._is_content_event(event):
+                    self._content = True
+                    self._signal()
+        except Exception as e:
+            if not self._cancelled.is_set():
+                self.error = e
+                self._queue.put((_ERROR, e))
+                self._signal()
+            return
+        finally:
+            with self._state_lock:
+                self._finished = True
+                abandon = self._cancelled.is_set() or self.error is not None
+            if abandon:
+                self._abandon()
+        self._queue.put((_DONE, None))
+        self._signal()
+
+    def _abandon(self) -> None:
+        with self._state_lock:
+            if self._abandoned:
+                return
+            self._abandoned = True
+        if self._on_abandon is not None:
+            self._on_abandon()
+
+    @property
+    def has_content(self) -> bool:
+        """True once a content event arrived without an error."""
+        return self._content and self.error is None
+
+    @property
+    def settled(self) -> bool:
+        """True once the stream has content, failed or ended."""
+        return self._settled.is_set()
+
+    def wait_first_content(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the first content event (or failure / end of stream).
+
+        Returns:
+            True if the stream settled within the timeout
+        """
+        return self._settled.wait(timeout)
+
+    def _close_stream(self) -> None:
+        close = getattr(self._stream, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception:
+                pass
+
+    def cancel(self) -> None:
+        """Abandon the stream and close its connection."""
+        with self._state_lock:
+            self._cancelled.set()
+            finished = self._finished
+        self._close_stream()
+        if finished:
+            self._abandon()
+
+    def __iter__(self) -> Iterator[Any]:
+        while True:
+            kind, value = self._queue.get()
+            if kind == _EVENT:
+                yield value
+            elif kind == _ERROR:
+                raise value
+            else:
+                return
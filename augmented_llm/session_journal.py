@@ -0,0 +1,182 @@
+"""
+Append-only JSONL journal of AugmentedLLM conversations.
+
+Each record is written exactly once, by a background thread, so persisting a
+conversation costs the request path only a queue put. Files rotate by size
+and rotated files can be gzip-compressed. read_journal() rebuilds the
+conversation state of every session from the files.
+"""
+
+import atexit
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+_STOP = object()
+
+class SessionJournal:
+    def __init__(
+        self,
+        log_dir: str = "logs/messages",
+        max_bytes: int = 10 * 1024 * 1024,
+        compress: bool = False
+    ):
+        """Start a journal writer.
+
+        Args:
+            log_dir: Directory the journal files are written to
+            max_bytes: Size after which the current file is rotated
+            compress: Gzip rotated files
+        """
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.compress = compress
+        os.makedirs(log_dir, exist_ok=True)
+
+        self._prefix = f"session_journal_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        self._sequence = 0
+        self._file = None
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="session-journal", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def current_path(self) -> str:
+        """Path of the file currently being written."""
+        return os.path.join(self.log_dir, f"{self._prefix}_{self._sequence:04d}.jsonl")
+
+    def record(self, session_id: str, event: str, **data) -> None:
+        """Queue a record for writing (never blocks on disk I/O).
+
+        Args:
+            session_id: Id of the session the record belongs to
+            event: Record type ("session_start", "message", "clear" or "switch_provider")
+            data: Record payload
+        """
+        if self._closed:
+            return
+        self._queue.put({
+            "ts": datetime.now().isoformat(),
+            "session_id": session_id,
+            "event": event,
+            **data
+        })
+
+    def flush(self) -> None:
+        """Block until every queued record has been written."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Write the remaining records and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    if self._file:
+                        self._file.close()
+                        self._file = None
+                    return
+                self._write(item)
+                # Flush once the queue has drained rather than per record
+                if self._file and self._queue.empty():
+                    self._file.flush()
+            except Exception as e:
+                print(f"\n[Debug Messages] Error writing session journal: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        if self._file is None:
+            self._file = open(self.current_path, "a", encoding="utf-8")
+        self._file.write(json.dumps(record, default=str, separators=(",", ":")) + "\n")
+        if self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        self._file = None
+        if self.compress:
+            path = self.current_path
+            with open(path, "rb") as src, gzip.open(path + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(path)
+        self._sequence += 1
+
+# Journals shared by all sessions in the process, keyed by log directory
+_journals: Dict[str, SessionJournal] = {}
+_journals_lock = threading.Lock()
+
+def get_session_journal(log_dir: str = "logs/messages", **kwargs) -> SessionJournal:
+    """Get (or start) the process-wide journal for a log directory."""
+    with _journals_lock:
+        journal = _journals.get(log_dir)
+        if journal is None or journal._closed:
+            journal = SessionJournal(log_dir, **kwargs)
+            _journals[log_dir] = journal
+        return journal
+
+def _iter_records(path: str):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def read_journal(path: str = "logs/messages", session_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Rebuild conversation state from journal files.
+
+    Args:
+        path: A journal file or a directory of journal files
+        session_id: Only rebuild this session
+
+    Returns:
+        Dict mapping session id to its model, provider, system_prompt and messages
+    """
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.startswith("session_journal_") and name.endswith((".jsonl", ".jsonl.gz"))
+        )
+    else:
+        files = [path]
+
+    sessions: Dict[str, Dict[str, Any]] = {}
+    for file_path in files:
+        for record in _iter_records(file_path):
+            sid = record["session_id"]
+            if session_id is not None and sid != session_id:
+                continue
+            session = sessions.setdefault(sid, {"messages": []})
+            event = record["event"]
+            if event == "session_start":
+                for key in ("model", "provider", "system_prompt"):
+                    session[key] = record.get(key)
+            elif event == "message":
+                session["messages"].append(record["message"])
+            elif event == "clear":
+                session["messages"] = []
+            elif event == "switch_provider":
+                # Failover translated the whole history to the other provider's format
+                session["provider"] = record.get("provider")
+                session["model"] = record.get("model")
+                session["messages"] = list(record["messages"])
+    return sessions
+
+def load_session_messages(path: str, session_id: str) -> List[Dict[str, Any]]:
+    """Return the rebuilt message history of one session."""
+    return read_journal(path, session_id).get(session_id, {}).get("messages", [])
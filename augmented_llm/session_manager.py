@@ -0,0 +1,258 @@
+"""
+Multi-tenant management of AugmentedLLM sessions.
+
+SessionManager hands out sessions by id. Every session is spawned from one
+template, so all of them share its client, tool registry, tool cache, rate
+limiter and hooks. The manager keeps a running estimate of the memory and
+context tokens held by live sessions. When a limit is exceeded, the least
+recently used idle sessions are saved to a SessionStore and dropped from
+memory. The next message to an evicted session restores it transparently.
+
+Sessions are used through generate/generate_events, or held directly with
+`with manager.lease(session_id) as session:`. A leased session is never
+evicted until the lease is released; it must not be used after that.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, Generator, Iterator, Optional
+from .llm import AugmentedLLM
+from .providers import LLMProvider
+from .session_store import SessionStore
+from .stream_events import StreamEvent
+from .token_debugger import TokenDebugger
+
+class SessionManager:
+    def __init__(
+        self,
+        template: AugmentedLLM,
+        store: Optional[SessionStore] = None,
+        max_sessions: Optional[int] = None,
+        max_memory_bytes: Optional[int] = None,
+        max_total_tokens: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        debug: bool = False
+    ):
+        """Initialize the session manager.
+
+        Args:
+            template: Configured session (with tools registered) that new sessions are spawned from
+            store: Where evicted sessions are kept (defaults to logs/sessions)
+            max_sessions: Maximum number of sessions held in memory
+            max_memory_bytes: Maximum estimated size of all in-memory histories
+            max_total_tokens: Maximum estimated context tokens of all in-memory histories
+            idle_timeout: Seconds after which an unused session is evicted
+            debug: Print a line for every eviction and restore
+        """
+        self.template = template
+        self.store = store or SessionStore(os.path.join("logs", "sessions"))
+        self.max_sessions = max_sessions
+        self.max_memory_bytes = max_memory_bytes
+        self.max_total_tokens = max_total_tokens
+        self.idle_timeout = idle_timeout
+        self.debug = debug
+
+        # Live sessions in least-recently-used order, with their accounting
+        self._sessions: "OrderedDict[str, AugmentedLLM]" = OrderedDict()
+        self._usage: Dict[str, Dict[str, Any]] = {}
+        self._busy: Dict[str, int] = {}
+        self._evicted = set()
+        self._lock = threading.RLock()
+        self._token_counter = TokenDebugger(template.model_name)
+
+        self.memory_bytes = 0
+        self.total_tokens = 0
+        self.evictions = 0
+        self.restores = 0
+
+    def _shared_kwargs(self) -> Dict[str, Any]:
+        """Live objects passed to restored sessions so they share the template's resources."""
+        template = self.template
+        initial_provider = template._init_kwargs["provider"]
+        if isinstance(initial_provider, str):
+            initial_provider = LLMProvider(initial_provider.lower())
+        kwargs = {
+            "client": template._routes[initial_provider]["client"],
+            "hooks": list(template.hooks),
+            "tool_cache": template.tool_cache,
+            "rate_limiter": template.rate_limiter
+        }
+        if template.history_manager is not None:
+            kwargs["history_manager"] = template.history_manager.clone()
+        return kwargs
+
+    @contextmanager
+    def lease(self, session_id: Optional[str] = None) -> Iterator[AugmentedLLM]:
+        """Hold a session, creating it or restoring it from the store as needed.
+
+        The session is marked busy, so it cannot be evicted, until the with
+        block exits. This is the only supported way to use a session directly.
+
+        Args:
+            session_id: Id of the session (None creates a new session)
+
+        Yields:
+            The in-memory session
+        """
+        session = self._acquire(session_id)
+        try:
+            yield session
+        finally:
+            self._release(session)
+
+    def _acquire(self, session_id: Optional[str]) -> AugmentedLLM:
+        """Return a session marked busy; every call must be paired with _release."""
+        with self._lock:
+            session = self._get(session_id)
+            # Busy sessions are never evicted
+            self._busy[session.session_id] = self._busy.get(session.session_id, 0) + 1
+            return session
+
+    def _release(self, session: AugmentedLLM) -> None:
+        """Unmark a session acquired with _acquire and re-apply the limits."""
+        with self._lock:
+            self._busy[session.session_id] -= 1
+            if not self._busy[session.session_id]:
+                del self._busy[session.session_id]
+            # The session may have been closed while it was in use
+            if session.session_id in self._sessions:
+                self._usage[session.session_id]["last_used"] = time.monotonic()
+                self._account(session.session_id)
+                self._enforce_limits()
+
+    def _get(self, session_id: Optional[str] = None) -> AugmentedLLM:
+        """Return a session, creating it or restoring it from the store as needed (not marked busy)."""
+        with self._lock:
+            if session_id is not None and session_id in self._sessions:
+                self._sessions.move_to_end(session_id)
+                self._usage[session_id]["last_used"] = time.monotonic()
+                return self._sessions[session_id]
+
+            if session_id is not None and (session_id in self._evicted or self.store.exists(session_id)):
+                session = self.store.load(session_id, handlers=self.template.tool_registry, **self._shared_kwargs())
+                self.template.share_tools_with(session)
+                self._evicted.discard(session_id)
+                self.restores += 1
+                if self.debug:
+                    print(f"\n[Debug] Restored session {session_id} from {self.store.directory}")
+            else:
+                session = self.template.spawn_session(session_id)
+
+            self._sessions[session.session_id] = session
+            self._usage[session.session_id] = {
+                "messages": None,
+                "counted": 0,
+                "bytes": 0,
+                "tokens": 0,
+                "last_used": time.monotonic()
+            }
+            self._account(session.session_id)
+            self._enforce_limits(keep=session.session_id)
+            return session
+
+    def generate(self, session_id: str, message: str) -> Generator[str, None, None]:
+        """Send a message to a session and stream the response as strings."""
+        return self._run(session_id, message, typed=False)
+
+    def generate_events(self, session_id: str, message: str) -> Generator[StreamEvent, None, None]:
+        """Send a message to a session and stream the response as typed events."""
+        return self._run(session_id, message, typed=True)
+
+    def _run(self, session_id: str, message: str, typed: bool):
+        with self.lease(session_id) as session:
+            if typed:
+                yield from session.generate_events(message)
+            else:
+                yield from session.generate(message)
+
+    def _account(self, session_id: str) -> None:
+        """Update the size estimate of a session with the messages added since the last count."""
+        session = self._sessions[session_id]
+        usage = self._usage[session_id]
+        if usage["messages"] is not session.messages or len(session.messages) < usage["counted"]:
+            # The history was replaced (trimming, failover, clear): count it again
+            self.memory_bytes -= usage["bytes"]
+            self.total_tokens -= usage["tokens"]
+            usage.update(messages=session.messages, counted=0, bytes=0, tokens=0)
+        texts = [json.dumps(message, default=str) for message in session.messages[usage["counted"]:]]
+        for text, tokens in zip(texts, self._token_counter.count_tokens_batch(texts)):
+            usage["bytes"] += len(text)
+            usage["tokens"] += tokens
+            self.memory_bytes += len(text)
+            self.total_tokens += tokens
+        usage["counted"] = len(session.messages)
+
+    def _over_limits(self) -> bool:
+        return (
+            (self.max_sessions is not None and len(self._sessions) > self.max_sessions)
+            or (self.max_memory_bytes is not None and self.memory_bytes > self.max_memory_bytes)
+            or (self.max_total_tokens is not None and self.total_tokens > self.max_total_tokens)
+        )
+
+    def _enforce_limits(self, keep: Optional[str] = None) -> None:
+        """Evict expired sessions, then least recently used ones until within limits.
+
+        Args:
+            keep: Session that must stay in memory (the one being handed out)
+        """
+        if self.idle_timeout is not None:
+            cutoff = time.monotonic() - self.idle_timeout
+            for session_id in [sid for sid, usage in self._usage.items() if usage["last_used"] < cutoff]:
+                if session_id not in self._busy and session_id != keep:
+                    self.evict(session_id)
+        while self._over_limits():
+            candidate = next((sid for sid in self._sessions if sid not in self._busy and sid != keep), None)
+            if candidate is None:
+                # Every live session is mid-request; limits are enforced once they finish
+                break
+            self.evict(candidate)
+
+    def evict(self, session_id: str) -> None:
+        """Save a session to the store and drop it from memory."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session_id in self._busy:
+                return
+            self.store.save(session)
+            del self._sessions[session_id]
+            usage = self._usage.pop(session_id)
+            self.memory_bytes -= usage["bytes"]
+            self.total_tokens -= usage["tokens"]
+            self._evicted.add(session_id)
+            self.evictions += 1
+            if self.debug:
+                print(f"\n[Debug] Evicted session {session_id} ({usage['bytes']} bytes, {usage['tokens']} tokens)")
+
+    def close(self, session_id: str) -> None:
+        """End a session and remove it from memory and the store."""
+        with self._lock:
+            if session_id in self._sessions:
+                del self._sessions[session_id]
+                usage = self._usage.pop(session_id)
+                self.memory_bytes -= usage["bytes"]
+                self.total_tokens -= usage["tokens"]
+            self._evicted.discard(session_id)
+            self.store.delete(session_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return live counts, estimated memory and token use, and eviction totals."""
+        with self._lock:
+            return {
+                "live_sessions": len(self._sessions),
+                "busy_sessions": len(self._busy),
+                "evicted_sessions": len(self._evicted),
+                "memory_bytes": self.memory_bytes,
+                "total_tokens": self.total_tokens,
+                "evictions": self.evictions,
+                "restores": self.restores,
+                "limits": {
+                    "max_sessions": self.max_sessions,
+                    "max_memory_bytes": self.max_memory_bytes,
+                    "max_total_tokens": self.max_total_tokens,
+                    "idle_timeout": self.idle_timeout
+                }
+            }
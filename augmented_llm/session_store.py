@@ -0,0 +1,266 @@
+"""
+Compact snapshots of AugmentedLLM sessions so a conversation can move between workers.
+
+A snapshot holds the message history, token counters, tool definitions and
+constructor configuration of a session, compressed with zlib. Live objects
+(clients, tool handlers, hooks, caches) are not stored; they are supplied again
+on restore.
+
+SessionStore keeps one file per session in a local directory. The first save
+writes a full snapshot; later saves append a delta holding only the messages
+and counters added since the previous save, so each write is proportional to
+the new turn. When the history was rewritten (trimming, failover, clear) or
+enough deltas have piled up, the file is compacted into a new snapshot.
+"""
+
+import json
+import os
+import struct
+import threading
+import zlib
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from .llm import AugmentedLLM
+from .providers import LLMProvider
+from .token_debugger import TokenDebugger
+
+SNAPSHOT_MAGIC = b"ALS1"
+_LENGTH = struct.Struct(">I")
+
+# Constructor arguments that hold live objects; they are passed again on restore
+_LIVE_KWARGS = ("client", "hooks", "history_manager", "tool_cache", "rate_limiter", "session_id")
+
+class SessionConflictError(Exception):
+    """Raised when a session file was written by another worker since this copy last synced."""
+
+def _encode(record: Dict[str, Any]) -> bytes:
+    return zlib.compress(json.dumps(record, separators=(",", ":"), default=str).encode("utf-8"))
+
+def _decode(data: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+def _file_version(path: str) -> Optional[Tuple[int, int, int]]:
+    """Identify the current version of a file by (mtime_ns, size, inode); None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+def _config(llm: AugmentedLLM) -> Dict[str, Any]:
+    config = {k: v for k, v in llm._init_kwargs.items() if k not in _LIVE_KWARGS}
+    for key in ("provider", "fallback_provider"):
+        if isinstance(config.get(key), LLMProvider):
+            config[key] = config[key].value
+    return config
+
+def _state(llm: AugmentedLLM) -> Dict[str, Any]:
+    return {
+        "session_id": llm.session_id,
+        "provider": llm.provider.value,
+        "system_prompt": llm.system_prompt,
+        "context_prompt": llm.context_prompt
+    }
+
+def _snapshot_record(llm: AugmentedLLM) -> Dict[str, Any]:
+    record = {
+        "type": "snapshot",
+        "config": _config(llm),
+        "state": _state(llm),
+        "tools": llm._tool_specs,
+        "messages": llm.messages
+    }
+    if llm.debug_tokens:
+        record["token_debugger"] = llm.token_debugger.get_state()
+    return record
+
+def _delta_record(llm: AugmentedLLM, sync: Dict[str, Any]) -> Dict[str, Any]:
+    record = {
+        "type": "delta",
+        "state": _state(llm),
+        "messages": llm.messages[sync["message_count"]:]
+    }
+    if len(llm._tool_specs) != sync["tool_count"]:
+        record["tools"] = llm._tool_specs
+    if llm.debug_tokens:
+        record["token_debugger"] = llm.token_debugger.get_state(sync["history_count"])
+    return record
+
+def _add_tools(llm: AugmentedLLM, specs: Dict[str, Dict[str, Any]], handlers: Optional[Dict[str, Callable]]) -> None:
+    new_specs = {name: spec for name, spec in specs.items() if name not in llm.tool_registry}
+    missing = [name for name in new_specs if name not in (handlers or {})]
+    if missing:
+        raise ValueError(f"No handler provided for tools: {', '.join(missing)}")
+    for name, spec in new_specs.items():
+        llm.add_tool(name, handler=handlers[name], **spec)
+
+def _apply_state(llm: AugmentedLLM, state: Dict[str, Any]) -> None:
+    llm.system_prompt = state["system_prompt"]
+    llm.context_prompt = state["context_prompt"]
+    provider = LLMProvider(state["provider"])
+    if provider != llm.provider:
+        # The session had failed over before it was saved
+        llm._use_route(llm._routes[provider])
+
+def _build_session(record: Dict[str, Any], handlers: Optional[Dict[str, Callable]], overrides: Dict[str, Any]) -> AugmentedLLM:
+    kwargs = {**record["config"], **overrides, "session_id": record["state"]["session_id"]}
+    llm = AugmentedLLM(**kwargs)
+    _apply_state(llm, record["state"])
+    _add_tools(llm, record["tools"], handlers)
+    llm.messages = record["messages"]
+    # Restored messages are already in the journal of the worker that created them
+    llm._journal_position = len(llm.messages)
+    if llm.debug_tokens:
+        llm.token_debugger = TokenDebugger(llm.model_name)
+        llm.token_debugger.apply_state(record.get("token_debugger", {}))
+    return llm
+
+def _apply_delta(llm: AugmentedLLM, record: Dict[str, Any], handlers: Optional[Dict[str, Callable]]) -> None:
+    _apply_state(llm, record["state"])
+    if "tools" in record:
+        _add_tools(llm, record["tools"], handlers)
+    llm.messages.extend(record["messages"])
+    llm._journal_position = len(llm.messages)
+    if llm.debug_tokens and "token_debugger" in record:
+        llm.token_debugger.apply_state(record["token_debugger"])
+
+def snapshot_session(llm: AugmentedLLM) -> bytes:
+    """Serialize a session to compact bytes.
+
+    Args:
+        llm: The session to snapshot
+
+    Returns:
+        zlib-compressed snapshot, prefixed with a format marker
+    """
+    return SNAPSHOT_MAGIC + _encode(_snapshot_record(llm))
+
+def restore_session(data: bytes, handlers: Optional[Dict[str, Callable]] = None, **overrides) -> AugmentedLLM:
+    """Rebuild a session from snapshot_session() output.
+
+    Args:
+        data: Snapshot bytes
+        handlers: Tool handlers by name (e.g. another session's tool_registry)
+        overrides: Constructor arguments for live objects (client, hooks, history_manager, ...)
+
+    Returns:
+        The restored session, with the same session_id
+    """
+    if not data.startswith(SNAPSHOT_MAGIC):
+        raise ValueError("Not an AugmentedLLM session snapshot")
+    return _build_session(_decode(data[len(SNAPSHOT_MAGIC):]), handlers, overrides)
+
+class SessionStore:
+    def __init__(self, directory: str = "sessions", compact_every: int = 50):
+        """Initialize a local session store.
+
+        A session should be served by one worker at a time: save() raises
+        SessionConflictError if another worker wrote the session since this
+        copy was loaded or last saved.
+
+        Args:
+            directory: Directory holding one file per session
+            compact_every: Number of appended deltas after which the file is rewritten as a snapshot
+        """
+        self.directory = directory
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id: str) -> str:
+        return os.path.join(self.directory, f"{session_id}.session")
+
+    def _mark_synced(self, llm: AugmentedLLM, version: Optional[Tuple[int, int, int]], deltas: int) -> None:
+        llm._store_sync = {
+            "store": self,
+            "messages": llm.messages,
+            "message_count": len(llm.messages),
+            "history_count": len(llm.token_debugger.conversation_history) if llm.debug_tokens else 0,
+            "tool_count": len(llm._tool_specs),
+            "version": version,
+            "deltas": deltas
+        }
+
+    def save(self, llm: AugmentedLLM) -> int:
+        """Persist the changes of a session since its last save.
+
+        Args:
+            llm: The session to save
+
+        Returns:
+            Number of bytes written
+        """
+        path = self._path(llm.session_id)
+        with self._lock:
+            sync = getattr(llm, "_store_sync", None)
+            if sync is not None and sync["store"] is not self:
+                sync = None
+            # A rewrite can leave the size unchanged, so the whole version is compared
+            if sync is not None and _file_version(path) != sync["version"]:
+                raise SessionConflictError(f"Session {llm.session_id} was modified by another worker")
+
+            # Deltas are only possible while the history has grown in place
+            can_append = (
+                sync is not None
+                and sync["messages"] is llm.messages
+                and len(llm.messages) >= sync["message_count"]
+                and sync["deltas"] < self.compact_every
+            )
+            if can_append:
+                payload = _encode(_delta_record(llm, sync))
+                data = _LENGTH.pack(len(payload)) + payload
+                with open(path, "ab") as f:
+                    f.write(data)
+                self._mark_synced(llm, _file_version(path), sync["deltas"] + 1)
+                return len(data)
+
+            payload = _encode(_snapshot_record(llm))
+            data = _LENGTH.pack(len(payload)) + payload
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._mark_synced(llm, _file_version(path), 0)
+            return len(data)
+
+    def _read_records(self, session_id: str) -> List[Dict[str, Any]]:
+        with open(self._path(session_id), "rb") as f:
+            data = f.read()
+        records = []
+        offset = 0
+        while offset < len(data):
+            (length,) = _LENGTH.unpack_from(data, offset)
+            offset += _LENGTH.size
+            records.append(_decode(data[offset:offset + length]))
+            offset += length
+        return records
+
+    def load(self, session_id: str, handlers: Optional[Dict[str, Callable]] = None, **overrides) -> AugmentedLLM:
+        """Restore a session from the store.
+
+        Args:
+            session_id: Id of the session to restore
+            handlers: Tool handlers by name (e.g. another session's tool_registry)
+            overrides: Constructor arguments for live objects (client, hooks, history_manager, ...)
+
+        Returns:
+            The restored session; later save() calls append deltas to its file
+        """
+        with self._lock:
+            # Taken before reading, so a write in between is detected on the next save
+            version = _file_version(self._path(session_id))
+            records = self._read_records(session_id)
+        llm = _build_session(records[0], handlers, overrides)
+        for record in records[1:]:
+            _apply_delta(llm, record, handlers)
+        self._mark_synced(llm, version, len(records) - 1)
+        return llm
+
+    def exists(self, session_id: str) -> bool:
+        """Check if a session is stored."""
+        return os.path.exists(self._path(session_id))
+
+    def delete(self, session_id: str) -> None:
+        """Remove a stored session."""
+        with self._lock:
+            if os.path.exists(self._path(session_id)):
+                os.remove(self._path(session_id))
@@ -0,0 +1,145 @@
+"""
+Typed events produced while streaming a response.
+
+The stream handlers and AugmentedLLM yield these lightweight slotted objects
+instead of strings, so consumers filter with an isinstance() check rather than
+scanning text for markers. events_to_text() renders an event stream as the
+plain strings AugmentedLLM.generate() has always produced.
+"""
+
+from typing import Dict, Any, Iterable, Generator, Optional
+
+class StreamEvent:
+    __slots__ = ()
+    # Marker events are printed by the handlers instead of streamed when debug_tools is on
+    marker = True
+
+    def to_text(self) -> str:
+        """Render the event the way the string stream shows it."""
+        return ""
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+class StreamStart(StreamEvent):
+    __slots__ = ()
+
+    def to_text(self) -> str:
+        return "[Stream Started]\n"
+
+class TextDelta(StreamEvent):
+    __slots__ = ("text",)
+    marker = False
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def to_text(self) -> str:
+        return self.text
+
+class ToolStart(StreamEvent):
+    __slots__ = ("name", "id")
+
+    def __init__(self, name: str, id: Optional[str] = None):
+        self.name = name
+        self.id = id
+
+    def to_text(self) -> str:
+        return f"\n[Tool Use Started: {self.name}]\n"
+
+class ToolInput(StreamEvent):
+    __slots__ = ("name", "id", "input")
+
+    def __init__(self, name: str, id: Optional[str], input: Dict[str, Any]):
+        self.name = name
+        self.id = id
+        self.input = input
+
+    def to_text(self) -> str:
+        return f"\n[Tool Input: {self.input}]\n"
+
+class ToolResult(StreamEvent):
+    __slots__ = ("name", "id", "result")
+
+    def __init__(self, name: str, id: Optional[str], result: str):
+        self.name = name
+        self.id = id
+        self.result = result
+
+    def to_text(self) -> str:
+        return f"\n[Tool Result]\n{self.result}\n"
+
+class Stop(StreamEvent):
+    __slots__ = ("reason",)
+
+    def __init__(self, reason: str):
+        self.reason = reason
+
+    def to_text(self) -> str:
+        return f"\n[Stop Reason: {self.reason}]\n"
+
+class MessageComplete(StreamEvent):
+    __slots__ = ()
+
+    def to_text(self) -> str:
+        return "\n[Message Complete]\n"
+
+class Usage(StreamEvent):
+    """Provider-reported token usage of one model call (not shown in the string stream)."""
+    __slots__ = ("input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")
+
+    def __init__(self, input_tokens: int = 0, output_tokens: int = 0, cache_read_input_tokens: int = 0, cache_creation_input_tokens: int = 0):
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.cache_read_input_tokens = cache_read_input_tokens
+        self.cache_creation_input_tokens = cache_creation_input_tokens
+
+class ToolRoundContinue(StreamEvent):
+    __slots__ = ()
+
+    def to_text(self) -> str:
+        return "\n[Continuing conversation with tool result...]\n"
+
+class ToolIterationLimit(StreamEvent):
+    __slots__ = ("limit",)
+
+    def __init__(self, limit: int):
+        self.limit = limit
+
+    def to_text(self) -> str:
+        return f"\n[Max Tool Iterations Reached: {self.limit}]\n"
+
+class StreamError(StreamEvent):
+    __slots__ = ("message",)
+    marker = False
+
+    def __init__(self, message: str):
+        self.message = message
+
+    def to_text(self) -> str:
+        return f"\n[Error] {self.message}\n"
+
+def events_to_text(events: Iterable[StreamEvent], debug_tools: bool = False) -> Generator[str, None, None]:
+    """Adapt a typed event stream to the legacy string stream.
+
+    Args:
+        events: Events from AugmentedLLM.generate_events() or a stream handler
+        debug_tools: Drop marker events, which the handlers print in debug mode
+
+    Returns:
+        Generator of the strings generate() yields
+    """
+    events = iter(events)
+    try:
+        for event in events:
+            if debug_tools and event.marker:
+                continue
+            text = event.to_text()
+            if text:
+                yield text
+    finally:
+        # Closing the adapter early must cancel the underlying request too
+        close = getattr(events, "close", None)
+        if close is not None:
+            close()
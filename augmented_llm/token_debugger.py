@@ -1,54 +1,122 @@
-import tiktoken
 from typing import Dict, List, Optional, Union, Any
 import json
-from .model_costs import get_model_costs, get_model_type, MODEL_NAME_MAPPING
+import threading
+from .model_costs import get_model_info
+
+# Text size above which batches are encoded on tiktoken's thread pool
+PARALLEL_COUNT_THRESHOLD = 256 * 1024
+TOKEN_COUNT_THREADS = 8
+
+# Encodings are loaded once per process and shared by all counters
+_encodings: Dict[str, Any] = {}
+_encodings_lock = threading.Lock()
+
+def encoding_name_for_model(model_name: str) -> str:
+    """Return the tiktoken encoding used to count tokens for a model family.
+    
+    Claude's tokenizer is not public, so Claude models are approximated with
+    cl100k_base; exact Claude counts come from the usage the provider reports.
+    """
+    name = model_name.lower()
+    if name.startswith(("gpt-4o", "chatgpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4")):
+        return "o200k_base"
+    return "cl100k_base"
+
+def get_encoding(model_name: str):
+    """Get the cached tiktoken encoding for a model family."""
+    encoding_name = encoding_name_for_model(model_name)
+    encoding = _encodings.get(encoding_name)
+    if encoding is None:
+        with _encodings_lock:
+            encoding = _encodings.get(encoding_name)
+            if encoding is None:
+                import tiktoken  # Imported lazily to keep package import fast
+                encoding = tiktoken.get_encoding(encoding_name)
+                _encodings[encoding_name] = encoding
+    return encoding
+
+def _content_text(content: Union[str, List[Dict], None]) -> str:
+    """Flatten structured message content to the text that is tokenized."""
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    if not isinstance(content, list):
+        return str(content)
+    parts = []
+    for block in content:
+        if isinstance(block, dict) and "text" in block:
+            parts.append(block["text"])
+        elif isinstance(block, dict) and block.get("type") == "tool_result" and isinstance(block.get("content"), str):
+            parts.append(block["content"])
+        else:
+            parts.append(json.dumps(block, default=str))
+    return "\n".join(parts)
 
 class TokenDebugger:
+    # Scalar counters carried over when a session is snapshotted
+    COUNTER_FIELDS = (
+        "total_input_tokens",
+        "total_output_tokens",
+        "total_tool_tokens",
+        "total_cache_read_tokens",
+        "total_cache_write_tokens",
+        "message_count",
+        "tool_call_count"
+    )
+    
     def __init__(self, model_name: str):
         """Initialize token debugger with model information."""
         self.original_model_name = model_name
-        self.model_name = self.normalize_model_name(model_name)
-        self.model_type = get_model_type(self.model_name)
-        self.costs = get_model_costs(self.model_name)
+        info = get_model_info(model_name)
+        self.model_name = info["name"]
+        self.model_type = "reasoning" if info["reasoning"] else "non_reasoning"
+        self.costs = info["costs"]
         
         # Initialize counters
         self.total_input_tokens = 0
         self.total_output_tokens = 0
         self.total_tool_tokens = 0
+        self.total_cache_read_tokens = 0
+        self.total_cache_write_tokens = 0
         self.message_count = 0
         self.tool_call_count = 0
         self.conversation_history: List[Dict[str, Any]] = []
         
+        # Estimated input tokens logged since the provider last reported usage
+        self._unreported_input_tokens = 0
+        self._encoding = None
+        
     @staticmethod
     def normalize_model_name(model_name: str) -> str:
-        """Normalize model name by removing date suffixes and standardizing format."""
-        # Remove date suffix if present (e.g., -20241022)
-        model_name = model_name.split('-2024')[0]
-        
-        # Convert to lowercase and remove spaces/dots for comparison
-        normalized = model_name.lower().replace(" ", "").replace(".", "")
-        
-        # Check against known model variations
-        for standard_name, variations in MODEL_NAME_MAPPING.items():
-            if normalized in [v.lower().replace(" ", "").replace(".", "") for v in variations]:
-                return standard_name
-                
-        return model_name
+        """Resolve a model name to its registry name (unknown names lose only their date suffix)."""
+        return get_model_info(model_name)["name"]
+    
+    @property
+    def encoding(self):
+        """The tiktoken encoding for this model's family (loaded on first use)."""
+        if self._encoding is None:
+            self._encoding = get_encoding(self.original_model_name)
+        return self._encoding
     
     def count_tokens(self, text: str) -> int:
-        """Count tokens in a string using tiktoken."""
-        enc = tiktoken.encoding_for_model("gpt-4")  # Use GPT-4 encoding as default
-        return len(enc.encode(text))
-        
-    def log_message(self, role: str, content: Union[str, List[Dict]], is_tool_result: bool = False):
-        """Log a message and count its tokens."""
-        if isinstance(content, list):
-            # Handle structured content (like tool calls)
-            content_str = json.dumps(content)
-        else:
-            content_str = str(content)
-            
-        token_count = self.count_tokens(content_str)
+        """Count tokens in a string using the model family's cached tiktoken encoding."""
+        return len(self.encoding.encode_ordinary(text))
+        
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        """Count tokens in several strings; large batches are encoded on a thread pool."""
+        if len(texts) > 1 and sum(len(text) for text in texts) >= PARALLEL_COUNT_THRESHOLD:
+            return [len(tokens) for tokens in self.encoding.encode_ordinary_batch(texts, num_threads=TOKEN_COUNT_THREADS)]
+        return [self.count_tokens(text) for text in texts]
+        
+    def log_message(self, role: str, content: Union[str, List[Dict]], is_tool_result: bool = False, token_count: Optional[int] = None):
+        """Log a message and count its tokens.
+        
+        Input-side counts are estimates; they are replaced by the provider's
+        figure when the next request reports usage (see log_request_usage).
+        """
+        if token_count is None:
+            token_count = self.count_tokens(_content_text(content))
         
         message_data = {
             "role": role,
@@ -64,11 +132,62 @@ class TokenDebugger:
             self.total_output_tokens += token_count
         else:
             self.total_input_tokens += token_count
+            self._unreported_input_tokens += token_count
             
         if is_tool_result:
             self.total_tool_tokens += token_count
             self.tool_call_count += 1
             
+    def get_state(self, history_start: int = 0) -> Dict[str, Any]:
+        """Return the counters and the conversation history entries from history_start on."""
+        state = {field: getattr(self, field) for field in self.COUNTER_FIELDS}
+        state["conversation_history"] = self.conversation_history[history_start:]
+        return state
+        
+    def apply_state(self, state: Dict[str, Any]) -> None:
+        """Restore counters from get_state() and append its conversation history entries."""
+        for field in self.COUNTER_FIELDS:
+            if field in state:
+                setattr(self, field, state[field])
+        self.conversation_history.extend(state.get("conversation_history", []))
+            
+    def log_request_usage(self, usage: Dict[str, int]) -> None:
+        """Record provider-reported usage of one streamed request.
+        
+        The provider's input count replaces the estimates logged since the
+        previous request, and its output count is logged as the assistant
+        message, so the reply never has to be tokenized locally.
+        """
+        self.total_input_tokens += (usage.get("input_tokens", 0) or 0) - self._unreported_input_tokens
+        self._unreported_input_tokens = 0
+        output_tokens = usage.get("output_tokens", 0) or 0
+        self.conversation_history.append({
+            "role": "assistant",
+            "token_count": output_tokens,
+            "is_tool_result": False
+        })
+        self.message_count += 1
+        self.total_output_tokens += output_tokens
+        self.log_cache_usage(
+            cache_read_tokens=usage.get("cache_read_input_tokens", 0),
+            cache_write_tokens=usage.get("cache_creation_input_tokens", 0)
+        )
+        
+    def log_usage(self, usage: Dict[str, int]) -> None:
+        """Record provider-reported usage of a request that was not streamed (e.g. a batch result)."""
+        self.total_input_tokens += usage.get("input_tokens", 0) or 0
+        self.total_output_tokens += usage.get("output_tokens", 0) or 0
+        self.message_count += 1
+        self.log_cache_usage(
+            cache_read_tokens=usage.get("cache_read_input_tokens", 0),
+            cache_write_tokens=usage.get("cache_creation_input_tokens", 0)
+        )
+            
+    def log_cache_usage(self, cache_read_tokens: int = 0, cache_write_tokens: int = 0):
+        """Record prompt-cache tokens reported by the provider for one request."""
+        self.total_cache_read_tokens += cache_read_tokens or 0
+        self.total_cache_write_tokens += cache_write_tokens or 0
+            
     def calculate_costs(self) -> Dict[str, float]:
         """Calculate costs based on token usage.
         
@@ -76,6 +195,8 @@ class TokenDebugger:
         - Input cost = (total_input_tokens / 1000) * input_rate
         - Output cost = (total_output_tokens / 1000) * output_rate
         - Tool tokens are counted as input tokens but may use cached rate if applicable
+        - Cache reads use the cached_input rate, cache writes the cache_write rate
+          (falling back to the input rate)
         
         Returns:
             Dict containing input_cost, output_cost, and total_cost (all in USD)
@@ -87,8 +208,12 @@ class TokenDebugger:
         # Calculate tool input cost (using cached rate if available)
         tool_input_cost = (self.total_tool_tokens / 1000) * self.costs.get("cached_input", self.costs["input"])
         
+        # Calculate prompt-cache costs from provider-reported usage
+        cache_read_cost = (self.total_cache_read_tokens / 1000) * self.costs.get("cached_input", self.costs["input"])
+        cache_write_cost = (self.total_cache_write_tokens / 1000) * self.costs.get("cache_write", self.costs["input"])
+        
         # Calculate total input cost
-        input_cost = regular_input_cost + tool_input_cost
+        input_cost = regular_input_cost + tool_input_cost + cache_read_cost + cache_write_cost
         
         # Calculate output cost
         output_cost = (self.total_output_tokens / 1000) * self.costs["output"]
@@ -100,7 +225,9 @@ class TokenDebugger:
             "input_cost": round(input_cost, 6),
             "input_details": {
                 "regular_input_cost": round(regular_input_cost, 6),
-                "tool_input_cost": round(tool_input_cost, 6)
+                "tool_input_cost": round(tool_input_cost, 6),
+                "cache_read_cost": round(cache_read_cost, 6),
+                "cache_write_cost": round(cache_write_cost, 6)
             },
             "output_cost": round(output_cost, 6),
             "total_cost": round(total_cost, 6)
@@ -123,6 +250,8 @@ class TokenDebugger:
                 "input_tokens": self.total_input_tokens,
                 "output_tokens": self.total_output_tokens,
                 "tool_tokens": self.total_tool_tokens,
+                "cache_read_tokens": self.total_cache_read_tokens,
+                "cache_write_tokens": self.total_cache_write_tokens,
                 "total_tokens": self.total_input_tokens + self.total_output_tokens
             },
             "costs": costs,
@@ -155,6 +284,8 @@ class TokenDebugger:
         print(f"- Input Tokens: {summary['token_stats']['input_tokens']:,}")
         print(f"  • Regular Input: {summary['token_stats']['input_tokens'] - summary['token_stats']['tool_tokens']:,}")
         print(f"  • Tool Input: {summary['token_stats']['tool_tokens']:,}")
+        print(f"- Cache Read Tokens: {summary['token_stats']['cache_read_tokens']:,}")
+        print(f"- Cache Write Tokens: {summary['token_stats']['cache_write_tokens']:,}")
         print(f"- Output Tokens: {summary['token_stats']['output_tokens']:,}")
         print(f"- Total Tokens: {summary['token_stats']['total_tokens']:,}")
         
@@ -162,6 +293,8 @@ class TokenDebugger:
         print(f"- Input Costs: ${summary['costs']['input_cost']:.6f}")
         print(f"  • Regular Input: ${summary['costs']['input_details']['regular_input_cost']:.6f}")
         print(f"  • Tool Input: ${summary['costs']['input_details']['tool_input_cost']:.6f}")
+        print(f"  • Cache Reads: ${summary['costs']['input_details']['cache_read_cost']:.6f}")
+        print(f"  • Cache Writes: ${summary['costs']['input_details']['cache_write_cost']:.6f}")
         print(f"- Output Cost: ${summary['costs']['output_cost']:.6f}")
         print(f"- Total Cost: ${summary['costs']['total_cost']:.6f}")
         
@@ -0,0 +1,156 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, Tuple
+
+class ToolResultCache:
+    """LRU + TTL cache for tool results, keyed by tool name and canonicalized arguments.
+
+    Each tool has its own LRU with its own TTL and size limit. A single
+    instance can be shared by several AugmentedLLM sessions (see
+    get_shared_tool_cache); all operations are thread-safe.
+    """
+
+    def __init__(self, default_ttl: Optional[float] = 300.0, default_max_size: int = 256):
+        """Initialize the cache.
+
+        Args:
+            default_ttl: Seconds a result stays valid (None means no expiry)
+            default_max_size: Maximum number of cached results per tool
+        """
+        self.default_ttl = default_ttl
+        self.default_max_size = default_max_size
+        self._tool_config: Dict[str, Dict[str, Any]] = {}
+        self._entries: Dict[str, OrderedDict] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.RLock()
+
+    def configure_tool(self, tool_name: str, ttl: Optional[float] = None, max_size: Optional[int] = None) -> None:
+        """Set the TTL and size limit for one tool (defaults apply when omitted)."""
+        with self._lock:
+            self._tool_config[tool_name] = {
+                "ttl": ttl if ttl is not None else self.default_ttl,
+                "max_size": max_size if max_size is not None else self.default_max_size
+            }
+
+    def _config(self, tool_name: str) -> Dict[str, Any]:
+        return self._tool_config.get(tool_name) or {
+            "ttl": self.default_ttl,
+            "max_size": self.default_max_size
+        }
+
+    def _tool_stats(self, tool_name: str) -> Dict[str, int]:
+        if tool_name not in self._stats:
+            self._stats[tool_name] = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        return self._stats[tool_name]
+
+    @staticmethod
+    def make_key(tool_input: Dict[str, Any]) -> str:
+        """Canonicalize tool arguments so equal inputs map to the same key."""
+        return json.dumps(tool_input, sort_keys=True, separators=(",", ":"), default=str)
+
+    def get(self, tool_name: str, tool_input: Dict[str, Any]) -> Tuple[bool, Any]:
+        """Look up a cached result.
+
+        Returns:
+            Tuple of (found, result)
+        """
+        key = self.make_key(tool_input)
+        with self._lock:
+            stats = self._tool_stats(tool_name)
+            entries = self._entries.get(tool_name)
+            entry = entries.get(key) if entries else None
+            if entry is not None:
+                expires_at, _, result = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    entries.move_to_end(key)
+                    stats["hits"] += 1
+                    return True, result
+                del entries[key]
+            stats["misses"] += 1
+            return False, None
+
+    def set(self, tool_name: str, tool_input: Dict[str, Any], result: Any) -> None:
+        """Store a tool result, evicting the least recently used entry when full."""
+        key = self.make_key(tool_input)
+        with self._lock:
+            config = self._config(tool_name)
+            ttl = config["ttl"]
+            expires_at = time.monotonic() + ttl if ttl is not None else None
+            entries = self._entries.setdefault(tool_name, OrderedDict())
+            entries[key] = (expires_at, tool_input, result)
+            entries.move_to_end(key)
+            while len(entries) > config["max_size"]:
+                entries.popitem(last=False)
+                self._tool_stats(tool_name)["evictions"] += 1
+
+    def invalidate(
+        self,
+        tool_name: Optional[str] = None,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> int:
+        """Remove cached results.
+
+        Args:
+            tool_name: Only invalidate this tool (all tools when None)
+            predicate: Only invalidate entries whose tool input matches
+
+        Returns:
+            Number of entries removed
+        """
+        removed = 0
+        with self._lock:
+            tool_names = [tool_name] if tool_name is not None else list(self._entries.keys())
+            for name in tool_names:
+                entries = self._entries.get(name)
+                if not entries:
+                    continue
+                if predicate is None:
+                    count = len(entries)
+                    entries.clear()
+                else:
+                    stale = [k for k, (_, args, _) in entries.items() if predicate(args)]
+                    for k in stale:
+                        del entries[k]
+                    count = len(stale)
+                self._tool_stats(name)["invalidations"] += count
+                removed += count
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters per tool and in total."""
+        with self._lock:
+            per_tool = {
+                name: {**stats, "size": len(self._entries.get(name, ()))}
+                for name, stats in self._stats.items()
+            }
+        hits = sum(s["hits"] for s in per_tool.values())
+        misses = sum(s["misses"] for s in per_tool.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "tools": per_tool
+        }
+
+# Process-wide caches that several sessions can share by name
+_shared_caches: Dict[str, ToolResultCache] = {}
+_shared_lock = threading.Lock()
+
+def get_shared_tool_cache(name: str = "default", **kwargs) -> ToolResultCache:
+    """Get (or create) a named cache shared across AugmentedLLM sessions."""
+    with _shared_lock:
+        if name not in _shared_caches:
+            _shared_caches[name] = ToolResultCache(**kwargs)
+        return _shared_caches[name]
+
+def invalidate_shared_tool_caches(tool_name: Optional[str] = None) -> int:
+    """Invalidate a tool (or every tool) in all shared caches.
+
+    Suitable as a graph upload listener, e.g.
+    ``register_upload_listener(lambda kg: invalidate_shared_tool_caches("query_knowledge_graph"))``.
+    """
+    with _shared_lock:
+        caches = list(_shared_caches.values())
+    return sum(cache.invalidate(tool_name) for cache in caches)
@@ -0,0 +1,340 @@
+"""
+Durable usage and cost ledger shared by all sessions.
+
+UsageLedger is a hook (see instrumentation.py). Register it on sessions and
+it records one row per provider API call, with tokens, cached tokens,
+latency, model and cost from model_costs. Rows go to a local SQLite database.
+Hourly and daily rollups are updated in the same transaction, so trend
+queries over thousands of sessions never scan the raw rows.
+
+Writes are queued and committed in batches by a background thread. Recording
+a request costs the caller only a queue put. Rollup buckets are UTC.
+"""
+
+import atexit
+import contextlib
+import os
+import queue
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Union
+from .model_costs import get_model_costs
+
+_STOP = object()
+
+# Both providers bill batch requests at half price
+BATCH_DISCOUNT = 0.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS requests (
+    ts REAL NOT NULL,
+    session_id TEXT,
+    provider TEXT,
+    model TEXT,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    cache_read_tokens INTEGER NOT NULL,
+    cache_write_tokens INTEGER NOT NULL,
+    latency REAL,
+    cost REAL NOT NULL,
+    batch INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS requests_ts ON requests (ts);
+CREATE INDEX IF NOT EXISTS requests_session ON requests (session_id);
+CREATE TABLE IF NOT EXISTS rollups (
+    granularity TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    model TEXT NOT NULL,
+    requests INTEGER NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    cache_read_tokens INTEGER NOT NULL,
+    cache_write_tokens INTEGER NOT NULL,
+    latency_sum REAL NOT NULL,
+    latency_count INTEGER NOT NULL,
+    cost REAL NOT NULL,
+    PRIMARY KEY (granularity, bucket, model)
+);
+"""
+
+_ROLLUP_UPSERT = """
+INSERT INTO rollups VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (granularity, bucket, model) DO UPDATE SET
+    requests = requests + 1,
+    input_tokens = input_tokens + excluded.input_tokens,
+    output_tokens = output_tokens + excluded.output_tokens,
+    cache_read_tokens = cache_read_tokens + excluded.cache_read_tokens,
+    cache_write_tokens = cache_write_tokens + excluded.cache_write_tokens,
+    latency_sum = latency_sum + excluded.latency_sum,
+    latency_count = latency_count + excluded.latency_count,
+    cost = cost + excluded.cost
+"""
+
+_BUCKET_FORMATS = {"hour": "%Y-%m-%dT%H:00", "day": "%Y-%m-%d"}
+
+TimeArg = Union[datetime, float, None]
+
+def _epoch(value: TimeArg) -> Optional[float]:
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if value.tzinfo is None:
+        return value.timestamp()
+    return value.astimezone(timezone.utc).timestamp()
+
+def _bucket(ts: float, granularity: str) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime(_BUCKET_FORMATS[granularity])
+
+def request_cost(model: str, usage: Dict[str, int], batch: bool = False) -> float:
+    """Cost in USD of one request from its usage, using the per-1K rates in model_costs.
+    
+    Usage is in the normalized form of the provider handlers, where
+    input_tokens exclude the cache_read_input_tokens for every provider.
+    """
+    costs = get_model_costs(model or "")
+    cost = (
+        (usage.get("input_tokens", 0) or 0) * costs["input"]
+        + (usage.get("cache_read_input_tokens", 0) or 0) * costs.get("cached_input", costs["input"])
+        + (usage.get("cache_creation_input_tokens", 0) or 0) * costs.get("cache_write", costs["input"])
+        + (usage.get("output_tokens", 0) or 0) * costs["output"]
+    ) / 1000
+    return cost * BATCH_DISCOUNT if batch else cost
+
+class UsageLedger:
+    def __init__(self, path: str = "logs/usage/ledger.db", batch_size: int = 500):
+        """Open (or create) a ledger and start its writer thread.
+
+        Args:
+            path: SQLite database file
+            batch_size: Maximum number of requests committed per transaction
+        """
+        self.path = path
+        self.batch_size = batch_size
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="usage-ledger", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _query(self, sql: str, params: List[Any]) -> List[Dict[str, Any]]:
+        with contextlib.closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        """Hook entry point: records "usage" events, ignores the rest."""
+        if event["event"] == "usage":
+            self.record(
+                session_id=event.get("session_id"),
+                provider=event.get("provider"),
+                model=event.get("model"),
+                usage=event,
+                latency=event.get("latency"),
+                batch=event.get("batch", False),
+                ts=event.get("timestamp")
+            )
+
+    def record(
+        self,
+        session_id: Optional[str],
+        provider: Optional[str],
+        model: Optional[str],
+        usage: Dict[str, int],
+        latency: Optional[float] = None,
+        batch: bool = False,
+        ts: Optional[float] = None
+    ) -> None:
+        """Queue one request for writing (never blocks on disk I/O).
+
+        Args:
+            session_id: Session the request belongs to
+            provider: Provider name ("anthropic" or "openai")
+            model: Model the request was sent to
+            usage: Provider usage with input_tokens, output_tokens,
+                cache_read_input_tokens and cache_creation_input_tokens
+            latency: Seconds from sending the request to the end of the response
+            batch: The request ran through a batch endpoint (discounted)
+            ts: Epoch time of the request (defaults to now)
+        """
+        if self._closed:
+            self.dropped += 1
+            return
+        self._queue.put((
+            ts if ts is not None else datetime.now(timezone.utc).timestamp(),
+            session_id,
+            provider,
+            model or "unknown",
+            usage.get("input_tokens", 0) or 0,
+            usage.get("output_tokens", 0) or 0,
+            usage.get("cache_read_input_tokens", 0) or 0,
+            usage.get("cache_creation_input_tokens", 0) or 0,
+            latency,
+            batch
+        ))
+
+    def flush(self) -> None:
+        """Block until every queued request has been committed."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Commit the remaining requests and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self) -> None:
+        conn = self._connect()
+        while True:
+            items = [self._queue.get()]
+            # Commit whatever has piled up in one transaction
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is _STOP for item in items)
+            try:
+                self._write(conn, [item for item in items if item is not _STOP])
+            except Exception as e:
+                print(f"\n[Debug] Error writing usage ledger: {e}")
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+            if stop:
+                conn.close()
+                return
+
+    def _write(self, conn: sqlite3.Connection, items: List[tuple]) -> None:
+        if not items:
+            return
+        rows = []
+        rollups = []
+        for ts, session_id, provider, model, input_tokens, output_tokens, cache_read, cache_write, latency, batch in items:
+            usage = {
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "cache_read_input_tokens": cache_read,
+                "cache_creation_input_tokens": cache_write
+            }
+            cost = request_cost(model, usage, batch)
+            rows.append((ts, session_id, provider, model, input_tokens, output_tokens, cache_read, cache_write, latency, cost, int(batch)))
+            for granularity in _BUCKET_FORMATS:
+                rollups.append((
+                    granularity, _bucket(ts, granularity), model,
+                    input_tokens, output_tokens, cache_read, cache_write,
+                    latency or 0.0, 1 if latency is not None else 0, cost
+                ))
+        with conn:
+            conn.executemany("INSERT INTO requests VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.executemany(_ROLLUP_UPSERT, rollups)
+
+    def requests(
+        self,
+        since: TimeArg = None,
+        until: TimeArg = None,
+        session_id: Optional[str] = None,
+        model: Optional[str] = None,
+        limit: Optional[int] = 1000
+    ) -> List[Dict[str, Any]]:
+        """Return recorded requests, newest first.
+
+        Args:
+            since: Earliest request time (datetime or epoch seconds)
+            until: Latest request time, exclusive
+            session_id: Only requests of this session
+            model: Only requests to this model
+            limit: Maximum number of rows (None for all)
+        """
+        clauses, params = [], []
+        for clause, value in (("ts >= ?", _epoch(since)), ("ts < ?", _epoch(until)), ("session_id = ?", session_id), ("model = ?", model)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        sql = "SELECT * FROM requests"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY ts DESC"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self._query(sql, params)
+
+    def rollups(
+        self,
+        granularity: str = "hour",
+        since: TimeArg = None,
+        until: TimeArg = None,
+        model: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Return pre-aggregated usage per bucket and model, oldest first.
+
+        Args:
+            granularity: "hour" or "day"
+            since: Include buckets containing or after this time
+            until: Include buckets starting before this time
+            model: Only this model
+
+        Returns:
+            Dicts with bucket, model, requests, token totals, avg_latency and cost
+        """
+        if granularity not in _BUCKET_FORMATS:
+            raise ValueError(f"granularity must be one of: {', '.join(_BUCKET_FORMATS)}")
+        clauses, params = ["granularity = ?"], [granularity]
+        if since is not None:
+            clauses.append("bucket >= ?")
+            params.append(_bucket(_epoch(since), granularity))
+        if until is not None:
+            clauses.append("bucket < ?")
+            params.append(_bucket(_epoch(until), granularity))
+        if model is not None:
+            clauses.append("model = ?")
+            params.append(model)
+        sql = f"SELECT * FROM rollups WHERE {' AND '.join(clauses)} ORDER BY bucket, model"
+        rows = self._query(sql, params)
+        for row in rows:
+            del row["granularity"]
+            latency_count = row.pop("latency_count")
+            latency_sum = row.pop("latency_sum")
+            row["avg_latency"] = latency_sum / latency_count if latency_count else None
+        return rows
+
+    def totals(self, since: TimeArg = None, until: TimeArg = None, model: Optional[str] = None) -> Dict[str, Any]:
+        """Sum usage and cost over a period (hour resolution, from the hourly rollups)."""
+        totals = {
+            "requests": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cache_read_tokens": 0,
+            "cache_write_tokens": 0,
+            "cost": 0.0
+        }
+        for row in self.rollups("hour", since, until, model):
+            for key in totals:
+                totals[key] += row[key]
+        totals["cost"] = round(totals["cost"], 6)
+        return totals
+
+# Ledgers shared by all sessions in the process, keyed by database path
+_ledgers: Dict[str, UsageLedger] = {}
+_ledgers_lock = threading.Lock()
+
+def get_usage_ledger(path: str = "logs/usage/ledger.db", **kwargs) -> UsageLedger:
+    """Get (or open) the process-wide ledger for a database file."""
+    with _ledgers_lock:
+        ledger = _ledgers.get(path)
+        if ledger is None or ledger._closed:
+            ledger = UsageLedger(path, **kwargs)
+            _ledgers[path] = ledger
+        return ledger
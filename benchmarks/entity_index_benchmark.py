@@ -0,0 +1,127 @@
+"""
+Fuzzy Entity Index Benchmark
+
+Builds an EntityIndex over synthetic person-like entity names ("Aldric
+Venmoor", ...) and looks up misspelled mentions of them, the way the
+structured retriever resolves the entities extracted from a question.
+
+Reports build time, lookup latency with cold and warm per-word caches, how
+often the misspelled entity is among the top matches, and word-level recall
+against a brute-force scan of the whole vocabulary with the same ~2 edit
+semantics as the fulltext `word~2` queries.
+
+Usage:
+    python benchmarks/entity_index_benchmark.py [--entities 1000000] [--queries 2000] [--seed 7]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from graph_retriever import EntityIndex, edit_distance, tokenize
+
+SYLLABLES = ["al", "dric", "ven", "moor", "el", "iza", "beth", "hen", "ry", "tu", "dor", "ce", "cil", "wal",
+             "sing", "ham", "mar", "ga", "ret", "an", "ne", "bo", "leyn", "ed", "ward", "jo", "han", "na",
+             "ro", "bert", "dud", "ley", "tho", "mas", "crom", "well", "ca", "ther", "ine", "ara", "gon",
+             "phi", "lip", "sey", "mour", "fran", "cis", "dra", "ke", "wil", "liam", "ce", "si", "ly"]
+
+def make_words(count: int, rng: random.Random) -> list:
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize())
+    return sorted(words)
+
+def make_entities(count: int, rng: random.Random) -> list:
+    """Unique two- or three-word names from a shared first/last name vocabulary."""
+    first_names = make_words(max(200, int(count ** 0.5) * 2), rng)
+    last_names = make_words(max(500, int(count ** 0.5) * 5), rng)
+    names = set()
+    while len(names) < count:
+        name = f"{rng.choice(first_names)} {rng.choice(last_names)}"
+        if rng.random() < 0.2:
+            name += f" {rng.choice(last_names)}"
+        names.add(name)
+    return sorted(names)
+
+def misspell(word: str, rng: random.Random, edits: int) -> str:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    for _ in range(edits):
+        i = rng.randrange(len(word))
+        op = rng.choice(["sub", "ins", "del", "swap"])
+        if op == "sub":
+            word = word[:i] + rng.choice(letters) + word[i + 1:]
+        elif op == "ins":
+            word = word[:i] + rng.choice(letters) + word[i:]
+        elif op == "del" and len(word) > 3:
+            word = word[:i] + word[i + 1:]
+        elif i + 1 < len(word):
+            word = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def time_lookups(index: EntityIndex, queries: list) -> list:
+    timings = []
+    for query, _ in queries:
+        start = time.perf_counter()
+        index.search(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entities", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--recall-sample", type=int, default=100, help="Query words checked against a brute-force scan")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    names = make_entities(args.entities, rng)
+
+    start = time.perf_counter()
+    index = EntityIndex()
+    for name in names:
+        index.add_entity(name)
+    build_s = time.perf_counter() - start
+    stats = index.get_stats()
+    print(f"=== {stats['entities']} entities, {stats['words']} distinct words ===")
+    print(f"Build: {build_s:.1f} s ({stats['trigrams']} trigrams, {stats['deletion_variants']} deletion variants)")
+
+    queries = []
+    for name in rng.sample(names, args.queries):
+        words = name.split()
+        target = rng.randrange(len(words))
+        words[target] = misspell(words[target], rng, rng.choice([1, 2]))
+        queries.append((" ".join(words), name))
+
+    cold = time_lookups(index, queries)
+    warm = time_lookups(index, queries)
+    for label, timings in (("cold", cold), ("warm", warm)):
+        print(f"Lookup ({label}): mean {statistics.mean(timings):.3f} ms, p50 {percentile(timings, 0.5):.3f} ms, p99 {percentile(timings, 0.99):.3f} ms")
+
+    found = sum(1 for query, name in queries if name in index.search(query, limit=2))
+    print(f"Misspelled entity in top 2: {found / len(queries):.1%}")
+
+    # Word-level recall: every vocabulary word within the allowed edits must be found
+    vocabulary = index._words
+    checked = missed = 0
+    for query, _ in queries[:args.recall_sample]:
+        for word in tokenize(query):
+            edits = index._edits_for(word)
+            expected = {w for w in vocabulary if edit_distance(word, w, edits) <= edits}
+            actual = {vocabulary[n] for n in index._fuzzy_words(word)}
+            checked += len(expected)
+            missed += len(expected - actual)
+    print(f"Word recall vs brute force: {(checked - missed) / max(checked, 1):.2%} ({checked - missed}/{checked})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Streaming JSON Benchmark
+
+Measures how long it takes to assemble a large Anthropic tool input from
+partial_json deltas.
+
+The "accumulate" numbers reproduce the previous behaviour: append each delta
+to a string and re-run json.loads on the whole buffer whenever it ends with
+"}". The "incremental" numbers use IncrementalJSONParser, which scans each
+delta once and decodes a single time.
+
+Usage:
+    python benchmarks/json_stream_benchmark.py [--size-kb 100] [--delta-size 40] [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from augmented_llm.json_stream import IncrementalJSONParser
+
+def make_tool_input(size_kb: int) -> str:
+    """Build a knowledge-graph style tool input of roughly size_kb kilobytes."""
+    rng = random.Random(0)
+    nodes = []
+    relationships = []
+    text = ""
+    i = 0
+    while len(text) < size_kb * 1024:
+        nodes.append({
+            "id": f"n{i}",
+            "name": f"Entity \"{i}\"",
+            "labels": ["Person" if i % 2 else "Place"],
+            "properties": {"description": "x" * rng.randint(20, 80), "score": rng.random()}
+        })
+        if i:
+            relationships.append({"source": f"n{i - 1}", "target": f"n{i}", "type": "RELATED_TO"})
+        i += 1
+        if i % 50 == 0:
+            text = json.dumps({"nodes": nodes, "relationships": relationships})
+    return json.dumps({"nodes": nodes, "relationships": relationships})
+
+def split_deltas(text: str, delta_size: int) -> list:
+    """Split text into deltas of varying size, like a model stream."""
+    rng = random.Random(1)
+    deltas = []
+    pos = 0
+    while pos < len(text):
+        step = rng.randint(max(1, delta_size // 2), delta_size * 2)
+        deltas.append(text[pos:pos + step])
+        pos += step
+    return deltas
+
+def accumulate(deltas: list):
+    """Previous approach: string concatenation and repeated full parses."""
+    buffer = ""
+    result = None
+    parses = 0
+    for delta in deltas:
+        buffer += delta
+        if buffer.endswith("}"):
+            parses += 1
+            try:
+                result = json.loads(buffer)
+            except json.JSONDecodeError:
+                pass
+    return result, parses
+
+def incremental(deltas: list):
+    """Current approach: single-pass scanning, one decode at completion."""
+    parser = IncrementalJSONParser()
+    for delta in deltas:
+        if parser.feed(delta):
+            return parser.value(), 1
+    return parser.close(), 1
+
+def time_run(func, deltas: list, runs: int):
+    timings = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func(deltas)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-kb", type=int, default=100)
+    parser.add_argument("--delta-size", type=int, default=40)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    text = make_tool_input(args.size_kb)
+    deltas = split_deltas(text, args.delta_size)
+    expected = json.loads(text)
+
+    print(f"=== Tool input: {len(text) / 1024:.1f} KB in {len(deltas)} deltas (median of {args.runs}) ===")
+    old_ms, (old_result, old_parses) = time_run(accumulate, deltas, args.runs)
+    new_ms, (new_result, _) = time_run(incremental, deltas, args.runs)
+    assert old_result == expected and new_result == expected
+
+    print(f"Accumulate + json.loads: {old_ms:10.2f} ms ({old_parses} full parses)")
+    print(f"IncrementalJSONParser:   {new_ms:10.2f} ms (1 parse)")
+    print(f"Speedup:                 {old_ms / new_ms:10.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Neighborhood Cache Benchmark
+
+Answers a stream of structured-retrieval lookups over a synthetic graph whose
+entity popularity follows a Zipf distribution, through an in-process fake
+graph with a fixed query latency, and reports lookups per second and the
+cache hit rate with and without a NeighborhoodCache. Halfway through, small
+knowledge graphs are "uploaded" to check that invalidation keeps the cached
+neighborhoods identical to freshly queried ones.
+
+Usage:
+    python benchmarks/neighborhood_cache_benchmark.py [--entities 20000] [--lookups 5000] [--latency 0.002] [--precompute 1000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Set, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from graph_retriever import GraphRetriever, NeighborhoodCache
+
+class LocalGraph:
+    """Fake Neo4jGraph answering the neighborhood and degree queries from memory."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.edges: Set[Tuple[str, str, str]] = set()
+        self.queries = 0
+
+    def add(self, source: str, rel_type: str, target: str) -> None:
+        self.edges.add((source, rel_type, target))
+
+    def rows(self, entity_id: str, limit: int) -> List[Dict[str, str]]:
+        rows = [{"neighbor": t, "output": f"{s} - {r} -> {t}"} for s, r, t in self.edges if s == entity_id]
+        rows += [{"neighbor": s, "output": f"{s} - {r} -> {t}"} for s, r, t in self.edges if t == entity_id]
+        return sorted(rows, key=lambda row: row["output"])[:limit]
+
+    def query(self, query: str, params: dict = None) -> list:
+        self.queries += 1
+        time.sleep(self.latency)
+        if "degree" in query:
+            degrees: Dict[str, int] = {}
+            for source, _, target in self.edges:
+                degrees[source] = degrees.get(source, 0) + 1
+                degrees[target] = degrees.get(target, 0) + 1
+            ranked = sorted(degrees, key=degrees.get, reverse=True)
+            return [{"id": entity_id} for entity_id in ranked[:params["top"]]]
+        if "collect" in query:
+            return [{"entity_id": i, "rows": self.rows(i, params["limit"])} for i in params["ids"]]
+        return [{"output": row["output"]} for i in params["ids"] for row in self.rows(i, params["limit"])]
+
+class ExactIndex:
+    """Entity lookup stand-in: question text is already the entity id."""
+
+    def search(self, text: str, limit: int = 2) -> List[str]:
+        return [text]
+
+def make_graph(graph: LocalGraph, count: int, rng: random.Random) -> List[str]:
+    """Preferential-attachment graph, so a few entities have most relationships."""
+    ids = [f"Entity {i}" for i in range(count)]
+    targets = [ids[0]]
+    for entity_id in ids[1:]:
+        for _ in range(2):
+            target = rng.choice(targets)
+            graph.add(entity_id, rng.choice(["KNOWS", "SERVED", "MARRIED"]), target)
+            targets += [entity_id, target]
+    return ids
+
+def zipf_lookups(ids: List[str], count: int, rng: random.Random) -> List[str]:
+    weights = [1 / (rank + 1) for rank in range(len(ids))]
+    return rng.choices(ids, weights=weights, k=count)
+
+def run(retriever: GraphRetriever, lookups: List[str]) -> float:
+    start = time.perf_counter()
+    for entity_id in lookups:
+        retriever.retrieve(entity_id)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entities", type=int, default=20000)
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.002, help="Seconds per fake graph query")
+    parser.add_argument("--precompute", type=int, default=1000, help="Top-degree entities cached up front")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    graph = LocalGraph(args.latency)
+    ids = make_graph(graph, args.entities, rng)
+    # Popularity follows degree: the earliest entities are both most linked and most asked about
+    lookups = zipf_lookups(ids, args.lookups, rng)
+    print(f"=== {args.entities} entities, {len(graph.edges)} relationships, {args.lookups} lookups, {args.latency * 1000:.1f} ms per query ===")
+
+    uncached = GraphRetriever(graph, ExactIndex(), label=None)
+    uncached_s = run(uncached, lookups)
+    print(f"uncached:  {args.lookups / uncached_s:8.1f} lookups/s")
+
+    cache = NeighborhoodCache(graph, label=None)
+    start = time.perf_counter()
+    precomputed = cache.precompute(args.precompute)
+    print(f"precompute: {precomputed} entities in {time.perf_counter() - start:.2f} s")
+    cached = GraphRetriever(graph, ExactIndex(), label=None, neighborhood_cache=cache)
+    cached_s = run(cached, lookups)
+    stats = cache.get_stats()
+    print(f"cached:    {args.lookups / cached_s:8.1f} lookups/s ({uncached_s / cached_s:.1f}x), hit rate {stats['hit_rate']:.1%}, {stats['entries']} entries, {stats['bytes'] / 1024:.0f} KiB")
+
+    # Uploads that add relationships to popular entities must invalidate them and their neighbors
+    for i in range(20):
+        source, target = rng.choice(lookups), rng.choice(ids)
+        graph.add(source, "VISITED", target)
+        cache.invalidate_kg_dict({"nodes": [{"id": source}, {"id": target}], "relationships": [{"source": source, "target": target, "type": "VISITED"}]})
+    stale = sum(1 for entity_id in set(lookups) if cached.retrieve(entity_id) != uncached.retrieve(entity_id))
+    stats = cache.get_stats()
+    print(f"after uploads: {stats['invalidations']} entries invalidated, {stale} stale neighborhoods")
+
+if __name__ == "__main__":
+    main()
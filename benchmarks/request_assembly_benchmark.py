@@ -0,0 +1,102 @@
+"""
+OpenAI Request Assembly Benchmark
+
+Measures the time spent building OpenAI request messages and tools over a
+long conversation.
+
+The "rebuild" numbers reproduce the previous behaviour: every turn converts
+the whole history with prepare_openai_messages and recompiles the strict tool
+schemas. The "incremental" numbers use PreparedMessages, which converts only
+the messages added since the previous turn, with tools compiled once up front.
+
+Usage:
+    python benchmarks/request_assembly_benchmark.py [--turns 500] [--tools 20] [--runs 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from augmented_llm.openai_handler import PreparedMessages, prepare_openai_messages, transform_openai_tools
+from augmented_llm.providers import LLMProvider, get_tool_config
+
+SYSTEM_PROMPT = "You are a knowledge graph assistant."
+
+def make_tools(count: int) -> list:
+    """Build OpenAI function configs with a few properties each."""
+    schema = {
+        "query": {"type": "string", "required": True, "description": "Cypher query"},
+        "limit": {"type": "integer", "default": 10, "description": "Maximum rows"},
+        "database": {"type": "string", "default": "neo4j", "description": "Database name"}
+    }
+    return [get_tool_config(f"tool_{i}", f"Tool number {i}", schema, LLMProvider.OPENAI) for i in range(count)]
+
+def make_turn(i: int) -> list:
+    """One user turn with a tool call, its result and the final answer."""
+    return [
+        {"role": "user", "content": f"Question {i} about the graph"},
+        {"role": "assistant", "content": None, "tool_calls": [{
+            "id": f"call_{i}", "type": "function",
+            "function": {"name": "tool_0", "arguments": '{"query": "MATCH (n) RETURN n"}'}
+        }]},
+        {"role": "tool", "tool_call_id": f"call_{i}", "content": "x" * 200},
+        {"role": "assistant", "content": f"Answer {i}"}
+    ]
+
+def rebuild(turns: int, tools: list) -> int:
+    """Previous approach: full conversion of history and tools every turn."""
+    messages = []
+    sent = 0
+    for i in range(turns):
+        messages.extend(make_turn(i))
+        prepared = prepare_openai_messages(messages, SYSTEM_PROMPT, "gpt-4o")
+        transform_openai_tools(tools)
+        sent += len(prepared)
+    return sent
+
+def incremental(turns: int, tools: list) -> int:
+    """Current approach: tools compiled once, only new messages converted."""
+    compiled = transform_openai_tools(tools)
+    cache = PreparedMessages()
+    messages = []
+    sent = 0
+    for i in range(turns):
+        messages.extend(make_turn(i))
+        prepared = cache.sync(messages, SYSTEM_PROMPT, "gpt-4o")
+        transform_openai_tools(compiled)
+        sent += len(prepared)
+    return sent
+
+def time_run(func, turns: int, tools: list, runs: int):
+    timings = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func(turns, tools)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--tools", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    tools = make_tools(args.tools)
+    print(f"=== {args.turns} turns, {args.tools} tools (median of {args.runs}) ===")
+    old_ms, old_sent = time_run(rebuild, args.turns, tools, args.runs)
+    new_ms, new_sent = time_run(incremental, args.turns, tools, args.runs)
+    assert old_sent == new_sent
+
+    print(f"Full rebuild per turn:   {old_ms:10.2f} ms ({old_ms / args.turns * 1000:.1f} us/turn)")
+    print(f"PreparedMessages:        {new_ms:10.2f} ms ({new_ms / args.turns * 1000:.1f} us/turn)")
+    print(f"Speedup:                 {old_ms / new_ms:10.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Server-Side Conversation State Benchmark
+
+Runs a long tool-using OpenAI session against LocalResponsesServer with
+server_side_state=True and compares the request actually sent each turn with
+the full-history request the session would otherwise send.
+
+For each checkpoint the benchmark prints the payload size of both requests and
+the time to serialize them, which stands in for upload time. With server-side
+state the payload stays flat as the session grows; the full resend grows with
+every turn and every tool result.
+
+Usage:
+    python benchmarks/server_state_benchmark.py [--turns 100] [--result-kb 4]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.environ.setdefault("OPENAI_API_KEY", "local")
+
+from augmented_llm import AugmentedLLM, LocalResponsesServer
+
+def respond(context: list, tools: list) -> dict:
+    """Call the lookup tool for every question, then answer from its output."""
+    last = context[-1]
+    if last.get("type") == "function_call_output":
+        return {"text": "Answer based on the lookup."}
+    return {"tool_calls": [{"name": "lookup", "arguments": {"query": last["content"]}}]}
+
+def serialize_ms(params: dict, repeats: int = 20) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        json.dumps(params, separators=(",", ":"))
+    return (time.perf_counter() - start) * 1000 / repeats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--result-kb", type=int, default=4)
+    args = parser.parse_args()
+
+    server = LocalResponsesServer(respond)
+    llm = AugmentedLLM("You answer questions about a knowledge graph.", "openai", client=server, server_side_state=True)
+    result = "x" * (args.result_kb * 1024)
+    llm.add_tool("lookup", "Look up entities", {"query": {"type": "string", "required": True}}, lambda query: result)
+    route = llm._routes[llm.provider]
+
+    checkpoints = sorted({1, 10, args.turns // 2, args.turns})
+    print(f"=== {args.turns} turns, {args.result_kb} KB tool result per turn ===")
+    print(f"{'turn':>6} {'stateful KB':>12} {'full KB':>10} {'stateful ms':>12} {'full ms':>9}")
+    for turn in range(1, args.turns + 1):
+        # What this turn sends with and without the stored response reference
+        llm.messages.append({"role": "user", "content": f"Question {turn}"})
+        stored = llm._stored_response(route, llm.messages)
+        if stored is not None:
+            stateful = llm._responses_params(route, llm.messages[stored["count"]:], stored["id"])
+        else:
+            stateful = llm._responses_params(route, llm.messages)
+        full = llm._responses_params(route, llm.messages)
+        llm.messages.pop()
+
+        for _ in llm.generate(f"Question {turn}"):
+            pass
+        if turn in checkpoints:
+            stateful_kb = len(json.dumps(stateful, separators=(",", ":"))) / 1024
+            full_kb = len(json.dumps(full, separators=(",", ":"))) / 1024
+            print(f"{turn:>6} {stateful_kb:>12.1f} {full_kb:>10.1f} {serialize_ms(stateful):>12.3f} {serialize_ms(full):>9.3f}")
+
+    sent_kb = sum(request["bytes"] for request in server.requests) / 1024
+    print(f"Total sent with server-side state: {sent_kb:.1f} KB in {len(server.requests)} requests")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Startup Benchmark
+
+Measures the cold import time of the augmented_llm package and the
+per-session setup time of AugmentedLLM.
+
+The "eager" numbers reproduce the previous behaviour (importing every provider
+SDK up front and building a new SDK client for every session); the "lazy" /
+"shared" numbers measure the current package.
+
+Usage:
+    python benchmarks/startup_benchmark.py [--provider anthropic|openai] [--sessions 50]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+EAGER_IMPORTS = "import anthropic, openai, tiktoken, dotenv; dotenv.load_dotenv(); import augmented_llm"
+LAZY_IMPORTS = "import augmented_llm"
+
+def time_import(statement: str, runs: int) -> float:
+    """Return the median wall time (ms) of running an import in a fresh interpreter."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], cwd=PROJECT_ROOT, check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def time_sessions(provider: str, sessions: int, fresh_clients: bool) -> float:
+    """Return the median time (ms) to construct one AugmentedLLM session."""
+    from augmented_llm import AugmentedLLM
+    from augmented_llm.clients import _create_client
+    from augmented_llm.providers import LLMProvider
+
+    timings = []
+    for _ in range(sessions):
+        start = time.perf_counter()
+        client = _create_client(LLMProvider(provider)) if fresh_clients else None
+        AugmentedLLM(system_prompt="Benchmark", provider=provider, client=client)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--provider", default="anthropic", choices=["anthropic", "openai"])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--import-runs", type=int, default=5)
+    args = parser.parse_args()
+
+    # Client construction does not hit the network, so a placeholder key is enough
+    os.environ.setdefault("ANTHROPIC_API_KEY", "benchmark")
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+    print("=== Import time (median of fresh interpreters) ===")
+    print(f"Eager SDK imports: {time_import(EAGER_IMPORTS, args.import_runs):8.1f} ms")
+    print(f"Lazy package:      {time_import(LAZY_IMPORTS, args.import_runs):8.1f} ms")
+
+    print(f"\n=== Session setup time ({args.provider}, median of {args.sessions}) ===")
+    print(f"New client per session: {time_sessions(args.provider, args.sessions, True):8.3f} ms")
+    print(f"Shared client registry: {time_sessions(args.provider, args.sessions, False):8.3f} ms")
+
+if __name__ == "__main__":
+    main()
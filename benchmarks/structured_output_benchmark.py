@@ -0,0 +1,136 @@
+"""
+Structured Output Throughput Benchmark
+
+Extracts knowledge-graph data from many text chunks through
+OpenAIChatInterface against an in-process fake chat server with a fixed
+response latency, and reports chunks per second for:
+
+    sequential    one parse_structured_output call per chunk, as the
+                  extraction notebooks do
+    parse_many    independent chunks on a thread pool with the sync client
+    aparse_many   independent chunks on the event loop with the async client
+
+It also prints the size of the assistant message stored in the history, as
+compact JSON versus the Python repr the interface used to store.
+
+Usage:
+    python benchmarks/structured_output_benchmark.py [--chunks 200] [--latency 0.05] [--concurrency 16]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+from typing import List
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from pydantic import BaseModel
+from openai_interacter import OpenAIChatInterface
+
+class Node(BaseModel):
+    id: str
+    type: str
+
+class Relationship(BaseModel):
+    source: str
+    target: str
+    type: str
+
+class KnowledgeGraph(BaseModel):
+    nodes: List[Node]
+    relationships: List[Relationship]
+
+def completion_for(params: dict) -> SimpleNamespace:
+    """Answer an extraction request with a small graph built from the chunk text."""
+    chunk = params["messages"][-1]["content"]
+    words = chunk.split()
+    graph = {
+        "nodes": [{"id": word, "type": "concept"} for word in words[:8]],
+        "relationships": [{"source": a, "target": b, "type": "RELATED_TO"} for a, b in zip(words[:7], words[1:8])]
+    }
+    content = json.dumps(graph, indent=2)
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=content, refusal=None))],
+        usage=SimpleNamespace(prompt_tokens=len(chunk) // 4, completion_tokens=len(content) // 4, total_tokens=(len(chunk) + len(content)) // 4)
+    )
+
+class LocalChatServer:
+    """Fake sync client: chat.completions.create() after a fixed delay."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **params) -> SimpleNamespace:
+        time.sleep(self.latency)
+        return completion_for(params)
+
+class AsyncLocalChatServer:
+    """Fake async client: awaitable chat.completions.create() after a fixed delay."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=self)
+
+    async def create(self, **params) -> SimpleNamespace:
+        await asyncio.sleep(self.latency)
+        return completion_for(params)
+
+def make_chunks(count: int) -> List[str]:
+    return [f"Chunk {i} Elizabeth reigned over England from Greenwich with Cecil Dudley and Walsingham" for i in range(count)]
+
+def extraction_messages(chunk: str) -> List[dict]:
+    return [
+        {"role": "developer", "content": "Extract a knowledge graph from the text."},
+        {"role": "user", "content": chunk}
+    ]
+
+def run_sequential(chunks: List[str], latency: float) -> list:
+    client = LocalChatServer(latency)
+    results = []
+    for chunk in chunks:
+        chat = OpenAIChatInterface(initial_messages=extraction_messages(chunk), client=client)
+        results.append(chat.parse_structured_output(KnowledgeGraph))
+    return results
+
+def run_parse_many(chunks: List[str], latency: float, concurrency: int) -> list:
+    chat = OpenAIChatInterface(client=LocalChatServer(latency))
+    return chat.parse_many([extraction_messages(chunk) for chunk in chunks], KnowledgeGraph, max_concurrency=concurrency)
+
+def run_aparse_many(chunks: List[str], latency: float, concurrency: int) -> list:
+    chat = OpenAIChatInterface(client=LocalChatServer(latency), async_client=AsyncLocalChatServer(latency))
+    return asyncio.run(chat.aparse_many([extraction_messages(chunk) for chunk in chunks], KnowledgeGraph, max_concurrency=concurrency))
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per fake request")
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks)
+    print(f"=== {args.chunks} chunks, {args.latency * 1000:.0f} ms per request, concurrency {args.concurrency} ===")
+    seq_s, seq_results = timed(run_sequential, chunks, args.latency)
+    many_s, many_results = timed(run_parse_many, chunks, args.latency, args.concurrency)
+    async_s, async_results = timed(run_aparse_many, chunks, args.latency, args.concurrency)
+    assert seq_results == many_results == async_results
+
+    print(f"sequential:   {args.chunks / seq_s:8.1f} chunks/s")
+    print(f"parse_many:   {args.chunks / many_s:8.1f} chunks/s ({seq_s / many_s:.1f}x)")
+    print(f"aparse_many:  {args.chunks / async_s:8.1f} chunks/s ({seq_s / async_s:.1f}x)")
+
+    parsed = seq_results[0]
+    print(f"Stored assistant message: {len(parsed.model_dump_json())} chars as compact JSON, {len(str(parsed))} chars as repr")
+
+if __name__ == "__main__":
+    main()
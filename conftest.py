@@ -0,0 +1,147 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from augmented_llm import llm as llm_module
+from augmented_llm import token_debugger
+from augmented_llm.error_logger import get_tool_error_logger
+
+class WordEncoding:
+    """Offline stand-in for a tiktoken encoding: one token per whitespace-separated word."""
+
+    def encode_ordinary(self, text):
+        return text.split()
+
+    def encode_ordinary_batch(self, texts, num_threads=1):
+        return [self.encode_ordinary(text) for text in texts]
+
+@pytest.fixture(autouse=True)
+def word_encoding(monkeypatch):
+    # Token counts must not depend on tiktoken or on downloading its encodings
+    for name in ("cl100k_base", "o200k_base"):
+        monkeypatch.setitem(token_debugger._encodings, name, WordEncoding())
+
+@pytest.fixture(autouse=True)
+def tool_error_log_in_tmp_path(tmp_path, monkeypatch):
+    # Keep the sessions' tool error index out of the working tree
+    log_dir = str(tmp_path / "tool_errors")
+    monkeypatch.setattr(llm_module, "get_tool_error_logger", lambda: get_tool_error_logger(log_dir))
+
+class FakeClient:
+    """Stands in for an Anthropic or OpenAI client, serving one scripted stream per request.
+
+    A turn is a list of stream events, an exception raised by create(), or a
+    callable returning the stream. Request parameters are recorded in order.
+    """
+
+    def __init__(self, turns):
+        self.turns = list(turns)
+        self.requests = []
+        self._lock = threading.Lock()
+        self.messages = self
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **params):
+        # Real clients serialize the request when it is sent; keep what was sent
+        sent = {key: list(value) if isinstance(value, list) else value for key, value in params.items()}
+        with self._lock:
+            self.requests.append(sent)
+            turn = self.turns.pop(0)
+        if isinstance(turn, BaseException):
+            raise turn
+        if callable(turn):
+            return turn()
+        return iter(turn)
+
+    @staticmethod
+    def delayed(events, before=0.0, between=0.0):
+        """Turn that waits before the first event and between events."""
+        def stream():
+            time.sleep(before)
+            for i, event in enumerate(events):
+                if i and between:
+                    time.sleep(between)
+                yield event
+        return stream
+
+    @staticmethod
+    def anthropic_text(text, input_tokens=10, output_tokens=5):
+        return FakeClient.anthropic_turn([("text", text)], "end_turn", input_tokens, output_tokens)
+
+    @staticmethod
+    def anthropic_tool_use(calls, text=None, input_tokens=10, output_tokens=5):
+        """Turn asking for tools; calls are (tool_use_id, name, input) tuples."""
+        blocks = [("text", text)] if text else []
+        blocks += [("tool_use", call) for call in calls]
+        return FakeClient.anthropic_turn(blocks, "tool_use", input_tokens, output_tokens)
+
+    @staticmethod
+    def anthropic_turn(blocks, stop_reason, input_tokens, output_tokens):
+        usage = SimpleNamespace(input_tokens=input_tokens, output_tokens=1, cache_read_input_tokens=0, cache_creation_input_tokens=0)
+        events = [SimpleNamespace(type="message_start", message=SimpleNamespace(usage=usage))]
+        for index, (kind, value) in enumerate(blocks):
+            if kind == "text":
+                events.append(SimpleNamespace(type="content_block_start", index=index, content_block=SimpleNamespace(type="text", text="")))
+                events.append(SimpleNamespace(type="content_block_delta", index=index, delta=SimpleNamespace(type="text_delta", text=value)))
+            else:
+                tool_use_id, name, tool_input = value
+                events.append(SimpleNamespace(
+                    type="content_block_start",
+                    index=index,
+                    content_block=SimpleNamespace(type="tool_use", id=tool_use_id, name=name, input={})
+                ))
+                arguments = json.dumps(tool_input)
+                for start in range(0, len(arguments), 8):
+                    events.append(SimpleNamespace(
+                        type="content_block_delta",
+                        index=index,
+                        delta=SimpleNamespace(type="input_json_delta", partial_json=arguments[start:start + 8])
+                    ))
+            events.append(SimpleNamespace(type="content_block_stop", index=index))
+        events.append(SimpleNamespace(
+            type="message_delta",
+            delta=SimpleNamespace(stop_reason=stop_reason),
+            usage=SimpleNamespace(output_tokens=output_tokens)
+        ))
+        events.append(SimpleNamespace(type="message_stop"))
+        return events
+
+    @staticmethod
+    def openai_text(text, prompt_tokens=10, completion_tokens=5):
+        return [FakeClient._openai_chunk(content=text), FakeClient._openai_usage(prompt_tokens, completion_tokens)]
+
+    @staticmethod
+    def openai_tool_calls(calls, prompt_tokens=10, completion_tokens=5):
+        """Turn asking for tools; calls are (call_id, name, arguments) tuples."""
+        chunks = []
+        for index, (call_id, name, arguments) in enumerate(calls):
+            chunks.append(FakeClient._openai_chunk(tool_calls=[SimpleNamespace(
+                index=index, id=call_id, function=SimpleNamespace(name=name, arguments="")
+            )]))
+            arguments = json.dumps(arguments)
+            for start in range(0, len(arguments), 8):
+                chunks.append(FakeClient._openai_chunk(tool_calls=[SimpleNamespace(
+                    index=index, id=None, function=SimpleNamespace(name=None, arguments=arguments[start:start + 8])
+                )]))
+        chunks.append(FakeClient._openai_usage(prompt_tokens, completion_tokens))
+        return chunks
+
+    @staticmethod
+    def _openai_chunk(content=None, tool_calls=None):
+        delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+        return SimpleNamespace(choices=[SimpleNamespace(index=0, delta=delta)], usage=None)
+
+    @staticmethod
+    def _openai_usage(prompt_tokens, completion_tokens):
+        usage = SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=0)
+        )
+        return SimpleNamespace(choices=[], usage=usage)
+
+@pytest.fixture
+def fake_client():
+    """The FakeClient class; call it with a list of turns."""
+    return FakeClient
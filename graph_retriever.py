@@ -0,0 +1,754 @@
+"""
+Graph Retriever
+
+This module resolves entity names from a question to knowledge graph nodes
+without a database round trip, and collects the 1-hop neighborhood of the
+matched nodes for retrieval-augmented answers.
+
+EntityIndex is an in-memory fuzzy index over node ids and names. It follows
+the semantics of the Lucene `word~2 AND ...` queries the fulltext lookup used:
+every word of the entity name must match some word of the node within two
+edits (insertions, deletions, substitutions or adjacent transpositions).
+Candidate words come from a trigram index for long words and from a
+deletion-variant index for short ones, and every candidate is verified with a
+bounded edit distance, so lookups cost a few dictionary probes rather than a
+scan of the vocabulary.
+
+Limitation: the index is pure Python. At a million entities a lookup takes
+about 0.1-0.2 ms once its words are cached but 2.5-3.5 ms cold (see
+benchmarks/entity_index_benchmark.py), short of a sub-millisecond cold
+target; candidate verification dominates and would need a native matcher.
+
+NeighborhoodCache keeps the formatted relationships of popular entities so
+repeated questions about them skip the neighborhood query.
+"""
+
+import re
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Callable, Iterable, Set, Tuple
+
+MAX_EDITS = 2
+GRAM_SIZE = 3
+
+# Trigram postings pack (word number, position) into one integer
+POSITION_SLOTS = 1024
+
+_WORD = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase words, the way the fulltext analyzer does.
+    
+    Args:
+        text: Entity id, name or question fragment
+        
+    Returns:
+        The words of the text
+    """
+    return _WORD.findall(text.lower()) if text else []
+
+def edit_distance(a: str, b: str, max_edits: int = MAX_EDITS) -> int:
+    """
+    Optimal string alignment distance between two words, bounded by max_edits.
+    
+    Args:
+        a: First word
+        b: Second word
+        max_edits: Distance above which the exact value is not needed
+        
+    Returns:
+        The distance, or max_edits + 1 if it exceeds max_edits
+    """
+    if a == b:
+        return 0
+    too_far = max_edits + 1
+    if abs(len(a) - len(b)) > max_edits:
+        return too_far
+    # Only cells within max_edits of the diagonal can stay within the bound
+    before_previous = None
+    previous = [min(j, too_far) for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [too_far] * (len(b) + 1)
+        if i <= max_edits:
+            current[0] = i
+        row_min = current[0]
+        char = a[i - 1]
+        for j in range(max(1, i - max_edits), min(len(b), i + max_edits) + 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != b[j - 1]))
+            if i > 1 and j > 1 and char == b[j - 2] and a[i - 2] == b[j - 1] and before_previous[j - 2] + 1 < value:
+                value = before_previous[j - 2] + 1
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_edits:
+            return too_far
+        before_previous, previous = previous, current
+    return min(previous[-1], too_far)
+
+def _grams(word: str) -> List[str]:
+    """Trigrams of a word padded with two spaces on each side, in position order."""
+    padded = f"  {word}  "
+    return [padded[i:i + GRAM_SIZE] for i in range(len(padded) - GRAM_SIZE + 1)]
+
+def _deletion_variants(word: str, depth: int) -> Set[str]:
+    variants = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+class EntityIndex:
+    """
+    In-memory fuzzy index over the ids and names of knowledge graph nodes.
+    """
+    
+    def __init__(self, max_edits: int = MAX_EDITS, max_candidates: int = 10000):
+        """
+        Create an empty index.
+        
+        Args:
+            max_edits: Edits allowed per word (the fulltext queries used ~2)
+            max_candidates: Entities scored at most per lookup; the closest
+                matches of the most selective word are scored first
+        """
+        self.max_edits = max_edits
+        self.max_candidates = max_candidates
+        # Each edit changes at most GRAM_SIZE + 1 trigrams (a transposition
+        # touches two characters), so trigrams only prune words longer than
+        # this; shorter query words are matched through deletion variants
+        self._short_word_length = max_edits * (GRAM_SIZE + 1) - 2
+        
+        # Entities and words are interned as integers
+        self._entity_numbers: Dict[str, int] = {}
+        self._entity_ids: List[Optional[str]] = []
+        self._entity_words: List[Tuple[int, ...]] = []
+        self._word_numbers: Dict[str, int] = {}
+        self._words: List[str] = []
+        self._postings: List[List[int]] = []
+        
+        # Candidate generation: trigram -> packed (word number, position), and
+        # deletion variant -> word numbers for short words
+        self._grams: Dict[str, List[int]] = {}
+        self._variants: Dict[str, List[int]] = {}
+        
+        # Fuzzy matches per query word, valid until the vocabulary grows
+        self._matches: Dict[str, Dict[int, int]] = {}
+        self._lock = threading.RLock()
+        self._listener: Optional[Callable[[Dict[str, Any]], None]] = None
+        
+    def __len__(self) -> int:
+        return len(self._entity_numbers)
+        
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self._entity_numbers
+        
+    @classmethod
+    def from_kg_dict(cls, kg_dict: Dict[str, Any], **kwargs) -> "EntityIndex":
+        """
+        Build an index from a dictionary-based knowledge graph.
+        
+        Args:
+            kg_dict: A dictionary containing a 'nodes' key
+            kwargs: EntityIndex options
+            
+        Returns:
+            The populated index
+        """
+        index = cls(**kwargs)
+        index.add_kg_dict(kg_dict)
+        return index
+        
+    @classmethod
+    def from_graph(cls, graph, label: Optional[str] = "__Entity__", **kwargs) -> "EntityIndex":
+        """
+        Build an index from the nodes stored in Neo4j.
+        
+        Args:
+            graph: A Neo4jGraph instance
+            label: Label of the entity nodes (None indexes every node with an id)
+            kwargs: EntityIndex options
+            
+        Returns:
+            The populated index
+        """
+        match = f"MATCH (e:`{label}`)" if label else "MATCH (e) WHERE e.id IS NOT NULL"
+        index = cls(**kwargs)
+        for row in graph.query(f"{match} RETURN e.id AS id, e.name AS name"):
+            index.add_entity(row["id"], row.get("name"))
+        return index
+        
+    def add_kg_dict(self, kg_dict: Dict[str, Any]) -> None:
+        """
+        Add or update the nodes of a dictionary-based knowledge graph.
+        
+        Args:
+            kg_dict: A dictionary containing a 'nodes' key
+        """
+        for node in kg_dict.get("nodes", []):
+            if node.get("id"):
+                self.add_entity(node["id"], node.get("name"))
+                
+    def add_entity(self, entity_id: str, name: Optional[str] = None) -> None:
+        """
+        Add an entity, or update its indexed name.
+        
+        Args:
+            entity_id: Node id
+            name: Optional display name, indexed alongside the id
+        """
+        entity_id = str(entity_id)
+        words = tokenize(entity_id) + tokenize(str(name)) if name else tokenize(entity_id)
+        with self._lock:
+            number = self._entity_numbers.get(entity_id)
+            if number is not None:
+                if {self._words[w] for w in self._entity_words[number]} == set(words):
+                    return
+                self._unlink(number)
+            else:
+                number = len(self._entity_ids)
+                self._entity_numbers[entity_id] = number
+                self._entity_ids.append(entity_id)
+                self._entity_words.append(())
+            word_numbers = tuple(sorted({self._intern(word) for word in words}))
+            self._entity_words[number] = word_numbers
+            for word_number in word_numbers:
+                self._postings[word_number].append(number)
+                
+    def remove_entity(self, entity_id: str) -> None:
+        """
+        Remove an entity from the index.
+        
+        Args:
+            entity_id: Node id
+        """
+        with self._lock:
+            number = self._entity_numbers.pop(str(entity_id), None)
+            if number is not None:
+                self._unlink(number)
+                self._entity_ids[number] = None
+                
+    def _unlink(self, number: int) -> None:
+        for word_number in self._entity_words[number]:
+            self._postings[word_number].remove(number)
+        self._entity_words[number] = ()
+        
+    def _intern(self, word: str) -> int:
+        number = self._word_numbers.get(word)
+        if number is not None:
+            return number
+        number = len(self._words)
+        self._word_numbers[word] = number
+        self._words.append(word)
+        self._postings.append([])
+        for position, gram in enumerate(_grams(word)):
+            self._grams.setdefault(gram, []).append(number * POSITION_SLOTS + min(position, POSITION_SLOTS - 1))
+        if len(word) <= self._short_word_length + self.max_edits:
+            for variant in _deletion_variants(word, self.max_edits):
+                self._variants.setdefault(variant, []).append(number)
+        # A new word can be a fuzzy match of earlier queries
+        self._matches.clear()
+        return number
+        
+    def _edits_for(self, word: str) -> int:
+        # One- and two-letter words (the "I" in "Elizabeth I") would otherwise
+        # match every short word in the graph
+        return min(self.max_edits, max(len(word) - 1, 0))
+        
+    def _fuzzy_words(self, word: str) -> Dict[int, int]:
+        """Word numbers within the allowed edits of a query word, with their distance."""
+        matches = self._matches.get(word)
+        if matches is not None:
+            return matches
+        edits = self._edits_for(word)
+        exact = self._word_numbers.get(word)
+        if edits == 0:
+            matches = {exact: 0} if exact is not None else {}
+        else:
+            matches = {}
+            for number in self._candidates(word, edits):
+                distance = edit_distance(word, self._words[number], edits)
+                if distance <= edits:
+                    matches[number] = distance
+        if len(self._matches) >= 100000:
+            self._matches.clear()
+        self._matches[word] = matches
+        return matches
+        
+    def _candidates(self, word: str, edits: int) -> Iterable[int]:
+        """Words that may lie within `edits` of a query word."""
+        if len(word) <= self._short_word_length:
+            candidates = set()
+            for variant in _deletion_variants(word, edits):
+                candidates.update(self._variants.get(variant, ()))
+            return candidates
+            
+        # A match keeps all but edits * (GRAM_SIZE + 1) of the word's
+        # trigrams, each within `edits` positions of where it was
+        grams = _grams(word)
+        required = len(grams) - edits * (GRAM_SIZE + 1)
+        counts: Dict[int, int] = {}
+        for position, gram in enumerate(grams):
+            for entry in self._grams.get(gram, ()):
+                number, other = divmod(entry, POSITION_SLOTS)
+                if abs(other - position) <= edits:
+                    counts[number] = counts.get(number, 0) + 1
+        low, high = len(word) - edits, len(word) + edits
+        return [
+            number for number, count in counts.items()
+            if count >= required and low <= len(self._words[number]) <= high
+        ]
+        
+    def search(self, text: str, limit: int = 2) -> List[str]:
+        """
+        Find the entities whose id or name fuzzily contains every word of a text.
+        
+        Args:
+            text: Entity name as mentioned in a question
+            limit: Maximum number of entities returned
+            
+        Returns:
+            Entity ids, best match first (fewest edits, then fewest extra words)
+        """
+        query_words = list(dict.fromkeys(tokenize(text)))
+        if not query_words:
+            return []
+        with self._lock:
+            word_matches = [self._fuzzy_words(word) for word in query_words]
+            if any(not matches for matches in word_matches):
+                return []
+                
+            # Start from the word matching the fewest entities, closest words first
+            postings = self._postings
+            word_matches.sort(key=lambda matches: sum(len(postings[n]) for n in matches))
+            pivot, others = word_matches[0], word_matches[1:]
+            by_distance: Dict[int, List[int]] = {}
+            for number, distance in pivot.items():
+                by_distance.setdefault(distance, []).append(number)
+                
+            # Entity number -> (total edits, word count, id); an entity with
+            # words at several pivot distances is scored once, when first reached
+            scored: Dict[int, Tuple[int, int, str]] = {}
+            examined = 0
+            for distance in sorted(by_distance):
+                # Entities reached through farther words cannot beat `limit` closer ones
+                if len(scored) >= limit and sorted(scored.values())[limit - 1][0] < distance:
+                    break
+                candidates: Set[int] = set()
+                for number in by_distance[distance]:
+                    candidates.update(postings[number])
+                candidates.difference_update(scored)
+                candidates = self._filter(candidates, others)
+                for entity in candidates:
+                    entity_words = self._entity_words[entity]
+                    total = sum(min(matches[w] for w in entity_words if w in matches) for matches in word_matches)
+                    scored[entity] = (total, len(entity_words), self._entity_ids[entity])
+                examined += len(candidates)
+                if examined >= self.max_candidates:
+                    break
+        return [entity_id for _, _, entity_id in sorted(scored.values())[:limit]]
+        
+    def _filter(self, candidates: Set[int], others: List[Dict[int, int]]) -> Set[int]:
+        """Keep the candidate entities that also match every other query word."""
+        postings = self._postings
+        for matches in others:
+            if not candidates:
+                break
+            if sum(len(postings[n]) for n in matches) <= 4 * len(candidates):
+                matching: Set[int] = set()
+                for number in matches:
+                    matching.update(postings[number])
+                candidates &= matching
+            else:
+                entity_words = self._entity_words
+                candidates = {e for e in candidates if any(w in matches for w in entity_words[e])}
+        return candidates
+        
+    def track_uploads(self) -> None:
+        """
+        Keep the index current with every knowledge graph uploaded through
+        graph_utils.upload_kg_to_neo4j.
+        """
+        from graph_utils import register_upload_listener  # Imported lazily to keep LangChain optional
+        if self._listener is None:
+            self._listener = self.add_kg_dict
+            register_upload_listener(self._listener)
+            
+    def untrack_uploads(self) -> None:
+        """
+        Stop updating the index on uploads.
+        """
+        from graph_utils import unregister_upload_listener
+        if self._listener is not None:
+            unregister_upload_listener(self._listener)
+            self._listener = None
+            
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return the size of the index.
+        """
+        with self._lock:
+            return {
+                "entities": len(self._entity_numbers),
+                "words": len(self._words),
+                "trigrams": len(self._grams),
+                "deletion_variants": len(self._variants),
+                "cached_queries": len(self._matches)
+            }
+
+# Relationships around a node, in both directions, excluding document mentions
+NEIGHBORHOOD_QUERY = """
+UNWIND $ids AS entity_id
+{match}
+CALL {{
+  WITH node
+  MATCH (node)-[r:!MENTIONS]->(neighbor)
+  RETURN node.id + ' - ' + type(r) + ' -> ' + neighbor.id AS output
+  UNION
+  WITH node
+  MATCH (node)<-[r:!MENTIONS]-(neighbor)
+  RETURN neighbor.id + ' - ' + type(r) + ' -> ' + node.id AS output
+}}
+RETURN output LIMIT $limit
+"""
+
+# Relationships of each node as separate rows, with the neighbor ids needed
+# to invalidate cached neighborhoods
+NEIGHBORHOOD_ROWS_QUERY = """
+UNWIND $ids AS entity_id
+{match}
+CALL {{
+  WITH node
+  MATCH (node)-[r:!MENTIONS]->(neighbor)
+  RETURN neighbor.id AS neighbor, node.id + ' - ' + type(r) + ' -> ' + neighbor.id AS output
+  UNION
+  WITH node
+  MATCH (node)<-[r:!MENTIONS]-(neighbor)
+  RETURN neighbor.id AS neighbor, neighbor.id + ' - ' + type(r) + ' -> ' + node.id AS output
+}}
+WITH entity_id, collect({{neighbor: neighbor, output: output}})[..$limit] AS rows
+RETURN entity_id, rows
+"""
+
+# Entities with the most relationships, excluding document mentions
+TOP_DEGREE_QUERY = """
+{match}
+WITH node, COUNT {{ (node)-[r:!MENTIONS]-() }} AS degree
+WHERE degree > 0
+RETURN node.id AS id
+ORDER BY degree DESC
+LIMIT $top
+"""
+
+class NeighborhoodCache:
+    """
+    Formatted 1-hop neighborhoods of entities, keyed by entity id.
+    
+    Entries are precomputed for the highest-degree entities (precompute) and
+    filled lazily for the rest, evicted least recently used beyond the entry
+    and size limits, and dropped when an upload touches the entity or one of
+    its neighbors (track_uploads or invalidate_kg_dict).
+    """
+    
+    def __init__(
+        self,
+        graph,
+        label: Optional[str] = "__Entity__",
+        max_relationships: int = 50,
+        max_entries: int = 100000,
+        max_bytes: int = 256 * 1024 * 1024,
+        batch_size: int = 500
+    ):
+        """
+        Create an empty cache.
+        
+        Args:
+            graph: A Neo4jGraph instance
+            label: Label of the entity nodes (None matches any node by id)
+            max_relationships: Relationships stored per entity
+            max_entries: Maximum number of cached entities
+            max_bytes: Approximate maximum size of the cached text
+            batch_size: Entities fetched per query
+        """
+        self.graph = graph
+        self.max_relationships = max_relationships
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        match = f"MATCH (node:`{label}` {{id: entity_id}})" if label else "MATCH (node {id: entity_id})"
+        self._query = NEIGHBORHOOD_ROWS_QUERY.format(match=match)
+        self._top_query = TOP_DEGREE_QUERY.format(match=f"MATCH (node:`{label}`)" if label else "MATCH (node) WHERE node.id IS NOT NULL")
+        
+        # entity id -> (relationship lines, neighbor ids, size in bytes)
+        self._entries: "OrderedDict[str, Tuple[Tuple[str, ...], Tuple[str, ...], int]]" = OrderedDict()
+        # neighbor id -> cached entities whose neighborhood contains it
+        self._dependents: Dict[str, Set[str]] = {}
+        self._bytes = 0
+        # Bumped on every invalidation so fetches that raced with one are not stored
+        self._generation = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0, "precomputed": 0}
+        self._lock = threading.RLock()
+        self._listener: Optional[Callable[[Dict[str, Any]], None]] = None
+        
+    def __len__(self) -> int:
+        return len(self._entries)
+        
+    def get(self, entity_id: str) -> List[str]:
+        """
+        Get the relationships of one entity as "source - TYPE -> target" lines.
+        """
+        return self.get_many([entity_id])[entity_id]
+        
+    def get_many(self, entity_ids: List[str]) -> Dict[str, List[str]]:
+        """
+        Get the relationships of several entities, fetching the uncached ones
+        in one query.
+        
+        Args:
+            entity_ids: Node ids
+            
+        Returns:
+            Dictionary mapping each id to its relationship lines (empty for
+            unknown ids)
+        """
+        result: Dict[str, List[str]] = {}
+        missing = []
+        with self._lock:
+            for entity_id in dict.fromkeys(entity_ids):
+                entry = self._entries.get(entity_id)
+                if entry is None:
+                    self._stats["misses"] += 1
+                    missing.append(entity_id)
+                else:
+                    self._stats["hits"] += 1
+                    self._entries.move_to_end(entity_id)
+                    result[entity_id] = list(entry[0])
+        if missing:
+            for entity_id, (lines, _) in self._fetch(missing).items():
+                result[entity_id] = list(lines)
+        return result
+        
+    def precompute(self, top: int = 1000) -> int:
+        """
+        Cache the neighborhoods of the entities with the most relationships.
+        
+        Call this after loading the graph so popular entities never miss.
+        
+        Args:
+            top: Number of entities to precompute (capped at max_entries)
+            
+        Returns:
+            Number of precomputed entities still cached afterwards
+        """
+        top = min(top, self.max_entries)
+        entity_ids = [row["id"] for row in self.graph.query(self._top_query, {"top": top}) if row.get("id") is not None]
+        # Stored in ascending degree order, so if max_bytes is reached the
+        # least recently used entries evicted are the lowest-degree ones
+        entity_ids.reverse()
+        self._fetch(entity_ids)
+        with self._lock:
+            resident = sum(1 for entity_id in entity_ids if entity_id in self._entries)
+            self._stats["precomputed"] += resident
+        return resident
+        
+    def _fetch(self, entity_ids: List[str]) -> Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+        """Query the neighborhoods of entities in batches and cache them."""
+        fetched = {}
+        for start in range(0, len(entity_ids), self.batch_size):
+            batch = entity_ids[start:start + self.batch_size]
+            with self._lock:
+                generation = self._generation
+            response = self.graph.query(self._query, {"ids": batch, "limit": self.max_relationships})
+            rows_by_id = {row["entity_id"]: row["rows"] for row in response}
+            with self._lock:
+                store = generation == self._generation
+                for entity_id in batch:
+                    # Unknown ids are cached empty so they are not queried again
+                    rows = rows_by_id.get(entity_id) or []
+                    lines = tuple(row["output"] for row in rows)
+                    neighbors = tuple({str(row["neighbor"]) for row in rows})
+                    fetched[entity_id] = (lines, neighbors)
+                    if store:
+                        self._store(entity_id, lines, neighbors)
+        return fetched
+        
+    def _store(self, entity_id: str, lines: Tuple[str, ...], neighbors: Tuple[str, ...]) -> None:
+        self._remove(entity_id)
+        size = sys.getsizeof(lines) + sum(sys.getsizeof(line) for line in lines)
+        self._entries[entity_id] = (lines, neighbors, size)
+        self._bytes += size
+        for neighbor in neighbors:
+            self._dependents.setdefault(neighbor, set()).add(entity_id)
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self._stats["evictions"] += 1
+            
+    def _remove(self, entity_id: str) -> bool:
+        entry = self._entries.pop(entity_id, None)
+        if entry is None:
+            return False
+        _, neighbors, size = entry
+        self._bytes -= size
+        for neighbor in neighbors:
+            dependents = self._dependents.get(neighbor)
+            if dependents is not None:
+                dependents.discard(entity_id)
+                if not dependents:
+                    del self._dependents[neighbor]
+        return True
+        
+    def invalidate(self, entity_ids: Optional[Iterable[str]] = None) -> int:
+        """
+        Drop the cached neighborhoods of entities and of the entities next to them.
+        
+        Args:
+            entity_ids: Node ids that changed (everything is dropped when None)
+            
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            self._generation += 1
+            if entity_ids is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                self._dependents.clear()
+                self._bytes = 0
+            else:
+                stale = set()
+                for entity_id in entity_ids:
+                    entity_id = str(entity_id)
+                    stale.add(entity_id)
+                    stale.update(self._dependents.get(entity_id, ()))
+                removed = sum(1 for entity_id in stale if self._remove(entity_id))
+            self._stats["invalidations"] += removed
+            return removed
+            
+    def invalidate_kg_dict(self, kg_dict: Dict[str, Any]) -> int:
+        """
+        Drop the neighborhoods touched by an uploaded knowledge graph.
+        
+        Args:
+            kg_dict: A dictionary containing 'nodes' and 'relationships' keys
+            
+        Returns:
+            Number of entries removed
+        """
+        touched = {node["id"] for node in kg_dict.get("nodes", []) if node.get("id")}
+        for rel in kg_dict.get("relationships", []):
+            touched.update(rel[key] for key in ("source", "target") if rel.get(key))
+        return self.invalidate(touched)
+        
+    def track_uploads(self) -> None:
+        """
+        Invalidate entries on every knowledge graph uploaded through
+        graph_utils.upload_kg_to_neo4j.
+        """
+        from graph_utils import register_upload_listener  # Imported lazily to keep LangChain optional
+        if self._listener is None:
+            self._listener = self.invalidate_kg_dict
+            register_upload_listener(self._listener)
+            
+    def untrack_uploads(self) -> None:
+        """
+        Stop invalidating entries on uploads.
+        """
+        from graph_utils import unregister_upload_listener
+        if self._listener is not None:
+            unregister_upload_listener(self._listener)
+            self._listener = None
+            
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Return hit/miss counters and the size of the cache.
+        """
+        with self._lock:
+            hits, misses = self._stats["hits"], self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes
+            }
+
+class GraphRetriever:
+    """
+    Structured retriever: entity names in a question -> matching nodes ->
+    their relationships, as text for the model.
+    """
+    
+    def __init__(
+        self,
+        graph,
+        entity_index: EntityIndex,
+        extract_entities: Optional[Callable[[str], List[str]]] = None,
+        label: Optional[str] = "__Entity__",
+        matches_per_entity: int = 2,
+        max_relationships: int = 50,
+        neighborhood_cache: Optional[NeighborhoodCache] = None,
+        debug: bool = False
+    ):
+        """
+        Create a retriever.
+        
+        Args:
+            graph: A Neo4jGraph instance
+            entity_index: Index used to resolve entity names to node ids
+            extract_entities: Returns the entity names mentioned in a question
+                (defaults to treating the whole question as one name)
+            label: Label of the entity nodes (None matches any node by id)
+            matches_per_entity: Nodes looked up per entity name
+            max_relationships: Relationships returned per entity name
+            neighborhood_cache: Optional cache of formatted neighborhoods; its
+                max_relationships should be at least this retriever's
+            debug: Print retrieval progress
+        """
+        self.graph = graph
+        self.entity_index = entity_index
+        self.extract_entities = extract_entities or (lambda question: [question])
+        self.matches_per_entity = matches_per_entity
+        self.max_relationships = max_relationships
+        self.neighborhood_cache = neighborhood_cache
+        self.debug = debug
+        match = f"MATCH (node:`{label}` {{id: entity_id}})" if label else "MATCH (node {id: entity_id})"
+        self._query = NEIGHBORHOOD_QUERY.format(match=match)
+        
+    def neighborhood(self, entity_ids: List[str]) -> List[str]:
+        """
+        Get the relationships of a set of nodes as "source - TYPE -> target" lines.
+        
+        Args:
+            entity_ids: Node ids
+            
+        Returns:
+            Up to max_relationships lines
+        """
+        if not entity_ids:
+            return []
+        if self.neighborhood_cache is not None:
+            cached = self.neighborhood_cache.get_many(entity_ids)
+            lines = [line for entity_id in entity_ids for line in cached[entity_id]]
+            return lines[:self.max_relationships]
+        response = self.graph.query(self._query, {"ids": entity_ids, "limit": self.max_relationships})
+        return [row["output"] for row in response]
+        
+    def retrieve(self, question: str) -> str:
+        """
+        Collect the neighborhood of the entities mentioned in a question.
+        
+        Args:
+            question: The user's question
+            
+        Returns:
+            One relationship per line
+        """
+        lines = []
+        for entity in self.extract_entities(question):
+            entity_ids = self.entity_index.search(entity, limit=self.matches_per_entity)
+            relationships = self.neighborhood(entity_ids)
+            if self.debug:
+                print(f"[Structured Retriever] {entity!r} -> {entity_ids}: {len(relationships)} relationships")
+            lines.extend(relationships)
+        return "\n".join(lines)
@@ -5,7 +5,7 @@ This module provides utility functions for working with knowledge graphs,
 including conversion between different formats and database operations.
 """
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Callable
 from langchain_community.graphs.graph_document import (
     Node as LCNode,
     Relationship as LCRelationship,
@@ -139,6 +139,44 @@ def dict_to_graph_documents(kg_dict: Dict[str, Any]) -> List[GraphDocument]:
     
     return [graph_document]
 
+# Callbacks run with the uploaded knowledge graph dict after every successful upload
+_upload_listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+def register_upload_listener(listener: Callable[[Dict[str, Any]], None]) -> None:
+    """
+    Register a callback to run after a knowledge graph is uploaded.
+    
+    Use this to invalidate caches that depend on the graph contents, e.g.
+    tool result caches of retrieval tools.
+    
+    Args:
+        listener: Function called with the uploaded knowledge graph dictionary
+    """
+    _upload_listeners.append(listener)
+
+def unregister_upload_listener(listener: Callable[[Dict[str, Any]], None]) -> None:
+    """
+    Remove a previously registered upload callback.
+    
+    Args:
+        listener: The callback to remove
+    """
+    if listener in _upload_listeners:
+        _upload_listeners.remove(listener)
+
+def notify_upload_listeners(kg_dict: Dict[str, Any]) -> None:
+    """
+    Run all upload callbacks for a knowledge graph that was just uploaded.
+    
+    Args:
+        kg_dict: The uploaded knowledge graph dictionary
+    """
+    for listener in list(_upload_listeners):
+        try:
+            listener(kg_dict)
+        except Exception as e:
+            print(f"Error in upload listener: {e}")
+
 def upload_kg_to_neo4j(kg_dict: Dict[str, Any], graph) -> bool:
     """
     Upload a dictionary-based knowledge graph to Neo4j.
@@ -156,10 +194,13 @@ def upload_kg_to_neo4j(kg_dict: Dict[str, Any], graph) -> bool:
         
         # Upload to Neo4j
         graph.add_graph_documents(graph_documents, include_source=False)
-        return True
     except Exception as e:
         print(f"Error uploading knowledge graph to Neo4j: {e}")
         return False
+    
+    # Let caches built on the graph contents invalidate themselves
+    notify_upload_listeners(kg_dict)
+    return True
 
 def print_graph_document_summary(graph_documents: List[GraphDocument]) -> None:
     """
@@ -6,7 +6,6 @@ It uses schemas of varying complexity from the schemas package.
 """
 
 from typing import Optional
-from openai import OpenAI
 import json
 from datetime import datetime
 
@@ -14,17 +13,18 @@ from datetime import datetime
 from schemas import GetKnowledgeGraphSchema, ComplexityLevel, GetSchemaDescription
 # Import graph utilities
 from graph_utils import dict_to_graph_documents, upload_kg_to_neo4j, print_graph_document_summary
+# Shared, lazily created provider clients and the process-wide rate limiter
+from augmented_llm.clients import get_client
+from augmented_llm.rate_limiter import RateLimiter, get_rate_limiter
 
-# Initialize the OpenAI client
-client = OpenAI()
-
-def generate_knowledge_graph(topic: str, complexity: ComplexityLevel = "standard") -> dict:
+def generate_knowledge_graph(topic: str, complexity: ComplexityLevel = "standard", rate_limiter: Optional[RateLimiter] = None) -> dict:
     """
     Generate a knowledge graph on the given topic using OpenAI's structured output.
     
     Args:
         topic: The topic to generate a knowledge graph about
         complexity: The complexity level of the schema ("basic", "standard", or "advanced")
+        rate_limiter: Limiter the request waits on (defaults to the process-wide one)
         
     Returns:
         A knowledge graph as a dictionary
@@ -38,37 +38,47 @@ def generate_knowledge_graph(topic: str, complexity: ComplexityLevel = "standard
     print(f"Generating {complexity} knowledge graph about: {topic}")
     
     try:
+        client = get_client("openai")
+        rate_limiter = rate_limiter or get_rate_limiter()
+        model = "gpt-4o-2024-08-06"
+        messages = [
+            {
+                "role": "system", 
+                "content": f"""
+                You are an expert at knowledge graph generation. 
+                Create a detailed knowledge graph on the given topic.
+                
+                {schema_description}
+                
+                Follow these guidelines:
+                - Each node should have a unique ID, a name, and at least one label/type
+                - Provide a brief description for each node
+                - Nodes can have optional properties (key-value pairs)
+                - For properties, always specify a data_type as one of: "string", "number", "boolean", "date", "url"
+                - Relationships connect two nodes with a specific type (e.g., "CREATED", "LOCATED_IN", "INFLUENCED")
+                - For relationships, specify source, target, type, and set bidirectional to true or false
+                - Add weight values (0-1) to relationships to indicate their strength
+                - Add temporal information where relevant (when relationships began/ended)
+                - Make the graph rich and interconnected
+                - Include metadata like confidence scores where appropriate
+                """
+            },
+            {
+                "role": "user", 
+                "content": f"Generate a knowledge graph about: {topic}"
+            }
+        ]
+        
+        reservation = None
+        if rate_limiter.is_limited(model):
+            reservation = rate_limiter.acquire(model, rate_limiter.estimate_tokens(messages))
         completion = client.beta.chat.completions.parse(
-            model="gpt-4o-2024-08-06",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": f"""
-                    You are an expert at knowledge graph generation. 
-                    Create a detailed knowledge graph on the given topic.
-                    
-                    {schema_description}
-                    
-                    Follow these guidelines:
-                    - Each node should have a unique ID, a name, and at least one label/type
-                    - Provide a brief description for each node
-                    - Nodes can have optional properties (key-value pairs)
-                    - For properties, always specify a data_type as one of: "string", "number", "boolean", "date", "url"
-                    - Relationships connect two nodes with a specific type (e.g., "CREATED", "LOCATED_IN", "INFLUENCED")
-                    - For relationships, specify source, target, type, and set bidirectional to true or false
-                    - Add weight values (0-1) to relationships to indicate their strength
-                    - Add temporal information where relevant (when relationships began/ended)
-                    - Make the graph rich and interconnected
-                    - Include metadata like confidence scores where appropriate
-                    """
-                },
-                {
-                    "role": "user", 
-                    "content": f"Generate a knowledge graph about: {topic}"
-                }
-            ],
+            model=model,
+            messages=messages,
             response_format=KnowledgeGraph,
         )
+        if reservation is not None and completion.usage is not None:
+            rate_limiter.reconcile(reservation, completion.usage.total_tokens)
         
         # Convert to dict for easier manipulation
         kg = completion.choices[0].message.parsed.model_dump(mode='json')
@@ -1,15 +1,155 @@
-from openai import OpenAI
-from typing import List, Dict, Any, Optional, Type
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Type, Callable, Awaitable
 from pydantic import BaseModel
+from augmented_llm.clients import get_client, create_async_client
+from augmented_llm.instrumentation import Hook, emit_event
+from augmented_llm.openai_handler import extract_openai_usage
+from augmented_llm.rate_limiter import RateLimiter, get_rate_limiter
+
+# Strict response formats, built once per schema class
+_response_formats: Dict[Type[BaseModel], Dict[str, Any]] = {}
+
+def _finish_strict_schema(schema: Dict[str, Any]) -> None:
+    """Apply the strict-mode rules the SDK conversion leaves out, in place.
+    
+    Non-null defaults are removed, and Dict fields (objects with schema-valued
+    additionalProperties) are closed: strict mode requires additionalProperties
+    false on every object and has no map type, so they can only be returned as {}.
+    """
+    schema.pop("default", None)
+    if schema.get("type") == "object" and schema.get("additionalProperties", False) is not False:
+        schema["additionalProperties"] = False
+        schema.setdefault("properties", {})
+        schema["required"] = list(schema["properties"])
+    for key in ("properties", "$defs"):
+        for sub in schema.get(key, {}).values():
+            _finish_strict_schema(sub)
+    if isinstance(schema.get("items"), dict):
+        _finish_strict_schema(schema["items"])
+    for key in ("anyOf", "allOf"):
+        for sub in schema.get(key, []):
+            _finish_strict_schema(sub)
+
+def structured_response_format(schema: Type[BaseModel]) -> Dict[str, Any]:
+    """Get the cached strict json_schema response format for a Pydantic model.
+    
+    The schema is converted by the OpenAI SDK (the conversion behind
+    chat.completions.parse), once per model class.
+    """
+    response_format = _response_formats.get(schema)
+    if response_format is None:
+        # Imported lazily like the SDK clients (see augmented_llm/clients.py)
+        from openai.lib._parsing._completions import type_to_response_format_param
+        response_format = type_to_response_format_param(schema)
+        _finish_strict_schema(response_format["json_schema"]["schema"])
+        _response_formats[schema] = response_format
+    return response_format
 
 class OpenAIChatInterface:
-    def __init__(self, model_name: str = "gpt-4o", initial_messages: Optional[List[Dict[str, str]]] = None, temperature: float = 1.0):
-        self.client = OpenAI()
+    def __init__(self, model_name: str = "gpt-4o", initial_messages: Optional[List[Dict[str, str]]] = None, temperature: float = 1.0, hooks: Optional[List[Hook]] = None, rate_limiter: Optional[RateLimiter] = None, client: Optional[Any] = None, async_client: Optional[Any] = None):
+        self.client = client if client is not None else get_client("openai")
+        # Created on first async call, inside the event loop that uses it
+        self._async_client = async_client
         self.model_name = model_name
         self.temperature = temperature
         self.response_format = None
         self.messages = initial_messages or []
         self.schema_class = None
+        self.hooks: List[Hook] = list(hooks or [])
+        self.rate_limiter = rate_limiter if rate_limiter is not None else get_rate_limiter()
+        
+    @property
+    def async_client(self) -> Any:
+        """Async OpenAI client used by the a-prefixed methods."""
+        if self._async_client is None:
+            self._async_client = create_async_client("openai")
+        return self._async_client
+        
+    def add_hook(self, hook: Hook) -> None:
+        """Register a callback that receives timing events (see augmented_llm.instrumentation)."""
+        self.hooks.append(hook)
+        
+    def _request_finished(self, start: float, completion: Any, status: str) -> None:
+        """Emit first_token, stream_end and usage events for a finished API call."""
+        duration = time.perf_counter() - start
+        usage = getattr(completion, "usage", None)
+        if status == "ok":
+            # Non-streaming calls receive the whole response at once
+            emit_event(self.hooks, "first_token", provider="openai", model=self.model_name, ttft=duration)
+        emit_event(
+            self.hooks,
+            "stream_end",
+            provider="openai",
+            model=self.model_name,
+            duration=duration,
+            model_time=duration,
+            tool_time=0.0,
+            ttft=duration if status == "ok" else None,
+            output_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            status=status
+        )
+        if usage is not None:
+            emit_event(self.hooks, "usage", provider="openai", model=self.model_name, latency=duration, **extract_openai_usage(usage))
+            
+    def _timed_request(self, request: Callable[[], Any], messages: Optional[List[Dict[str, Any]]] = None) -> Any:
+        """Run an API call, emitting request_start, first_token and stream_end events to the hooks."""
+        if not self.hooks:
+            return self._rate_limited(request, messages)
+            
+        emit_event(self.hooks, "request_start", provider="openai", model=self.model_name)
+        start = time.perf_counter()
+        status = "error"
+        completion = None
+        try:
+            completion = self._rate_limited(request, messages)
+            status = "ok"
+            return completion
+        finally:
+            self._request_finished(start, completion, status)
+            
+    async def _atimed_request(self, request: Callable[[], Awaitable[Any]], messages: List[Dict[str, Any]]) -> Any:
+        """Async counterpart of _timed_request."""
+        if not self.hooks:
+            return await self._arate_limited(request, messages)
+            
+        emit_event(self.hooks, "request_start", provider="openai", model=self.model_name)
+        start = time.perf_counter()
+        status = "error"
+        completion = None
+        try:
+            completion = await self._arate_limited(request, messages)
+            status = "ok"
+            return completion
+        finally:
+            self._request_finished(start, completion, status)
+            
+    def _reconcile(self, reservation: Optional[Dict[str, Any]], completion: Any) -> None:
+        usage = getattr(completion, "usage", None)
+        if usage is not None:
+            self.rate_limiter.reconcile(reservation, getattr(usage, "total_tokens", 0) or 0)
+            
+    def _rate_limited(self, request: Callable[[], Any], messages: Optional[List[Dict[str, Any]]] = None) -> Any:
+        """Run an API call once the rate limiter has capacity, then correct the reservation from usage."""
+        if not self.rate_limiter.is_limited(self.model_name):
+            return request()
+            
+        reservation = self.rate_limiter.acquire(self.model_name, self.rate_limiter.estimate_tokens(self.messages if messages is None else messages))
+        completion = request()
+        self._reconcile(reservation, completion)
+        return completion
+        
+    async def _arate_limited(self, request: Callable[[], Awaitable[Any]], messages: List[Dict[str, Any]]) -> Any:
+        """Async counterpart of _rate_limited; waiting for capacity does not block the event loop."""
+        if not self.rate_limiter.is_limited(self.model_name):
+            return await request()
+            
+        tokens = self.rate_limiter.estimate_tokens(messages)
+        reservation = await asyncio.to_thread(self.rate_limiter.acquire, self.model_name, tokens)
+        completion = await request()
+        self._reconcile(reservation, completion)
+        return completion
         
     def add_message(self, role: str, content: str) -> None:
         """Add a message to the conversation history."""
@@ -17,11 +157,11 @@ class OpenAIChatInterface:
         
     def get_completion(self) -> Any:
         """Get a completion from the OpenAI API and save it to the messages list."""
-        completion = self.client.chat.completions.create(
+        completion = self._timed_request(lambda: self.client.chat.completions.create(
             model=self.model_name,
             messages=self.messages,
             temperature=self.temperature,
-        )
+        ))
         assistant_message = completion.choices[0].message
         
         # Save the assistant's response to the messages list
@@ -31,32 +171,96 @@ class OpenAIChatInterface:
         })
         
         return assistant_message
-    
+        
     def enable_structured_output(self, schema: Type[BaseModel]) -> None:
         """Enable structured output using a Pydantic model."""
         self.schema_class = schema
-        self.response_format = {"type": "json_schema", "schema": schema}
-    
-    def parse_structured_output(self, schema: Optional[Type[BaseModel]] = None) -> Any:
-        """Send messages and parse the response using the provided schema."""
+        self.response_format = structured_response_format(schema)
+        
+    def _resolve_schema(self, schema: Optional[Type[BaseModel]]) -> Type[BaseModel]:
         # Use the provided schema or fall back to the previously set schema
         if schema is not None:
             self.enable_structured_output(schema)
         elif self.schema_class is None:
             raise ValueError("No schema provided. Call enable_structured_output first or provide a schema.")
-            
-        completion = self.client.beta.chat.completions.parse(
-            model=self.model_name,
-            messages=self.messages,
-            response_format=self.schema_class,
-            temperature=self.temperature,
-        )
+        return self.schema_class
         
-        # Save the assistant's response to the messages list
-        parsed_response = completion.choices[0].message.parsed
+    def _structured_params(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "messages": messages,
+            "response_format": self.response_format,
+            "temperature": self.temperature,
+        }
+        
+    @staticmethod
+    def _parse_completion(completion: Any, schema: Type[BaseModel]) -> Any:
+        """Validate a completion against the schema (None if the model refused)."""
+        message = completion.choices[0].message
+        if getattr(message, "refusal", None) or not message.content:
+            return None
+        return schema.model_validate_json(message.content)
+        
+    def _save_parsed(self, completion: Any, parsed: Any) -> None:
+        # Compact JSON keeps the history small and readable by the model on later turns
+        message = completion.choices[0].message
         self.messages.append({
             "role": "assistant",
-            "content": str(parsed_response)  # Convert the parsed object to string for message history
+            "content": parsed.model_dump_json() if parsed is not None else (getattr(message, "refusal", None) or message.content or "")
         })
         
+    def parse_structured_output(self, schema: Optional[Type[BaseModel]] = None) -> Any:
+        """Send messages and parse the response using the provided schema."""
+        schema_class = self._resolve_schema(schema)
+        params = self._structured_params(self.messages)
+        completion = self._timed_request(lambda: self.client.chat.completions.create(**params))
+        
+        # Save the assistant's response to the messages list
+        parsed_response = self._parse_completion(completion, schema_class)
+        self._save_parsed(completion, parsed_response)
+        return parsed_response
+        
+    async def aparse_structured_output(self, schema: Optional[Type[BaseModel]] = None) -> Any:
+        """Async version of parse_structured_output."""
+        schema_class = self._resolve_schema(schema)
+        params = self._structured_params(self.messages)
+        completion = await self._atimed_request(lambda: self.async_client.chat.completions.create(**params), self.messages)
+        
+        parsed_response = self._parse_completion(completion, schema_class)
+        self._save_parsed(completion, parsed_response)
         return parsed_response
+        
+    def _parse_one(self, messages: List[Dict[str, Any]], schema_class: Type[BaseModel]) -> Any:
+        params = self._structured_params(messages)
+        completion = self._timed_request(lambda: self.client.chat.completions.create(**params), messages)
+        return self._parse_completion(completion, schema_class)
+        
+    def parse_many(self, message_lists: List[List[Dict[str, Any]]], schema: Optional[Type[BaseModel]] = None, max_concurrency: int = 8) -> List[Any]:
+        """Extract structured output from many independent conversations concurrently.
+        
+        Args:
+            message_lists: One message list per extraction; the lists are not modified
+            schema: Pydantic model for every response (defaults to the enabled schema)
+            max_concurrency: Maximum requests in flight
+            
+        Returns:
+            Parsed responses in the order of message_lists (None where the model refused)
+        """
+        schema_class = self._resolve_schema(schema)
+        if not message_lists:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(message_lists))) as executor:
+            return list(executor.map(lambda messages: self._parse_one(messages, schema_class), message_lists))
+            
+    async def aparse_many(self, message_lists: List[List[Dict[str, Any]]], schema: Optional[Type[BaseModel]] = None, max_concurrency: int = 8) -> List[Any]:
+        """Async version of parse_many, using the async client on the running event loop."""
+        schema_class = self._resolve_schema(schema)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def parse_one(messages: List[Dict[str, Any]]) -> Any:
+            params = self._structured_params(messages)
+            async with semaphore:
+                completion = await self._atimed_request(lambda: self.async_client.chat.completions.create(**params), messages)
+            return self._parse_completion(completion, schema_class)
+            
+        return await asyncio.gather(*(parse_one(messages) for messages in message_lists))
@@ -0,0 +1,93 @@
+import pytest
+from augmented_llm.batch import LocalBatchBackend
+from augmented_llm.llm import AugmentedLLM
+from augmented_llm.providers import LLMProvider
+
+ECHO_SCHEMA = {"text": {"type": "string", "description": "Text to echo", "required": True}}
+
+def make_session(provider):
+    llm = AugmentedLLM("You are a batch assistant.", provider, client=object(), debug_tokens=True)
+    llm.add_tool("echo", "Echo the text back", ECHO_SCHEMA, handler=lambda text: text)
+    return llm
+
+def request_params(provider, request):
+    return request["params"] if provider == LLMProvider.ANTHROPIC else request["body"]
+
+def prompt_of(provider, request):
+    return request_params(provider, request)["messages"][-1]["content"]
+
+def answer(provider, request, text, input_tokens=7, output_tokens=3):
+    if provider == LLMProvider.ANTHROPIC:
+        return {
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens}
+        }
+    return {
+        "choices": [{"message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": input_tokens, "completion_tokens": output_tokens}
+    }
+
+@pytest.mark.parametrize("provider", list(LLMProvider))
+def test_results_keep_request_order_and_errored_entries(provider):
+    def respond(request):
+        prompt = prompt_of(provider, request)
+        if prompt == "fail":
+            raise RuntimeError("model overloaded")
+        return answer(provider, request, prompt.upper())
+
+    llm = make_session(provider)
+    results = llm.generate_batch(["one", "fail", "three"], backend=LocalBatchBackend(provider, respond), poll_interval=0)
+
+    assert [result["prompt"] for result in results] == ["one", "fail", "three"]
+    assert [result["status"] for result in results] == ["succeeded", "errored", "succeeded"]
+    assert [result["response"] for result in results] == ["ONE", "", "THREE"]
+    assert "model overloaded" in results[1]["error"]
+    assert llm.messages == []
+
+@pytest.mark.parametrize("provider", list(LLMProvider))
+def test_requests_carry_system_prompt_and_tools(provider):
+    seen = []
+    def respond(request):
+        seen.append(request)
+        return answer(provider, request, "ok")
+
+    llm = make_session(provider)
+    llm.generate_batch(["a", "b"], backend=LocalBatchBackend(provider, respond), poll_interval=0)
+
+    assert [request["custom_id"] for request in seen] == ["request-0", "request-1"]
+    for request in seen:
+        params = request_params(provider, request)
+        assert "stream" not in params
+        if provider == LLMProvider.ANTHROPIC:
+            assert params["system"].startswith("You are a batch assistant.")
+            assert [tool["name"] for tool in params["tools"]] == ["echo"]
+        else:
+            assert params["messages"][0]["content"].startswith("You are a batch assistant.")
+            assert [tool["function"]["name"] for tool in params["tools"]] == ["echo"]
+
+@pytest.mark.parametrize("provider", list(LLMProvider))
+def test_succeeded_usage_is_logged_to_token_debugger(provider):
+    llm = make_session(provider)
+    before = (llm.token_debugger.total_input_tokens, llm.token_debugger.total_output_tokens)
+    respond = lambda request: answer(provider, request, "ok", input_tokens=7, output_tokens=3)
+    results = llm.generate_batch(["a", "b"], backend=LocalBatchBackend(provider, respond), poll_interval=0)
+
+    assert [result["usage"]["input_tokens"] for result in results] == [7, 7]
+    assert llm.token_debugger.total_input_tokens - before[0] == 14
+    assert llm.token_debugger.total_output_tokens - before[1] == 6
+
+def test_tool_calls_are_returned_not_executed():
+    calls = []
+    llm = AugmentedLLM("You are a batch assistant.", "anthropic", client=object())
+    llm.add_tool("echo", "Echo the text back", ECHO_SCHEMA, handler=lambda text: calls.append(text))
+    respond = lambda request: {
+        "content": [{"type": "tool_use", "id": "toolu_1", "name": "echo", "input": {"text": "hi"}}],
+        "stop_reason": "tool_use",
+        "usage": {"input_tokens": 5, "output_tokens": 2}
+    }
+    results = llm.generate_batch(["a"], backend=LocalBatchBackend(LLMProvider.ANTHROPIC, respond), poll_interval=0)
+
+    assert results[0]["tool_calls"] == [{"id": "toolu_1", "name": "echo", "input": {"text": "hi"}}]
+    assert results[0]["stop_reason"] == "tool_use"
+    assert calls == []
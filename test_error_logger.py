@@ -0,0 +1,83 @@
+import json
+import os
+import subprocess
+import sys
+from augmented_llm.error_logger import ToolErrorLogger, error_fingerprint, truncate_context
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def lookup(key, error_type=KeyError):
+    raise error_type(key)
+
+def caught(key, error_type=KeyError):
+    try:
+        lookup(key, error_type)
+    except Exception as e:
+        return e
+
+def test_fingerprint_ignores_message_but_not_type_or_tool():
+    assert error_fingerprint("lookup", caught("a")) == error_fingerprint("lookup", caught("b"))
+    assert error_fingerprint("lookup", caught("a")) != error_fingerprint("lookup", caught("a", ValueError))
+    assert error_fingerprint("lookup", caught("a")) != error_fingerprint("search", caught("a"))
+
+def test_repeats_only_increment_the_counter(tmp_path):
+    log_dir = str(tmp_path / "tool_errors")
+    logger = ToolErrorLogger(log_dir)
+    context = {"messages": [{"role": "user", "content": "first"}]}
+    first = logger.log_error("lookup", {"key": "a"}, caught("a"), "anthropic", context)
+    context["messages"].append({"role": "user", "content": "second"})
+    for key in "bcd":
+        assert logger.log_error("lookup", {"key": key}, caught(key), "anthropic", context) == first
+    logger.log_error("lookup", {"key": "e"}, caught("e", ValueError), "anthropic")
+    logger.close()
+
+    samples = sorted(name for name in os.listdir(log_dir) if name != "index.json")
+    assert len(samples) == 2
+    with open(first) as f:
+        sample = json.load(f)
+    # The first occurrence is the one kept, with its history as it was then
+    assert sample["tool_input"] == {"key": "a"}
+    assert sample["context"]["messages"] == [{"role": "user", "content": "first"}]
+    assert sample["error"]["type"] == "KeyError"
+
+    with open(os.path.join(log_dir, "index.json")) as f:
+        index = json.load(f)
+    assert sorted(entry["count"] for entry in index.values()) == [1, 4]
+
+    # Counters survive a restart and a known failure writes no new sample
+    os.remove(first)
+    restarted = ToolErrorLogger(log_dir)
+    restarted.log_error("lookup", {"key": "f"}, caught("f"), "anthropic")
+    restarted.close()
+    assert not os.path.exists(first)
+    assert restarted.summary()[0]["count"] == 5
+
+def test_context_keeps_most_recent_messages_within_budget():
+    messages = [{"role": "user", "content": f"message {n} " + "x" * 100} for n in range(10)]
+    truncated = truncate_context({"messages": messages, "model": "gpt-4o"}, max_chars=500)
+    assert truncated["messages"] == messages[-len(truncated["messages"]):]
+    assert 0 < len(truncated["messages"]) < 10
+    assert truncated["messages_truncated"] == 10 - len(truncated["messages"])
+    assert len(json.dumps(truncated)) <= 550
+
+def test_cli_generates_one_test_per_fingerprint(tmp_path):
+    log_dir = str(tmp_path / "tool_errors")
+    output = str(tmp_path / "generated")
+    logger = ToolErrorLogger(log_dir)
+    for key in "ab":
+        logger.log_error("lookup", {"key": key}, caught(key), "openai")
+    logger.log_error("lookup", {"key": "c"}, caught("c", ValueError), "openai")
+    logger.close()
+
+    completed = subprocess.run(
+        [sys.executable, "-m", "augmented_llm.error_logger", "--log-dir", log_dir, "--output", output],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    assert f"Generated 2 test file(s) in {output}" in completed.stdout
+    generated = sorted(os.listdir(output))
+    assert len(generated) == 2
+    for name in generated:
+        with open(os.path.join(output, name)) as f:
+            source = f.read()
+        compile(source, name, "exec")
+        assert "provider=LLMProvider.OPENAI" in source
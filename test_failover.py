@@ -0,0 +1,142 @@
+import threading
+import time
+import pytest
+from augmented_llm import llm as llm_module
+from augmented_llm.llm import AugmentedLLM
+from augmented_llm.message_translation import translate_messages
+from augmented_llm.providers import LLMProvider
+from augmented_llm.rate_limiter import RateLimiter, LocalBucketStore
+from augmented_llm.session_journal import SessionJournal, read_journal
+from augmented_llm.stream_events import TextDelta
+
+HISTORY = [
+    {"role": "user", "content": "Who succeeded Edward VI?"},
+    {"role": "assistant", "content": [
+        {"type": "text", "text": "Let me check."},
+        {"type": "tool_use", "id": "toolu_1", "name": "lookup", "input": {"name": "Edward VI"}},
+        {"type": "tool_use", "id": "toolu_2", "name": "lookup", "input": {"name": "Mary I"}}
+    ]},
+    {"role": "user", "content": [
+        {"type": "tool_result", "tool_use_id": "toolu_1", "content": "died 1553"},
+        {"type": "tool_result", "tool_use_id": "toolu_2", "content": "crowned 1553"}
+    ]},
+    {"role": "assistant", "content": [{"type": "text", "text": "Mary I."}]}
+]
+
+@pytest.fixture
+def session(monkeypatch):
+    """Build an Anthropic session whose OpenAI fallback uses the given client."""
+    def build(primary, fallback, **kwargs):
+        monkeypatch.setenv("OPENAI_API_KEY", "test")
+        monkeypatch.setattr(llm_module, "get_client", lambda provider: fallback)
+        llm = AugmentedLLM("You are a helpful assistant.", "anthropic", client=primary, fallback_provider="openai", **kwargs)
+        llm.events = []
+        llm.add_hook(llm.events.append)
+        return llm
+    return build
+
+def reply(llm, message):
+    return "".join(event.text for event in llm.generate_events(message) if isinstance(event, TextDelta))
+
+def failovers(llm):
+    return [(event["from_provider"], event["to_provider"], event["reason"]) for event in llm.events if event["event"] == "failover"]
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_slow_first_token_fails_over(session, fake_client):
+    primary = fake_client([fake_client.delayed(fake_client.anthropic_text("too late"), before=0.5)])
+    fallback = fake_client([fake_client.openai_text("from openai")])
+    llm = session(primary, fallback, failover_ttft=0.05)
+
+    assert reply(llm, "hi") == "from openai"
+    assert llm.provider == LLMProvider.OPENAI
+    assert failovers(llm) == [("anthropic", "openai", "slow_first_token")]
+    assert fallback.requests[0]["messages"][-1] == {"role": "user", "content": "hi"}
+
+def test_fast_primary_is_kept(session, fake_client):
+    primary = fake_client([fake_client.anthropic_text("from anthropic")])
+    fallback = fake_client([])
+    llm = session(primary, fallback, failover_ttft=1.0)
+
+    assert reply(llm, "hi") == "from anthropic"
+    assert llm.provider == LLMProvider.ANTHROPIC
+    assert failovers(llm) == [] and fallback.requests == []
+
+def test_failover_history_replays_from_journal_once(session, fake_client, tmp_path, monkeypatch):
+    primary = fake_client([RuntimeError("overloaded")])
+    fallback = fake_client([fake_client.openai_text("Elizabeth I.")])
+    llm = session(primary, fallback, failover_ttft=1.0)
+    llm.messages = [dict(message) for message in HISTORY]
+    llm.journal = SessionJournal(str(tmp_path / "journal"))
+
+    # Hold the writer until the turn has finished, so the switch record is
+    # serialized after the fallback's reply was appended to the history
+    gate = threading.Event()
+    write = SessionJournal._write
+    monkeypatch.setattr(SessionJournal, "_write", lambda journal, record: (gate.wait(), write(journal, record)))
+
+    assert reply(llm, "And after her?") == "Elizabeth I."
+    assert failovers(llm) == [("anthropic", "openai", "error")]
+    gate.set()
+    llm.journal.close()
+
+    replayed = read_journal(str(tmp_path / "journal"), llm.session_id)[llm.session_id]
+    assert replayed["provider"] == "openai"
+    assert replayed["messages"] == llm.messages
+    assert [m["content"] for m in replayed["messages"]].count("Elizabeth I.") == 1
+
+def test_race_keeps_first_content(session, fake_client):
+    primary = fake_client([fake_client.delayed(fake_client.anthropic_text("slow"), before=0.3)])
+    fallback = fake_client([fake_client.openai_text("fast")])
+    llm = session(primary, fallback, race_providers=True)
+
+    assert reply(llm, "hi") == "fast"
+    assert llm.provider == LLMProvider.OPENAI
+    assert failovers(llm) == [("anthropic", "openai", "race")]
+
+def test_race_survives_one_failing_provider(session, fake_client):
+    primary = fake_client([fake_client.delayed(fake_client.anthropic_text("from anthropic"), before=0.05)])
+    fallback = fake_client([RuntimeError("overloaded")])
+    llm = session(primary, fallback, race_providers=True)
+
+    assert reply(llm, "hi") == "from anthropic"
+    assert llm.provider == LLMProvider.ANTHROPIC
+
+@pytest.mark.parametrize("mode", [{"race_providers": True}, {"failover_ttft": 0.05}])
+def test_abandoned_stream_returns_its_reservation(session, fake_client, mode):
+    tpm, max_tokens = 6000, 4000
+    limiter = RateLimiter({"claude": {"tpm": tpm}, "gpt": {"tpm": tpm}}, store=LocalBucketStore())
+    primary = fake_client([fake_client.delayed(fake_client.anthropic_text("slow"), before=0.3)])
+    fallback = fake_client([fake_client.openai_text("fast")])
+    llm = session(primary, fallback, rate_limiter=limiter, max_tokens=max_tokens, **mode)
+
+    assert reply(llm, "hi") == "fast"
+    # The abandoned Anthropic stream releases its reservation once its thread stops
+    assert wait_until(lambda: not llm._reservations)
+    level = limiter.store._state["claude:tokens"][0]
+    assert tpm - max_tokens / 2 < level <= tpm
+
+def test_failed_request_returns_its_reservation(session, fake_client):
+    limiter = RateLimiter({"claude": {"tpm": 6000}}, store=LocalBucketStore())
+    llm = session(fake_client([RuntimeError("overloaded")]), fake_client([fake_client.openai_text("ok")]),
+                  rate_limiter=limiter, max_tokens=4000, failover_ttft=1.0)
+
+    assert reply(llm, "hi") == "ok"
+    assert wait_until(lambda: not llm._reservations)
+    assert limiter.store._state["claude:tokens"][0] > 4000
+
+def test_translate_anthropic_history_round_trip():
+    openai_messages = translate_messages(HISTORY, LLMProvider.ANTHROPIC, LLMProvider.OPENAI)
+    assert [m["role"] for m in openai_messages] == ["user", "assistant", "tool", "tool", "assistant"]
+    assert [call["id"] for call in openai_messages[1]["tool_calls"]] == ["toolu_1", "toolu_2"]
+    assert translate_messages(openai_messages, LLMProvider.OPENAI, LLMProvider.ANTHROPIC) == HISTORY
+
+def test_translate_openai_history_round_trip():
+    openai_messages = translate_messages(HISTORY, LLMProvider.ANTHROPIC, LLMProvider.OPENAI)
+    anthropic_messages = translate_messages(openai_messages, LLMProvider.OPENAI, LLMProvider.ANTHROPIC)
+    assert translate_messages(anthropic_messages, LLMProvider.ANTHROPIC, LLMProvider.OPENAI) == openai_messages
+    assert translate_messages(HISTORY, LLMProvider.ANTHROPIC, LLMProvider.ANTHROPIC) is HISTORY
@@ -0,0 +1,214 @@
+import random
+from functools import lru_cache
+import pytest
+from graph_retriever import EntityIndex, NeighborhoodCache, GraphRetriever, edit_distance, tokenize
+
+SYLLABLES = ["al", "dric", "ven", "moor", "el", "iza", "beth", "hen", "ry", "tu", "dor", "ce", "cil",
+             "wal", "sing", "ham", "an", "ne", "bo", "leyn", "ed", "ward", "jo", "i", "x"]
+
+@lru_cache(maxsize=None)
+def osa_distance(a, b):
+    """Unbounded optimal string alignment distance."""
+    d = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i in range(len(a) + 1):
+        d[i][0] = i
+    for j in range(len(b) + 1):
+        d[0][j] = j
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[len(a)][len(b)]
+
+def brute_force_search(entities, text, limit=None, max_edits=2):
+    """Rank every entity whose words cover each query word within the allowed edits."""
+    query_words = list(dict.fromkeys(tokenize(text)))
+    if not query_words:
+        return []
+    scored = []
+    for entity_id, name in entities.items():
+        words = set(tokenize(entity_id) + tokenize(name))
+        total = 0
+        for query_word in query_words:
+            edits = min(max_edits, max(len(query_word) - 1, 0))
+            best = min(osa_distance(query_word, word) for word in words)
+            if best > edits:
+                break
+            total += best
+        else:
+            scored.append((total, len(words), entity_id))
+    return [entity_id for _, _, entity_id in sorted(scored)[:limit]]
+
+def misspell(word, rng):
+    i = rng.randrange(len(word))
+    op = rng.choice(["sub", "ins", "del", "swap", "none"])
+    if op == "sub":
+        return word[:i] + rng.choice("abcdehilnorstwy") + word[i + 1:]
+    if op == "ins":
+        return word[:i] + rng.choice("abcdehilnorstwy") + word[i:]
+    if op == "del" and len(word) > 1:
+        return word[:i] + word[i + 1:]
+    if op == "swap" and i + 1 < len(word):
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word
+
+@pytest.fixture(scope="module")
+def corpus():
+    rng = random.Random(7)
+    words = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3))) for _ in range(80)]
+    entities = {}
+    while len(entities) < 300:
+        name = " ".join(rng.choice(words) for _ in range(rng.randint(1, 3)))
+        entities[name.title().replace(" ", "_")] = name
+    queries = []
+    for name in rng.sample(sorted(entities.values()), 100):
+        name_words = name.split()
+        picked = rng.sample(name_words, rng.randint(1, len(name_words)))
+        queries.append(" ".join(misspell(word, rng) for word in picked))
+    return entities, queries
+
+def test_edit_distance_matches_reference_within_bound(corpus):
+    _, queries = corpus
+    words = [word for query in queries for word in query.split()]
+    for a, b in zip(words, reversed(words)):
+        expected = osa_distance(a, b)
+        assert edit_distance(a, b) == (expected if expected <= 2 else 3)
+
+def test_search_matches_brute_force(corpus):
+    entities, queries = corpus
+    index = EntityIndex()
+    for entity_id, name in entities.items():
+        index.add_entity(entity_id, name)
+    for query in queries:
+        expected = brute_force_search(entities, query)
+        for limit in (1, 2, 5, len(entities)):
+            assert index.search(query, limit=limit) == expected[:limit], (query, limit)
+
+def test_entity_matching_at_several_distances_is_counted_once():
+    index = EntityIndex()
+    index.add_entity("A", "henry henri")
+    index.add_entity("B", "henrxx")
+    assert index.search("henry", limit=2) == ["A", "B"]
+
+def test_search_follows_updates_and_removals():
+    index = EntityIndex.from_kg_dict({"nodes": [{"id": "Elizabeth_I", "name": "Elizabeth I"}, {"id": "Henry_VIII"}]})
+    assert index.search("Elizabth") == ["Elizabeth_I"]
+    index.add_entity("Elizabeth_I", "Gloriana")
+    assert index.search("Elizabth") == []
+    assert index.search("Glorianna") == ["Elizabeth_I"]
+    index.remove_entity("Henry_VIII")
+    assert index.search("Henry") == []
+    assert len(index) == 1
+
+class FakeGraph:
+    """Answers the cache's Cypher queries from an in-memory relationship list."""
+
+    def __init__(self, relationships):
+        self.relationships = list(relationships)
+        self.queries = []
+
+    def degree(self, node):
+        return sum(node in (source, target) for source, _, target in self.relationships)
+
+    def query(self, cypher, params):
+        self.queries.append(params)
+        if "ORDER BY degree" in cypher:
+            nodes = {node for source, _, target in self.relationships for node in (source, target)}
+            ranked = sorted(nodes, key=lambda node: (-self.degree(node), node))
+            return [{"id": node} for node in ranked[:params["top"]]]
+        rows = []
+        for entity_id in params["ids"]:
+            entity_rows = []
+            for source, rel_type, target in self.relationships:
+                if entity_id in (source, target):
+                    neighbor = target if source == entity_id else source
+                    entity_rows.append({"neighbor": neighbor, "output": f"{source} - {rel_type} -> {target}"})
+            if entity_rows:
+                rows.append({"entity_id": entity_id, "rows": entity_rows[:params["limit"]]})
+        return rows
+
+@pytest.fixture
+def graph():
+    return FakeGraph([
+        ("Elizabeth_I", "CHILD_OF", "Henry_VIII"),
+        ("Elizabeth_I", "CHILD_OF", "Anne_Boleyn"),
+        ("Henry_VIII", "MARRIED", "Anne_Boleyn"),
+        ("Edward_VI", "CHILD_OF", "Henry_VIII"),
+        ("William_Cecil", "ADVISED", "Elizabeth_I"),
+    ])
+
+def test_cache_serves_repeated_lookups(graph):
+    cache = NeighborhoodCache(graph)
+    lines = cache.get("Edward_VI")
+    assert lines == ["Edward_VI - CHILD_OF -> Henry_VIII"]
+    assert cache.get("Edward_VI") == lines
+    assert len(graph.queries) == 1
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+def test_unknown_ids_are_cached_empty(graph):
+    cache = NeighborhoodCache(graph)
+    assert cache.get("Mary_I") == []
+    assert cache.get("Mary_I") == []
+    assert len(graph.queries) == 1
+
+def test_invalidate_drops_entity_and_its_neighbors(graph):
+    cache = NeighborhoodCache(graph)
+    cache.get_many(["Elizabeth_I", "Edward_VI", "William_Cecil", "Anne_Boleyn"])
+    # Edward_VI and Anne_Boleyn list Henry_VIII as a neighbor; Elizabeth_I does too
+    assert cache.invalidate(["Henry_VIII"]) == 3
+    assert "William_Cecil" in cache._entries and len(cache) == 1
+
+    graph.relationships.append(("Edward_VI", "SUCCEEDED", "Henry_VIII"))
+    assert len(cache.get("Edward_VI")) == 2
+
+def test_invalidate_kg_dict_uses_relationship_endpoints(graph):
+    cache = NeighborhoodCache(graph)
+    cache.get_many(["Edward_VI", "William_Cecil"])
+    removed = cache.invalidate_kg_dict({
+        "nodes": [],
+        "relationships": [{"source": "William_Cecil", "target": "Robert_Cecil", "type": "FATHER_OF"}]
+    })
+    assert removed == 1
+    assert list(cache._entries) == ["Edward_VI"]
+    assert cache.invalidate() == 1
+    assert len(cache) == 0
+
+def test_fetch_racing_an_invalidation_is_not_stored(graph):
+    cache = NeighborhoodCache(graph)
+    original_query = graph.query
+
+    def query_then_invalidate(cypher, params):
+        rows = original_query(cypher, params)
+        cache.invalidate(["Edward_VI"])
+        return rows
+
+    graph.query = query_then_invalidate
+    assert cache.get("Edward_VI") == ["Edward_VI - CHILD_OF -> Henry_VIII"]
+    assert len(cache) == 0
+
+def test_precompute_keeps_highest_degree_entities_within_capacity(graph):
+    cache = NeighborhoodCache(graph, max_entries=2)
+    assert cache.precompute(top=10) == 2
+    # Elizabeth_I and Henry_VIII have degree 3, ahead of Anne_Boleyn's 2
+    assert set(cache._entries) == {"Elizabeth_I", "Henry_VIII"}
+    assert cache.get_stats()["precomputed"] == 2
+
+def test_precompute_evicts_lowest_degree_first_under_byte_limit(graph):
+    probe = NeighborhoodCache(graph)
+    probe.precompute(top=3)
+    entry_bytes = max(size for _, _, size in probe._entries.values())
+
+    cache = NeighborhoodCache(graph, max_bytes=2 * entry_bytes)
+    resident = cache.precompute(top=3)
+    assert resident == len(cache) >= 1
+    assert "Anne_Boleyn" not in cache._entries
+    assert cache.get_stats()["precomputed"] == resident
+
+def test_retriever_joins_cached_neighborhoods(graph):
+    index = EntityIndex.from_kg_dict({"nodes": [{"id": "Edward_VI", "name": "Edward VI"}, {"id": "William_Cecil"}]})
+    retriever = GraphRetriever(graph, index, neighborhood_cache=NeighborhoodCache(graph))
+    assert retriever.retrieve("Edwrd") == "Edward_VI - CHILD_OF -> Henry_VIII"
+    assert retriever.retrieve("Edwrd") == "Edward_VI - CHILD_OF -> Henry_VIII"
+    assert len(graph.queries) == 1
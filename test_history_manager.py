@@ -0,0 +1,97 @@
+import pytest
+from augmented_llm.history_manager import HistoryManager
+from augmented_llm.providers import LLMProvider
+
+OUTPUT = "row " * 250
+
+def anthropic_turn(n):
+    return [
+        {"role": "user", "content": f"question {n}"},
+        {"role": "assistant", "content": [{"type": "tool_use", "id": f"toolu_{n}", "name": "search", "input": {"n": n}}]},
+        {"role": "user", "content": [{"type": "tool_result", "tool_use_id": f"toolu_{n}", "content": OUTPUT}]},
+        {"role": "assistant", "content": [{"type": "text", "text": f"answer {n}"}]}
+    ]
+
+def openai_turn(n):
+    return [
+        {"role": "user", "content": f"question {n}"},
+        {"role": "assistant", "content": None, "tool_calls": [
+            {"id": f"call_{n}", "type": "function", "function": {"name": "search", "arguments": f'{{"n": {n}}}'}}
+        ]},
+        {"role": "tool", "tool_call_id": f"call_{n}", "content": OUTPUT},
+        {"role": "assistant", "content": f"answer {n}"}
+    ]
+
+TURNS = {LLMProvider.ANTHROPIC: anthropic_turn, LLMProvider.OPENAI: openai_turn}
+
+def history(provider, turns=5):
+    return [message for n in range(turns) for message in TURNS[provider](n)]
+
+def call_and_result_ids(messages):
+    calls, results = [], []
+    for message in messages:
+        if message.get("tool_calls"):
+            calls += [call["id"] for call in message["tool_calls"]]
+        if message["role"] == "tool":
+            results.append(message["tool_call_id"])
+        if isinstance(message.get("content"), list):
+            calls += [block["id"] for block in message["content"] if block["type"] == "tool_use"]
+            results += [block["tool_use_id"] for block in message["content"] if block["type"] == "tool_result"]
+    return calls, results
+
+def manager(budget, **kwargs):
+    return HistoryManager(budget, keep_last_turns=2, summary_chars=50, token_counter=len, **kwargs)
+
+@pytest.mark.parametrize("provider", list(LLMProvider))
+def test_under_budget_history_is_returned_unchanged(provider):
+    messages = history(provider)
+    trimmed, report = manager(10 ** 6).trim(messages, provider)
+    assert trimmed is messages
+    assert report["tokens_saved"] == 0
+
+@pytest.mark.parametrize("provider", list(LLMProvider))
+def test_compression_stops_once_under_budget(provider):
+    messages = history(provider)
+    hm = manager(1)
+    total = hm.count_tokens(messages)
+    trimmed, report = manager(total - 100).trim(messages, provider)
+    assert report["compressed_tool_results"] == 1
+    assert report["dropped_tool_results"] == report["dropped_turns"] == 0
+    assert report["tokens_after"] <= total - 100
+    assert len(trimmed) == len(messages)
+
+@pytest.mark.parametrize("provider", list(LLMProvider))
+def test_drop_follows_compression_before_removing_turns(provider):
+    messages = history(provider)
+    hm = manager(1)
+    # Three older turns can be compressed; that alone does not fit the budget
+    compressed_total = hm.count_tokens(messages) - 3 * (len(OUTPUT) - len(hm._summarize(OUTPUT)))
+    trimmed, report = manager(compressed_total - 10).trim(messages, provider)
+    assert report["compressed_tool_results"] == 3
+    assert report["dropped_tool_results"] == 1
+    assert report["dropped_turns"] == 0
+
+@pytest.mark.parametrize("provider", list(LLMProvider))
+def test_whole_turns_are_removed_last_and_recent_turns_are_untouched(provider):
+    messages = history(provider)
+    recent = messages[-8:]
+    budget = manager(1).count_tokens(recent) + 60
+    trimmed, report = manager(budget).trim(messages, provider)
+
+    assert report["dropped_turns"] >= 1
+    assert report["tokens_after"] <= budget
+    assert trimmed[0] == {"role": "user", "content": f"question {report['dropped_turns']}"}
+    # The protected turns are the very same message objects
+    assert all(a is b for a, b in zip(trimmed[-8:], recent))
+    assert len(trimmed) == len(messages) - 4 * report["dropped_turns"]
+
+@pytest.mark.parametrize("provider", list(LLMProvider))
+@pytest.mark.parametrize("budget", [4000, 2500, 1500, 800, 1])
+def test_every_tool_call_keeps_its_result(provider, budget):
+    messages = history(provider)
+    trimmed, _ = manager(budget).trim(messages, provider)
+    calls, results = call_and_result_ids(trimmed)
+    assert calls == results
+    assert trimmed[0]["role"] == "user" and isinstance(trimmed[0]["content"], str)
+    # The protected turns survive even an impossible budget
+    assert trimmed[-8:] == messages[-8:]
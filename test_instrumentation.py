@@ -0,0 +1,63 @@
+import math
+from augmented_llm.instrumentation import MetricsAggregator, emit_event
+
+def stream_end(model, duration, status="ok"):
+    return {"event": "stream_end", "model": model, "duration": duration, "model_time": duration / 2,
+            "tool_time": duration / 4, "output_tokens": 100, "status": status}
+
+def test_nearest_rank_percentiles_over_rolling_window():
+    metrics = MetricsAggregator(window_size=100)
+    for n in range(1, 101):
+        metrics.observe("tool_duration_seconds", float(n), (("tool", "search"),))
+    assert metrics.percentile("tool_duration_seconds", 0.5) == 50.0
+    assert metrics.percentile("tool_duration_seconds", 0.9) == 90.0
+    assert metrics.percentile("tool_duration_seconds", 0.99) == 99.0
+    assert math.isnan(metrics.percentile("tool_duration_seconds", 0.5, tool="other"))
+
+    # Older observations leave the window but stay in sum and count
+    for _ in range(100):
+        metrics.observe("tool_duration_seconds", 1000.0, (("tool", "search"),))
+    assert metrics.percentile("tool_duration_seconds", 0.5, tool="search") == 1000.0
+    entry = metrics.get_summary()["metrics"]["tool_duration_seconds"][0]
+    assert entry["count"] == 200
+    assert entry["sum"] == sum(range(1, 101)) + 100 * 1000.0
+
+def test_percentile_filters_by_labels():
+    metrics = MetricsAggregator()
+    for duration in (1.0, 2.0, 3.0):
+        metrics(stream_end("gpt-4o", duration))
+    metrics(stream_end("claude-3-5-sonnet", 10.0))
+    assert metrics.percentile("request_duration_seconds", 0.5, model="gpt-4o") == 2.0
+    assert metrics.percentile("request_duration_seconds", 1.0) == 10.0
+    assert math.isnan(metrics.percentile("time_to_first_token_seconds", 0.5))
+
+def test_prometheus_text_export():
+    metrics = MetricsAggregator(quantiles=(0.5, 0.9))
+    hooks = [metrics]
+    emit_event(hooks, "request_start", model="gpt-4o")
+    emit_event(hooks, "first_token", model="gpt-4o", ttft=0.25)
+    emit_event(hooks, "tool_end", model="gpt-4o", tool='say "hi"', duration=0.5, status="error")
+    emit_event(hooks, "failover", model="gpt-4o", from_provider="anthropic", to_provider="openai", reason="rate_limit")
+    for event in (stream_end("gpt-4o", 2.0), stream_end("gpt-4o", 4.0, status="error")):
+        emit_event(hooks, event.pop("event"), **event)
+
+    lines = metrics.export_prometheus().splitlines()
+    assert "# HELP augmented_llm_time_to_first_token_seconds Time from request start to the first model token" in lines
+    assert "# TYPE augmented_llm_request_duration_seconds summary" in lines
+    assert 'augmented_llm_request_duration_seconds{model="gpt-4o",quantile="0.5"} 2.0' in lines
+    assert 'augmented_llm_request_duration_seconds{model="gpt-4o",quantile="0.9"} 4.0' in lines
+    assert 'augmented_llm_request_duration_seconds_sum{model="gpt-4o"} 6.0' in lines
+    assert 'augmented_llm_request_duration_seconds_count{model="gpt-4o"} 2' in lines
+    assert 'augmented_llm_output_tokens_per_second{model="gpt-4o",quantile="0.9"} 100.0' in lines
+    assert "# TYPE augmented_llm_requests_total counter" in lines
+    assert 'augmented_llm_requests_total{model="gpt-4o"} 1' in lines
+    assert 'augmented_llm_request_errors_total{model="gpt-4o"} 1' in lines
+    assert 'augmented_llm_tool_calls_total{tool="say \\"hi\\"",status="error"} 1' in lines
+    assert 'augmented_llm_failovers_total{from_provider="anthropic",to_provider="openai",reason="rate_limit"} 1' in lines
+
+def test_failing_hook_does_not_stop_other_hooks():
+    metrics = MetricsAggregator()
+    def broken(event):
+        raise RuntimeError("boom")
+    emit_event([broken, metrics], "request_start", model="gpt-4o")
+    assert metrics.get_summary()["counters"]["requests_total"][0]["value"] == 1
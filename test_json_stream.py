@@ -0,0 +1,61 @@
+import json
+import pytest
+from augmented_llm.json_stream import IncrementalJSONParser
+
+TOOL_INPUT = '{"query": "Elizabeth \\"I\\" {queen}", "path": "C:\\\\docs\\\\", "ids": [1, [2, 3]], "nested": {"a": "]}"}}'
+
+def feed_chunks(chunks):
+    parser = IncrementalJSONParser()
+    completed_at = None
+    for i, chunk in enumerate(chunks):
+        if parser.feed(chunk) and completed_at is None:
+            completed_at = i
+    return parser, completed_at
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, len(TOOL_INPUT)])
+def test_every_chunk_size_completes_on_last_chunk(size):
+    chunks = [TOOL_INPUT[i:i + size] for i in range(0, len(TOOL_INPUT), size)]
+    parser, completed_at = feed_chunks(chunks)
+    assert completed_at == len(chunks) - 1
+    assert parser.value() == json.loads(TOOL_INPUT)
+
+def test_every_split_point():
+    for split in range(1, len(TOOL_INPUT)):
+        parser, completed_at = feed_chunks([TOOL_INPUT[:split], TOOL_INPUT[split:]])
+        assert completed_at == 1, split
+        assert parser.value() == json.loads(TOOL_INPUT)
+
+def test_escape_at_end_of_chunk():
+    # The backslash ends the first chunk; the quote that follows is escaped
+    parser, completed_at = feed_chunks(['{"a": "x\\', '"}', '"}'])
+    assert completed_at == 2
+    assert parser.value() == {"a": 'x"}'}
+
+def test_escaped_backslash_before_quote_across_chunks():
+    parser, completed_at = feed_chunks(['{"a": "x\\', '\\', '"}'])
+    assert completed_at == 2
+    assert parser.value() == {"a": "x\\"}
+
+def test_leading_whitespace_and_empty_chunks():
+    parser, completed_at = feed_chunks(["", "  ", "\n[1,", "", " 2]"])
+    assert completed_at == 4
+    assert parser.value() == [1, 2]
+
+def test_incomplete_value_raises():
+    parser, completed_at = feed_chunks(['{"a": [1, 2'])
+    assert completed_at is None
+    assert not parser.complete
+    with pytest.raises(ValueError):
+        parser.value()
+
+def test_input_after_completion_is_ignored():
+    parser, _ = feed_chunks(['{"a": 1}', '{"b": 2}'])
+    assert parser.text == '{"a": 1}'
+    assert parser.value() == {"a": 1}
+
+def test_close_decodes_scalars_and_empty_input():
+    parser = IncrementalJSONParser()
+    assert not parser.feed("4")
+    assert not parser.feed("2")
+    assert parser.close() == 42
+    assert IncrementalJSONParser().close(default={}) == {}
@@ -0,0 +1,148 @@
+import threading
+import time
+import pytest
+from augmented_llm.llm import AugmentedLLM
+from augmented_llm.stream_events import TextDelta, ToolIterationLimit
+
+TEXT_SCHEMA = {"text": {"type": "string", "description": "Input text", "required": True}}
+
+def upper(text):
+    return text.upper()
+
+def reply(llm, message):
+    return "".join(event.text for event in llm.generate_events(message) if isinstance(event, TextDelta))
+
+def test_early_dispatch_overlaps_tools_with_stream_and_keeps_order(fake_client):
+    timeline = {}
+    def streamed(events):
+        for event in events:
+            time.sleep(0.02)
+            timeline["last_event"] = time.perf_counter()
+            yield event
+
+    def slow(text):
+        timeline.setdefault("first_tool_start", time.perf_counter())
+        time.sleep(0.3)
+        return f"slow {text}"
+
+    def fast(text):
+        return f"fast {text}"
+
+    tool_turn = fake_client.anthropic_tool_use([("toolu_a", "slow", {"text": "a"}), ("toolu_b", "fast", {"text": "b"})])
+    client = fake_client([lambda: streamed(tool_turn), fake_client.anthropic_text("done")])
+    llm = AugmentedLLM("You are a helpful assistant.", "anthropic", client=client, early_tool_dispatch=True, debug_tokens=True)
+    llm.add_tool("slow", "Slow tool", TEXT_SCHEMA, handler=slow)
+    llm.add_tool("fast", "Fast tool", TEXT_SCHEMA, handler=fast)
+
+    recording_threads = set()
+    log_message = llm.token_debugger.log_message
+    def recording_log_message(*args, **kwargs):
+        recording_threads.add(threading.current_thread())
+        return log_message(*args, **kwargs)
+    llm.token_debugger.log_message = recording_log_message
+    llm.add_hook(lambda payload: recording_threads.add(threading.current_thread()))
+
+    assert reply(llm, "go") == "done"
+
+    # The slow tool started while the rest of the turn was still streaming
+    assert timeline["first_tool_start"] < timeline["last_event"]
+    results = llm.messages[2]["content"]
+    assert [block["tool_use_id"] for block in results] == ["toolu_a", "toolu_b"]
+    assert [block["content"] for block in results] == ["slow a", "fast b"]
+    assert recording_threads == {threading.current_thread()}
+    assert llm.token_debugger.tool_call_count == 2
+
+def test_multi_round_tool_use(fake_client):
+    client = fake_client([
+        fake_client.anthropic_tool_use([("toolu_1", "upper", {"text": "a"})], text="Step one."),
+        fake_client.anthropic_tool_use([("toolu_2", "upper", {"text": "b"})]),
+        fake_client.anthropic_text("AB")
+    ])
+    llm = AugmentedLLM("You are a helpful assistant.", "anthropic", client=client)
+    llm.add_tool("upper", "Upper-case the text", TEXT_SCHEMA, handler=upper)
+
+    assert reply(llm, "go") == "Step one.AB"
+    assert len(client.requests) == 3
+    # Each continuation carries the previous round's tool result
+    assert client.requests[2]["messages"][-1]["content"] == [{"type": "tool_result", "tool_use_id": "toolu_2", "content": "B"}]
+    assert [message["role"] for message in llm.messages] == ["user", "assistant", "user", "assistant", "user", "assistant"]
+
+def test_max_tool_iterations_stops_the_loop(fake_client):
+    client = fake_client([fake_client.anthropic_tool_use([(f"toolu_{n}", "upper", {"text": "x"})]) for n in range(5)])
+    llm = AugmentedLLM("You are a helpful assistant.", "anthropic", client=client, max_tool_iterations=2)
+    llm.add_tool("upper", "Upper-case the text", TEXT_SCHEMA, handler=upper)
+
+    events = list(llm.generate_events("go"))
+    assert [event.limit for event in events if isinstance(event, ToolIterationLimit)] == [2]
+    assert len(client.requests) == 2
+    # The last round's results are kept, so the history stays valid
+    assert llm.messages[-1]["content"][0]["tool_use_id"] == "toolu_1"
+
+@pytest.mark.parametrize("model_name, expected", [
+    ("o3-mini", {"max_completion_tokens": 1000, "reasoning_effort": "high"}),
+    ("gpt-4o", {"max_tokens": 1000})
+])
+def test_openai_continuation_keeps_token_limit_and_reasoning_effort(fake_client, model_name, expected):
+    client = fake_client([
+        fake_client.openai_tool_calls([("call_1", "upper", {"text": "a"})]),
+        fake_client.openai_text("A")
+    ])
+    llm = AugmentedLLM("You are a helpful assistant.", "openai", model_name=model_name, max_tokens=1000,
+                       reasoning_effort="high", client=client)
+    llm.add_tool("upper", "Upper-case the text", TEXT_SCHEMA, handler=upper)
+
+    assert reply(llm, "go") == "A"
+    first, continuation = client.requests
+    for params in (first, continuation):
+        assert {key: params.get(key) for key in expected} == expected
+    assert ("reasoning_effort" in continuation) == ("reasoning_effort" in expected)
+    assert continuation["messages"][-1] == {"role": "tool", "tool_call_id": "call_1", "content": "A"}
+
+class EchoClient:
+    """Answers every request with its last user message, slower for earlier prompts."""
+
+    def __init__(self, fake_client, prompts):
+        self.fake_client = fake_client
+        self.prompts = prompts
+        self.messages = self
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+
+    def create(self, **params):
+        prompt = params["messages"][-1]["content"]
+        if prompt == "fail":
+            raise RuntimeError("provider error")
+        delay = 0.01 * (len(self.prompts) - self.prompts.index(prompt))
+        def stream():
+            with self.lock:
+                self.in_flight += 1
+                self.peak = max(self.peak, self.in_flight)
+            try:
+                time.sleep(delay)
+                yield from self.fake_client.anthropic_text(prompt.upper())
+            finally:
+                with self.lock:
+                    self.in_flight -= 1
+        return stream()
+
+def test_generate_many_keeps_input_order_within_concurrency_bound(fake_client):
+    prompts = [f"prompt {n}" for n in range(10)] + ["fail"]
+    client = EchoClient(fake_client, prompts)
+    llm = AugmentedLLM("You are a helpful assistant.", "anthropic", client=client)
+
+    results = llm.generate_many(prompts, max_concurrency=3)
+
+    assert [result["index"] for result in results] == list(range(len(prompts)))
+    assert [result["response"] for result in results[:-1]] == [prompt.upper() for prompt in prompts[:-1]]
+    assert 1 < client.peak <= 3
+    # Each prompt ran in its own session; a failure stays with its prompt
+    assert len({result["session_id"] for result in results}) == len(prompts)
+    assert all(result["error"] is None for result in results[:-1])
+    assert results[-1]["error"] == "RuntimeError: provider error"
+    assert llm.messages == []
+
+def test_generate_many_rejects_zero_concurrency():
+    llm = AugmentedLLM("You are a helpful assistant.", "anthropic", client=object())
+    with pytest.raises(ValueError):
+        llm.generate_many(["a"], max_concurrency=0)
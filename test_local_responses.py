@@ -0,0 +1,90 @@
+import pytest
+from augmented_llm.llm import AugmentedLLM
+from augmented_llm.local_responses import LocalResponsesServer
+from augmented_llm.stream_events import TextDelta
+
+ECHO_SCHEMA = {"text": {"type": "string", "description": "Text to echo", "required": True}}
+
+def tool_then_answer(context, tools):
+    """Call echo for every user message, then answer with the tool's output."""
+    last = context[-1]
+    if last.get("type") == "function_call_output":
+        return {"text": f"echoed {last['output']}"}
+    return {"tool_calls": [{"name": "echo", "arguments": {"text": last["content"]}}]}
+
+def make_session(server):
+    llm = AugmentedLLM("You are a helpful assistant.", "openai", client=server, server_side_state=True)
+    llm.add_tool("echo", "Echo the text back", ECHO_SCHEMA, handler=lambda text: text.upper())
+    return llm
+
+def record_inputs(server):
+    sent = []
+    create = server.create
+    def recording_create(**params):
+        sent.append(params["input"])
+        return create(**params)
+    server.create = recording_create
+    return sent
+
+def reply(llm, message):
+    return "".join(event.text for event in llm.generate_events(message) if isinstance(event, TextDelta))
+
+def test_second_turn_sends_only_new_input():
+    server = LocalResponsesServer()
+    sent = record_inputs(server)
+    llm = make_session(server)
+    reply(llm, "first")
+    assert reply(llm, "second") == "[local] second (3 items in context)"
+
+    assert [request["previous_response_id"] for request in server.requests] == [None, "resp_local_1"]
+    assert sent[1] == [{"role": "user", "content": "second"}]
+
+def test_tool_round_sends_only_tool_outputs():
+    server = LocalResponsesServer(respond=tool_then_answer)
+    sent = record_inputs(server)
+    llm = make_session(server)
+    assert reply(llm, "hello") == "echoed HELLO"
+
+    assert [request["previous_response_id"] for request in server.requests] == [None, "resp_local_1"]
+    assert len(sent[1]) == 1
+    assert sent[1][0]["type"] == "function_call_output"
+    assert sent[1][0]["call_id"] == llm.messages[1]["tool_calls"][0]["id"]
+
+@pytest.mark.parametrize("forget", [
+    lambda server: server.expire(),
+    lambda server: server.expire("resp_local_1")
+])
+def test_expired_response_falls_back_to_full_resend(forget):
+    server = LocalResponsesServer()
+    sent = record_inputs(server)
+    llm = make_session(server)
+    reply(llm, "first")
+    forget(server)
+    assert reply(llm, "second") == "[local] second (3 items in context)"
+
+    assert [request["previous_response_id"] for request in server.requests] == [None, "resp_local_1", None]
+    assert sent[2] == [
+        {"role": "user", "content": "first"},
+        {"role": "assistant", "content": "[local] first (1 items in context)"},
+        {"role": "user", "content": "second"}
+    ]
+
+def test_unknown_response_id_falls_back_to_full_resend():
+    server = LocalResponsesServer()
+    llm = make_session(server)
+    reply(llm, "first")
+    llm._response_state["id"] = "resp_unknown"
+    reply(llm, "second")
+    assert [request["input_items"] for request in server.requests] == [1, 1, 3]
+    assert server.requests[-1]["previous_response_id"] is None
+
+def test_request_size_stays_flat_across_turns():
+    server = LocalResponsesServer(respond=tool_then_answer)
+    llm = make_session(server)
+    for turn in range(8):
+        reply(llm, f"message number {turn}")
+
+    sizes = [request["bytes"] for request in server.requests[1:]]
+    assert all(request["previous_response_id"] for request in server.requests[1:])
+    assert max(sizes) - min(sizes) < 100
+    assert len(llm.messages) == 8 * 4
@@ -0,0 +1,79 @@
+import pytest
+from augmented_llm.model_costs import ModelRegistry, get_model_info, strip_date_suffix
+
+PRICING = {
+    "defaults": {"provider": "openai", "reasoning": False},
+    "models": {
+        "gpt-4o": {"costs": {"input": 0.0025, "cached_input": 0.00125, "output": 0.01}},
+        "gpt-4o-mini": {"costs": {"input": 0.00015, "cached_input": 0.000075, "output": 0.0006}},
+        "o3-mini": {"reasoning": True, "costs": {"input": 0.0011, "cached_input": 0.00055, "output": 0.0044}},
+        "claude-3-7-sonnet": {
+            "provider": "anthropic",
+            "aliases": ["claude-3.7-sonnet", "claude-3-7-sonnet-latest"],
+            "costs": {"input": 0.003, "cached_input": 0.0003, "cache_write": 0.00375, "output": 0.015}
+        }
+    }
+}
+
+@pytest.fixture
+def registry():
+    return ModelRegistry(PRICING)
+
+@pytest.mark.parametrize("model_name, expected", [
+    ("gpt-4o", "gpt-4o"),
+    ("gpt-4o-2024-08-06", "gpt-4o"),
+    ("gpt-4o-mini-2024-07-18", "gpt-4o-mini"),
+    ("o3-mini-2025-01-31", "o3-mini"),
+    ("claude-3-7-sonnet-20250219", "claude-3-7-sonnet"),
+    ("claude-3.7-sonnet", "claude-3-7-sonnet"),
+    ("Claude_3_7_Sonnet", "claude-3-7-sonnet"),
+    ("claude-3-7-sonnet-latest", "claude-3-7-sonnet"),
+    ("openai/gpt-4o-mini", "gpt-4o-mini"),
+])
+def test_resolve_dated_and_aliased_names(registry, model_name, expected):
+    info = registry.resolve(model_name)
+    assert info["name"] == expected
+    assert info["known"]
+
+@pytest.mark.parametrize("model_name, expected", [
+    ("ft:gpt-4o-mini-2024-07-18:my-org::abc123", "gpt-4o-mini"),
+    ("ft:gpt-4o-2024-08-06:my-org:custom-suffix:xyz789", "gpt-4o"),
+])
+def test_resolve_fine_tuned_names(registry, model_name, expected):
+    assert registry.resolve(model_name)["name"] == expected
+
+def test_longest_prefix_wins(registry):
+    # gpt-4o-mini must not resolve to its prefix gpt-4o
+    assert registry.resolve("gpt-4o-mini")["costs"]["output"] == 0.0006
+    # Unknown variants fall back to the longest known prefix
+    assert registry.resolve("gpt-4o-audio-preview")["name"] == "gpt-4o"
+
+def test_unknown_model_gets_defaults(registry):
+    info = registry.resolve("mistral-large-2024-11-18")
+    assert not info["known"]
+    assert info["name"] == "mistral-large"
+    assert info["costs"] == {"input": 0.0, "cached_input": 0.0, "output": 0.0}
+
+def test_capabilities_and_memoization(registry):
+    info = registry.resolve("o3-mini-2025-01-31")
+    assert info["reasoning"] and info["provider"] == "openai"
+    assert registry.resolve("claude-3-7-sonnet-20250219")["provider"] == "anthropic"
+    assert registry.resolve("o3-mini-2025-01-31") is info
+
+def test_conflicting_aliases_are_rejected():
+    data = {"models": {"a-1": {"aliases": ["shared"]}, "b-1": {"aliases": ["shared"]}}}
+    with pytest.raises(ValueError):
+        ModelRegistry(data)
+
+def test_strip_date_suffix():
+    assert strip_date_suffix("claude-3-5-haiku-20241022") == "claude-3-5-haiku"
+    assert strip_date_suffix("gpt-4o-2024-08-06") == "gpt-4o"
+    assert strip_date_suffix("gpt-4o") == "gpt-4o"
+
+@pytest.mark.parametrize("model_name", [
+    "claude-3-7-sonnet-20250219",
+    "gpt-4o-mini-2024-07-18",
+    "ft:gpt-4o-mini-2024-07-18:my-org::abc123",
+])
+def test_shipped_pricing_file_resolves_dated_names(model_name):
+    assert get_model_info(model_name)["known"]
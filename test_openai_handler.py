@@ -0,0 +1,47 @@
+from augmented_llm.openai_handler import PreparedMessages, prepare_openai_messages
+
+SYSTEM = "You are a helpful assistant."
+
+def history():
+    return [
+        {"role": "user", "content": "What is 2 + 2?"},
+        {"role": "assistant", "content": None, "tool_calls": [
+            {"id": "call_1", "type": "function", "function": {"name": "add", "arguments": '{"a": 2, "b": 2}'}}
+        ]},
+        {"role": "tool", "tool_call_id": "call_1", "content": "4"},
+        {"role": "assistant", "content": "It is 4."}
+    ]
+
+def test_appended_messages_extend_the_same_list():
+    messages = history()[:1]
+    prepared = PreparedMessages()
+    first = prepared.sync(messages, SYSTEM, "gpt-4o")
+    head = first[1]
+    messages.extend(history()[1:])
+    second = prepared.sync(messages, SYSTEM, "gpt-4o")
+    assert second is first
+    assert second[1] is head
+    assert second == prepare_openai_messages(messages, SYSTEM, "gpt-4o")
+
+def test_rebuilds_when_history_or_settings_change():
+    messages = history()
+    prepared = PreparedMessages()
+    prepared.sync(messages, SYSTEM, "gpt-4o")
+
+    # Replaced in place (e.g. a compressed tool result)
+    messages[-1] = {"role": "assistant", "content": "Four."}
+    assert prepared.sync(messages, SYSTEM, "gpt-4o")[-1] == {"role": "assistant", "content": "Four."}
+
+    # Shortened in place (e.g. clear or trimming)
+    del messages[2:]
+    messages.append({"role": "tool", "tool_call_id": "call_1", "content": "four"})
+    assert prepared.sync(messages, SYSTEM, "gpt-4o") == prepare_openai_messages(messages, SYSTEM, "gpt-4o")
+
+    # A new list (failover, load)
+    replacement = history()[:1]
+    assert prepared.sync(replacement, SYSTEM, "gpt-4o") == prepare_openai_messages(replacement, SYSTEM, "gpt-4o")
+
+    # System prompt, context and model are part of the header
+    assert prepared.sync(replacement, "Be brief.", "gpt-4o")[0] == {"role": "system", "content": "Be brief."}
+    assert prepared.sync(replacement, "Be brief.", "gpt-4o", context_prompt="Facts")[1] == {"role": "system", "content": "Facts"}
+    assert prepared.sync(replacement, "Be brief.", "o3-mini")[0]["role"] == "developer"
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+import pytest
+from pydantic import BaseModel
+from openai_interacter import OpenAIChatInterface, structured_response_format
+from schemas.standard import KnowledgeGraph
+
+class Entity(BaseModel):
+    name: str
+    aliases: List[str]
+    born: Optional[int] = None
+
+class Catalog(BaseModel):
+    entities: List[Entity]
+    ids: Dict[str, str] = {}
+
+def strict_violations(schema, path="$"):
+    """List the places where a schema breaks OpenAI's strict-mode rules."""
+    violations = []
+    if isinstance(schema, list):
+        for i, item in enumerate(schema):
+            violations += strict_violations(item, f"{path}[{i}]")
+        return violations
+    if not isinstance(schema, dict):
+        return violations
+    if "$ref" in schema and len(schema) > 1:
+        violations.append(f"{path}: $ref with sibling keys {sorted(set(schema) - {'$ref'})}")
+    if "default" in schema:
+        violations.append(f"{path}: default")
+    if schema.get("type") == "object":
+        if schema.get("additionalProperties") is not False:
+            violations.append(f"{path}: additionalProperties is not false")
+        if sorted(schema.get("required", [])) != sorted(schema.get("properties", {})):
+            violations.append(f"{path}: not every property is required")
+    for key, value in schema.items():
+        if key in ("properties", "$defs"):
+            for name, sub in value.items():
+                violations += strict_violations(sub, f"{path}.{key}.{name}")
+        elif key in ("items", "anyOf", "allOf", "additionalProperties"):
+            violations += strict_violations(value, f"{path}.{key}")
+    return violations
+
+def test_knowledge_graph_format_is_strict():
+    response_format = structured_response_format(KnowledgeGraph)
+    assert response_format["type"] == "json_schema"
+    assert response_format["json_schema"]["name"] == "KnowledgeGraph"
+    assert response_format["json_schema"]["strict"] is True
+    schema = response_format["json_schema"]["schema"]
+    assert strict_violations(schema) == []
+    # Node.external_ids is a Dict field, closed for strict mode
+    external_ids = schema["$defs"]["Node"]["properties"]["external_ids"]["anyOf"][0]
+    assert external_ids == {"type": "object", "additionalProperties": False, "properties": {}, "required": []}
+    assert structured_response_format(KnowledgeGraph) is response_format
+
+def test_closed_schema_still_accepts_model_output():
+    schema = structured_response_format(Catalog)["json_schema"]["schema"]
+    assert strict_violations(schema) == []
+    parsed = Catalog.model_validate_json('{"entities": [{"name": "Mary I", "aliases": [], "born": null}], "ids": {}}')
+    assert parsed.entities[0].name == "Mary I"
+
+def completion(content):
+    usage = SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15, prompt_tokens_details=None)
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content, refusal=None))], usage=usage)
+
+def answer(params):
+    """Reply with an entity named after the last user message."""
+    name = params["messages"][-1]["content"]
+    return completion(json.dumps({"name": name, "aliases": [name.lower()], "born": None}))
+
+class Concurrency:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def __enter__(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self.lock:
+            self.current -= 1
+
+class FakeSyncClient:
+    def __init__(self):
+        self.in_flight = Concurrency()
+        self.chat = SimpleNamespace(completions=self)
+        self.requests = []
+
+    def create(self, **params):
+        self.requests.append(params)
+        with self.in_flight:
+            time.sleep(0.02)
+        return answer(params)
+
+class FakeAsyncClient(FakeSyncClient):
+    async def create(self, **params):
+        self.requests.append(params)
+        with self.in_flight:
+            await asyncio.sleep(0.02)
+        return answer(params)
+
+def make_interface():
+    return OpenAIChatInterface(client=FakeSyncClient(), async_client=FakeAsyncClient())
+
+NAMES = [f"Person {n}" for n in range(12)]
+
+def test_parse_many_keeps_order_within_concurrency_bound():
+    chat = make_interface()
+    results = chat.parse_many([[{"role": "user", "content": name}] for name in NAMES], schema=Entity, max_concurrency=4)
+    assert [entity.name for entity in results] == NAMES
+    assert 1 < chat.client.in_flight.peak <= 4
+    assert all(request["response_format"] is structured_response_format(Entity) for request in chat.client.requests)
+    assert chat.messages == []
+
+def test_aparse_many_keeps_order_within_concurrency_bound():
+    chat = make_interface()
+    results = asyncio.run(chat.aparse_many([[{"role": "user", "content": name}] for name in NAMES], schema=Entity, max_concurrency=3))
+    assert [entity.name for entity in results] == NAMES
+    assert 1 < chat.async_client.in_flight.peak <= 3
+
+def test_concurrent_aparse_structured_output_sessions():
+    async def run():
+        chats = [make_interface() for _ in NAMES]
+        for chat, name in zip(chats, NAMES):
+            chat.add_message("user", name)
+        results = await asyncio.gather(*(chat.aparse_structured_output(Entity) for chat in chats))
+        return chats, results
+
+    chats, results = asyncio.run(run())
+    assert [entity.name for entity in results] == NAMES
+    for chat, name in zip(chats, NAMES):
+        # Compact JSON, not the model's repr, is stored for the next turn
+        assert chat.messages[-1] == {"role": "assistant", "content": json.dumps(
+            {"name": name, "aliases": [name.lower()], "born": None}, separators=(",", ":"))}
+
+def test_refusal_parses_to_none():
+    chat = make_interface()
+    chat.client.create = lambda **params: SimpleNamespace(choices=[SimpleNamespace(
+        message=SimpleNamespace(content=None, refusal="I can't help with that."))], usage=None)
+    chat.add_message("user", "anything")
+    assert chat.parse_structured_output(Entity) is None
+    assert chat.messages[-1]["content"] == "I can't help with that."
+
+def test_missing_schema_is_rejected():
+    with pytest.raises(ValueError):
+        make_interface().parse_many([[{"role": "user", "content": "x"}]])
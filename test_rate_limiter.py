@@ -0,0 +1,59 @@
+import pytest
+from augmented_llm.rate_limiter import RateLimiter, LocalBucketStore, _take, _adjust
+
+def test_take_starts_full_and_refills_over_time():
+    state = {}
+    bucket = [("m:tokens", 600, 600, 10.0)]
+    assert _take(state, bucket, now=0.0) == 0
+    assert state["m:tokens"] == [0, 0.0]
+
+    # Empty bucket: wait until 600 tokens have refilled at 10/s
+    assert _take(state, bucket, now=0.0) == pytest.approx(60.0)
+    # Half refilled after 30 s
+    assert _take(state, bucket, now=30.0) == pytest.approx(30.0)
+    assert _take(state, bucket, now=60.0) == 0
+
+def test_refill_is_capped_at_capacity():
+    state = {"m:tokens": [0, 0.0]}
+    _take(state, [("m:tokens", 0, 100, 10.0)], now=1000.0)
+    assert state["m:tokens"][0] == 100
+
+def test_take_is_all_or_nothing():
+    state = {"m:requests": [5, 0.0], "m:tokens": [10, 0.0]}
+    wait = _take(state, [("m:requests", 1, 60, 1.0), ("m:tokens", 50, 600, 10.0)], now=0.0)
+    assert wait == pytest.approx(4.0)
+    # Nothing was taken from the bucket that had room
+    assert state["m:requests"][0] == 5
+    assert state["m:tokens"][0] == 10
+
+def test_adjust_returns_and_debits():
+    state = {"m:tokens": [100, 0.0]}
+    _adjust(state, "m:tokens", 50, 600, 10.0, now=0.0)
+    assert state["m:tokens"][0] == 150
+    # Debits may overdraw the bucket
+    _adjust(state, "m:tokens", -400, 600, 10.0, now=0.0)
+    assert state["m:tokens"][0] == -250
+    # Returns never exceed capacity
+    _adjust(state, "m:tokens", 10000, 600, 10.0, now=0.0)
+    assert state["m:tokens"][0] == 600
+
+def level(limiter, key):
+    return limiter.store._state[key][0]
+
+def test_reconcile_returns_overestimate_and_debits_underestimate():
+    limiter = RateLimiter({"gpt-4o": {"tpm": 6000}}, store=LocalBucketStore())
+    reservation = limiter.acquire("gpt-4o-2024-08-06", tokens=1000)
+    assert reservation["limits"] == "gpt-4o"
+    assert level(limiter, "gpt-4o:tokens") == pytest.approx(5000, abs=1)
+
+    limiter.reconcile(reservation, actual_tokens=400)
+    assert level(limiter, "gpt-4o:tokens") == pytest.approx(5600, abs=1)
+
+    reservation = limiter.acquire("gpt-4o", tokens=100)
+    limiter.reconcile(reservation, actual_tokens=1100)
+    assert level(limiter, "gpt-4o:tokens") == pytest.approx(4500, abs=1)
+
+def test_unlimited_models_are_not_reserved():
+    limiter = RateLimiter({"gpt-4o": {"tpm": 6000}})
+    assert limiter.acquire("claude-3-5-sonnet", tokens=1000) is None
+    limiter.reconcile(None, actual_tokens=1000)
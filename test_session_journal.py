@@ -0,0 +1,38 @@
+import os
+from augmented_llm.session_journal import SessionJournal, read_journal, load_session_messages
+
+def test_rotated_compressed_files_replay_in_order(tmp_path):
+    log_dir = str(tmp_path / "journal")
+    journal = SessionJournal(log_dir, max_bytes=400, compress=True)
+    journal.record("a", "session_start", model="gpt-4o", provider="openai", system_prompt="Be brief.")
+    for n in range(20):
+        journal.record("a", "message", message={"role": "user", "content": f"question {n}"})
+        journal.record("b", "message", message={"role": "user", "content": f"other {n}"})
+    journal.record("b", "clear")
+    journal.record("b", "message", message={"role": "user", "content": "after clear"})
+    journal.record("a", "switch_provider", provider="anthropic", model="claude-3-5-sonnet",
+                   messages=[{"role": "user", "content": "translated"}])
+    journal.record("a", "message", message={"role": "assistant", "content": "done"})
+    journal.close()
+
+    names = sorted(os.listdir(log_dir))
+    assert len(names) > 2
+    assert all(name.endswith(".jsonl.gz") for name in names[:-1])
+    assert names[-1].endswith(".jsonl")
+
+    sessions = read_journal(log_dir)
+    assert sessions["a"]["provider"] == "anthropic"
+    assert sessions["a"]["model"] == "claude-3-5-sonnet"
+    assert sessions["a"]["system_prompt"] == "Be brief."
+    assert sessions["a"]["messages"] == [{"role": "user", "content": "translated"}, {"role": "assistant", "content": "done"}]
+    assert sessions["b"]["messages"] == [{"role": "user", "content": "after clear"}]
+    assert list(read_journal(log_dir, session_id="b")) == ["b"]
+    assert load_session_messages(log_dir, "missing") == []
+
+def test_records_after_close_are_ignored(tmp_path):
+    journal = SessionJournal(str(tmp_path))
+    journal.record("a", "message", message={"role": "user", "content": "kept"})
+    journal.flush()
+    journal.close()
+    journal.record("a", "message", message={"role": "user", "content": "dropped"})
+    assert load_session_messages(str(tmp_path), "a") == [{"role": "user", "content": "kept"}]
@@ -0,0 +1,45 @@
+import pytest
+from augmented_llm.llm import AugmentedLLM
+from augmented_llm.session_manager import SessionManager
+from augmented_llm.session_store import SessionStore
+
+# Context tokens are counted with the stub encoding from conftest.py
+
+@pytest.fixture
+def manager(tmp_path):
+    template = AugmentedLLM("You are a helpful assistant.", "anthropic", client=object())
+    return SessionManager(template, store=SessionStore(str(tmp_path / "sessions")), max_sessions=1)
+
+def test_leased_session_is_not_evicted(manager):
+    with manager.lease("a") as a:
+        a.messages.append({"role": "user", "content": "in-flight turn"})
+        # Another tenant's session pushes the manager over max_sessions
+        with manager.lease("b"):
+            pass
+        manager.evict("a")
+        assert manager.get_stats()["live_sessions"] == 1
+        with manager.lease("a") as again:
+            assert again is a
+    assert manager.get_stats()["busy_sessions"] == 0
+    assert a.messages[-1]["content"] == "in-flight turn"
+
+def test_evicted_session_is_restored_with_its_history(manager):
+    with manager.lease("a") as a:
+        a.messages.append({"role": "user", "content": "hello"})
+    with manager.lease("b"):
+        pass
+    assert manager.evictions >= 1
+    with manager.lease("a") as restored:
+        assert restored is not a
+        assert restored.messages == [{"role": "user", "content": "hello"}]
+    assert manager.restores == 1
+
+def test_token_budget_evicts_least_recently_used(tmp_path):
+    template = AugmentedLLM("You are a helpful assistant.", "anthropic", client=object())
+    manager = SessionManager(template, store=SessionStore(str(tmp_path / "sessions")), max_total_tokens=60)
+    for session_id in ("a", "b"):
+        with manager.lease(session_id) as session:
+            session.messages.append({"role": "user", "content": "word " * 40})
+    assert manager.evictions == 1
+    assert manager.get_stats()["live_sessions"] == 1
+    assert 40 < manager.total_tokens <= 60
@@ -0,0 +1,119 @@
+import os
+import pytest
+from augmented_llm import llm as llm_module
+from augmented_llm.error_logger import get_tool_error_logger
+from augmented_llm.llm import AugmentedLLM
+from augmented_llm.session_store import SessionStore, SessionConflictError, snapshot_session, restore_session
+
+ECHO_SCHEMA = {"text": {"type": "string", "description": "Text to echo", "required": True}}
+
+@pytest.fixture(autouse=True)
+def tool_error_log_in_tmp_path(tmp_path, monkeypatch):
+    # Keep the sessions' tool error index out of the working tree
+    log_dir = str(tmp_path / "tool_errors")
+    monkeypatch.setattr(llm_module, "get_tool_error_logger", lambda: get_tool_error_logger(log_dir))
+
+def echo(text):
+    return text
+
+def make_session():
+    llm = AugmentedLLM("You are a helpful assistant.", "anthropic", temperature=0.2, client=object())
+    llm.add_tool("echo", "Echo the text back", ECHO_SCHEMA, handler=echo)
+    return llm
+
+def add_turn(llm, n):
+    llm.messages.append({"role": "user", "content": f"question {n}"})
+    llm.messages.append({"role": "assistant", "content": f"answer {n}"})
+
+def test_snapshot_round_trip():
+    llm = make_session()
+    add_turn(llm, 1)
+    restored = restore_session(snapshot_session(llm), handlers=llm.tool_registry, client=object())
+    assert restored.session_id == llm.session_id
+    assert restored.messages == llm.messages
+    assert restored.system_prompt == llm.system_prompt
+    assert restored.temperature == 0.2
+    assert restored.tool_registry["echo"] is echo
+
+def test_restore_requires_tool_handlers():
+    llm = make_session()
+    with pytest.raises(ValueError):
+        restore_session(snapshot_session(llm), client=object())
+
+def test_save_appends_deltas_and_load_replays_them(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions"))
+    llm = make_session()
+    add_turn(llm, 1)
+    snapshot_size = store.save(llm)
+
+    add_turn(llm, 2)
+    delta_size = store.save(llm)
+    add_turn(llm, 3)
+    store.save(llm)
+    assert delta_size < snapshot_size
+    assert len(store._read_records(llm.session_id)) == 3
+
+    restored = store.load(llm.session_id, handlers=llm.tool_registry, client=object())
+    assert restored.messages == llm.messages
+    assert restored.tool_registry["echo"] is echo
+
+    # The restored copy keeps appending to the same file
+    add_turn(restored, 4)
+    store.save(restored)
+    again = store.load(llm.session_id, handlers=llm.tool_registry, client=object())
+    assert again.messages == restored.messages
+    assert len(again.messages) == 8
+
+def test_rewritten_history_is_saved_as_snapshot(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions"))
+    llm = make_session()
+    add_turn(llm, 1)
+    add_turn(llm, 2)
+    store.save(llm)
+
+    # Trimming replaces the list, so a delta cannot describe the change
+    llm.messages = llm.messages[2:]
+    store.save(llm)
+    assert len(store._read_records(llm.session_id)) == 1
+    restored = store.load(llm.session_id, handlers=llm.tool_registry, client=object())
+    assert restored.messages == llm.messages
+
+def test_compacts_after_compact_every_deltas(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions"), compact_every=2)
+    llm = make_session()
+    for n in range(4):
+        add_turn(llm, n)
+        store.save(llm)
+    # snapshot, delta, delta, then compacted into a new snapshot
+    assert len(store._read_records(llm.session_id)) == 1
+    restored = store.load(llm.session_id, handlers=llm.tool_registry, client=object())
+    assert restored.messages == llm.messages
+
+def test_concurrent_writers_conflict(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions"))
+    llm = make_session()
+    store.save(llm)
+    other = store.load(llm.session_id, handlers=llm.tool_registry, client=object())
+
+    add_turn(other, 1)
+    store.save(other)
+    add_turn(llm, 2)
+    with pytest.raises(SessionConflictError):
+        store.save(llm)
+
+def test_same_size_rewrite_is_a_conflict(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions"))
+    llm = make_session()
+    add_turn(llm, 1)
+    store.save(llm)
+    other = store.load(llm.session_id, handlers=llm.tool_registry, client=object())
+
+    # Another worker rewrites the history with content of the same length
+    other.messages = [{"role": "user", "content": "question 9"}, {"role": "assistant", "content": "answer 9"}]
+    size = os.path.getsize(store._path(llm.session_id))
+    store.save(other)
+    assert os.path.getsize(store._path(llm.session_id)) == size
+
+    add_turn(llm, 2)
+    with pytest.raises(SessionConflictError):
+        store.save(llm)
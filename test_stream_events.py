@@ -0,0 +1,82 @@
+from augmented_llm.llm import AugmentedLLM
+from augmented_llm.stream_events import (
+    MessageComplete, Stop, StreamError, StreamStart, TextDelta, ToolInput, ToolResult, ToolRoundContinue,
+    ToolStart, Usage, events_to_text
+)
+
+TEXT_SCHEMA = {"text": {"type": "string", "description": "Input text", "required": True}}
+
+def upper(text):
+    return text.upper()
+
+# The strings generate() yielded before it was built on typed events
+LEGACY_ANTHROPIC = [
+    "[Stream Started]\n",
+    "Let me check.",
+    "\n[Tool Use Started: upper]\n",
+    "\n[Tool Input: {'text': 'a'}]\n",
+    "\n[Stop Reason: tool_use]\n",
+    "\n[Message Complete]\n",
+    "\n[Tool Result]\nA\n",
+    "\n[Continuing conversation with tool result...]\n",
+    "[Stream Started]\n",
+    "It is A.",
+    "\n[Stop Reason: end_turn]\n",
+    "\n[Message Complete]\n"
+]
+
+LEGACY_OPENAI = [
+    "\n[Tool Result]\nA\n",
+    "\n[Continuing conversation with tool result...]\n",
+    "It is A."
+]
+
+def anthropic_session(fake_client, debug_tools=False):
+    client = fake_client([
+        fake_client.anthropic_tool_use([("toolu_1", "upper", {"text": "a"})], text="Let me check."),
+        fake_client.anthropic_text("It is A.")
+    ])
+    llm = AugmentedLLM("You are a helpful assistant.", "anthropic", client=client, debug_tools=debug_tools)
+    llm.add_tool("upper", "Upper-case the text", TEXT_SCHEMA, handler=upper)
+    return llm
+
+def test_anthropic_string_stream_matches_legacy_output(fake_client):
+    assert list(anthropic_session(fake_client).generate("go")) == LEGACY_ANTHROPIC
+
+def test_openai_string_stream_matches_legacy_output(fake_client):
+    client = fake_client([fake_client.openai_tool_calls([("call_1", "upper", {"text": "a"})]), fake_client.openai_text("It is A.")])
+    llm = AugmentedLLM("You are a helpful assistant.", "openai", client=client)
+    llm.add_tool("upper", "Upper-case the text", TEXT_SCHEMA, handler=upper)
+    assert list(llm.generate("go")) == LEGACY_OPENAI
+
+def test_debug_tools_streams_only_model_text(fake_client, capsys):
+    assert list(anthropic_session(fake_client, debug_tools=True).generate("go")) == ["Let me check.", "It is A."]
+    assert "[Debug] Tool Use Started: upper" in capsys.readouterr().out
+
+def test_events_render_like_legacy_strings():
+    events = [
+        StreamStart(), TextDelta("hi"), ToolStart("search", "toolu_1"), ToolInput("search", "toolu_1", {"q": 1}),
+        Usage(10, 5), ToolResult("search", "toolu_1", "found"), ToolRoundContinue(), StreamError("bad arguments"),
+        Stop("end_turn"), MessageComplete()
+    ]
+    assert list(events_to_text(events)) == [
+        "[Stream Started]\n", "hi", "\n[Tool Use Started: search]\n", "\n[Tool Input: {'q': 1}]\n",
+        "\n[Tool Result]\nfound\n", "\n[Continuing conversation with tool result...]\n", "\n[Error] bad arguments\n",
+        "\n[Stop Reason: end_turn]\n", "\n[Message Complete]\n"
+    ]
+    # Only text and errors reach the caller when the handlers print markers instead
+    assert list(events_to_text(events, debug_tools=True)) == ["hi", "\n[Error] bad arguments\n"]
+
+def test_closing_the_text_stream_closes_the_event_stream():
+    closed = []
+    def events():
+        try:
+            yield TextDelta("a")
+            yield TextDelta("b")
+        finally:
+            closed.append(True)
+
+    text = events_to_text(events())
+    assert next(text) == "a"
+    text.close()
+    assert closed == [True]
@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+import pytest
+from augmented_llm.batch import normalize_openai_completion
+from augmented_llm.openai_handler import extract_openai_usage, extract_openai_response_usage
+from augmented_llm.token_debugger import TokenDebugger
+from augmented_llm.usage_ledger import request_cost
+from augmented_llm.model_costs import get_model_costs
+
+EXPECTED = {"input_tokens": 20, "output_tokens": 10, "cache_read_input_tokens": 80, "cache_creation_input_tokens": 0}
+
+def test_openai_usage_extractors_exclude_cached_tokens_from_input():
+    chat_usage = SimpleNamespace(prompt_tokens=100, completion_tokens=10, prompt_tokens_details=SimpleNamespace(cached_tokens=80))
+    responses_usage = SimpleNamespace(input_tokens=100, output_tokens=10, input_tokens_details=SimpleNamespace(cached_tokens=80))
+    completion = {
+        "choices": [{"message": {"content": "ok"}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 100, "completion_tokens": 10, "prompt_tokens_details": {"cached_tokens": 80}}
+    }
+    assert extract_openai_usage(chat_usage) == EXPECTED
+    assert extract_openai_response_usage(responses_usage) == EXPECTED
+    assert normalize_openai_completion(completion)["usage"] == EXPECTED
+
+def test_usage_without_cache_details():
+    usage = SimpleNamespace(prompt_tokens=100, completion_tokens=10, prompt_tokens_details=None)
+    assert extract_openai_usage(usage)["input_tokens"] == 100
+
+@pytest.mark.parametrize("model", ["gpt-4o", "claude-3-7-sonnet-20250219"])
+def test_debugger_and_ledger_costs_agree(model):
+    debugger = TokenDebugger(model)
+    debugger.log_usage(EXPECTED)
+    costs = get_model_costs(model)
+    expected = (20 * costs["input"] + 80 * costs.get("cached_input", costs["input"]) + 10 * costs["output"]) / 1000
+    assert debugger.calculate_costs()["total_cost"] == pytest.approx(expected, abs=1e-6)
+    assert request_cost(model, EXPECTED) == pytest.approx(expected)
@@ -0,0 +1,117 @@
+from types import SimpleNamespace
+import pytest
+import graph_utils
+from augmented_llm import tool_cache as tool_cache_module
+from augmented_llm.llm import AugmentedLLM
+from augmented_llm.tool_cache import ToolResultCache, get_shared_tool_cache, invalidate_shared_tool_caches
+
+KG = {
+    "nodes": [{"id": "Elizabeth_I", "type": "Person"}, {"id": "Henry_VIII", "type": "Person"}],
+    "relationships": [{"source": "Elizabeth_I", "target": "Henry_VIII", "type": "CHILD_OF"}]
+}
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(tool_cache_module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+def test_results_expire_after_ttl(clock):
+    cache = ToolResultCache(default_ttl=10)
+    cache.configure_tool("slow", ttl=60)
+    cache.set("query", {"q": "a"}, "A")
+    cache.set("slow", {"q": "a"}, "A")
+    clock[0] += 30
+    assert cache.get("query", {"q": "a"}) == (False, None)
+    assert cache.get("slow", {"q": "a"}) == (True, "A")
+    clock[0] += 31
+    assert cache.get("slow", {"q": "a"}) == (False, None)
+
+def test_no_ttl_never_expires(clock):
+    cache = ToolResultCache(default_ttl=None)
+    cache.set("query", {"q": "a"}, "A")
+    clock[0] += 10 ** 9
+    assert cache.get("query", {"q": "a"}) == (True, "A")
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ToolResultCache(default_max_size=2)
+    cache.set("query", {"q": "a"}, "A")
+    cache.set("query", {"q": "b"}, "B")
+    cache.get("query", {"q": "a"})
+    cache.set("query", {"q": "c"}, "C")
+    assert cache.get("query", {"q": "b"}) == (False, None)
+    assert cache.get("query", {"q": "a"}) == (True, "A")
+    assert cache.get("query", {"q": "c"}) == (True, "C")
+    assert cache.get_stats()["tools"]["query"]["evictions"] == 1
+
+def test_keys_ignore_argument_order():
+    cache = ToolResultCache()
+    cache.set("query", {"q": "a", "limit": 5}, "A")
+    assert cache.get("query", {"limit": 5, "q": "a"}) == (True, "A")
+
+def test_stats_count_hits_misses_and_invalidations():
+    cache = ToolResultCache()
+    cache.set("query", {"q": "a"}, "A")
+    cache.set("query", {"q": "b"}, "B")
+    cache.get("query", {"q": "a"})
+    cache.get("query", {"q": "a"})
+    cache.get("query", {"q": "z"})
+    assert cache.invalidate("query", predicate=lambda args: args["q"] == "b") == 1
+
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+    assert stats["tools"]["query"] == {"hits": 2, "misses": 1, "evictions": 0, "invalidations": 1, "size": 1}
+
+def test_session_serves_cacheable_tool_from_cache():
+    calls = []
+    def lookup(name):
+        calls.append(name)
+        return f"facts about {name}"
+
+    llm = AugmentedLLM("You are a helpful assistant.", "anthropic", client=object(), tool_cache=ToolResultCache())
+    schema = {"name": {"type": "string", "description": "Entity name", "required": True}}
+    llm.add_tool("lookup", "Look up an entity", schema, handler=lookup, cacheable=True)
+    assert llm.execute_tool("lookup", {"name": "Mary I"}) == "facts about Mary I"
+    assert llm.execute_tool("lookup", {"name": "Mary I"}) == "facts about Mary I"
+    assert calls == ["Mary I"]
+
+class FakeGraph:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.documents = []
+
+    def add_graph_documents(self, documents, include_source=False):
+        if self.fail:
+            raise ConnectionError("database unavailable")
+        self.documents.extend(documents)
+
+def test_graph_upload_invalidates_cached_results(monkeypatch):
+    # Only the upload path is under test, not the LangChain conversion
+    monkeypatch.setattr(graph_utils, "dict_to_graph_documents", lambda kg: [kg])
+    cache = ToolResultCache()
+    cache.set("query_knowledge_graph", {"q": "Elizabeth"}, "old answer")
+    cache.set("calculator", {"x": 1}, "1")
+    listener = lambda kg: cache.invalidate("query_knowledge_graph")
+    graph_utils.register_upload_listener(listener)
+    try:
+        # A failed upload leaves the graph, and so the cache, as it was
+        assert not graph_utils.upload_kg_to_neo4j(KG, FakeGraph(fail=True))
+        assert cache.get("query_knowledge_graph", {"q": "Elizabeth"}) == (True, "old answer")
+
+        assert graph_utils.upload_kg_to_neo4j(KG, FakeGraph())
+        assert cache.get("query_knowledge_graph", {"q": "Elizabeth"}) == (False, None)
+        assert cache.get("calculator", {"x": 1}) == (True, "1")
+    finally:
+        graph_utils.unregister_upload_listener(listener)
+
+def test_upload_listener_invalidates_shared_caches():
+    cache = get_shared_tool_cache("test_tool_cache")
+    cache.set("query_knowledge_graph", {"q": "Henry"}, "old answer")
+    listener = lambda kg: invalidate_shared_tool_caches("query_knowledge_graph")
+    graph_utils.register_upload_listener(listener)
+    try:
+        graph_utils.notify_upload_listeners(KG)
+    finally:
+        graph_utils.unregister_upload_listener(listener)
+    assert cache.get("query_knowledge_graph", {"q": "Henry"}) == (False, None)
@@ -0,0 +1,70 @@
+from datetime import datetime, timezone
+import pytest
+from augmented_llm.instrumentation import emit_event
+from augmented_llm.usage_ledger import UsageLedger, request_cost, BATCH_DISCOUNT
+
+USAGE = {"input_tokens": 100, "output_tokens": 20, "cache_read_input_tokens": 50, "cache_creation_input_tokens": 10}
+
+def at(day, hour, minute=0):
+    return datetime(2026, 3, day, hour, minute, tzinfo=timezone.utc).timestamp()
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = UsageLedger(str(tmp_path / "usage" / "ledger.db"), batch_size=2)
+    yield ledger
+    ledger.close()
+
+def record(ledger, model, ts, latency=1.0, batch=False, session_id="s1"):
+    ledger.record(session_id, "openai", model, USAGE, latency=latency, batch=batch, ts=ts)
+
+def test_hourly_and_daily_rollups(ledger):
+    record(ledger, "gpt-4o", at(1, 9, 5), latency=1.0)
+    record(ledger, "gpt-4o", at(1, 9, 55), latency=3.0)
+    record(ledger, "gpt-4o", at(1, 10), latency=None)
+    record(ledger, "gpt-4o-mini", at(1, 10), batch=True)
+    record(ledger, "gpt-4o", at(2, 0), session_id="s2")
+    ledger.flush()
+    cost = request_cost("gpt-4o", USAGE)
+
+    hourly = ledger.rollups("hour", model="gpt-4o")
+    assert [(row["bucket"], row["requests"]) for row in hourly] == [
+        ("2026-03-01T09:00", 2), ("2026-03-01T10:00", 1), ("2026-03-02T00:00", 1)
+    ]
+    first = hourly[0]
+    assert (first["input_tokens"], first["output_tokens"], first["cache_read_tokens"], first["cache_write_tokens"]) == (200, 40, 100, 20)
+    assert first["avg_latency"] == 2.0
+    assert first["cost"] == pytest.approx(2 * cost)
+    # Requests without a latency do not count towards the average
+    assert hourly[1]["avg_latency"] is None
+
+    daily = ledger.rollups("day")
+    assert [(row["bucket"], row["model"], row["requests"]) for row in daily] == [
+        ("2026-03-01", "gpt-4o", 3), ("2026-03-01", "gpt-4o-mini", 1), ("2026-03-02", "gpt-4o", 1)
+    ]
+    assert daily[1]["cost"] == pytest.approx(request_cost("gpt-4o-mini", USAGE) * BATCH_DISCOUNT)
+
+    # Rollups agree with the raw rows they summarize
+    rows = ledger.requests(limit=None)
+    assert len(rows) == 5
+    assert sum(row["cost"] for row in rows) == pytest.approx(sum(row["cost"] for row in daily))
+    assert ledger.totals(since=at(1, 10), until=at(2, 0))["requests"] == 2
+    assert ledger.totals()["cost"] == pytest.approx(sum(row["cost"] for row in rows), abs=1e-6)
+    assert [row["ts"] for row in ledger.requests(session_id="s2")] == [at(2, 0)]
+
+def test_hook_records_only_usage_events(ledger):
+    emit_event([ledger], "request_start", session_id="s1", provider="anthropic", model="claude-3-5-sonnet")
+    emit_event([ledger], "usage", session_id="s1", provider="anthropic", model="claude-3-5-sonnet", latency=0.5, **USAGE)
+    ledger.flush()
+    [row] = ledger.requests()
+    assert (row["session_id"], row["provider"], row["model"], row["latency"]) == ("s1", "anthropic", "claude-3-5-sonnet", 0.5)
+    assert row["cost"] == pytest.approx(request_cost("claude-3-5-sonnet", USAGE))
+
+def test_closed_ledger_drops_requests(ledger):
+    ledger.close()
+    record(ledger, "gpt-4o", at(1, 9))
+    assert ledger.dropped == 1
+    assert ledger.requests() == []
+
+def test_unknown_granularity_is_rejected(ledger):
+    with pytest.raises(ValueError):
+        ledger.rollups("week")